@@ -1,35 +1,37 @@
+import os
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from ..core.auth import decode_access_token
+from ..core.user_cache import user_cache
 from ..services.auth_service import get_user_by_id
 
 security = HTTPBearer()
 
+# When enabled, read-only endpoints trust the role claim embedded in the access
+# token and skip the user lookup entirely. Role changes then only take effect
+# once the user's existing tokens expire.
+TRUST_TOKEN_CLAIMS = os.getenv("SKINMORPH_TRUST_TOKEN_CLAIMS", "false").lower() in ("1", "true", "yes")
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> dict:
-    """Dependency to get current authenticated user."""
-    token = credentials.credentials
-    payload = decode_access_token(token)
-    
-    if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    user_id: str = payload.get("sub")
-    if user_id is None:
+
+def _get_token_payload(credentials: HTTPAuthorizationCredentials) -> dict:
+    payload = decode_access_token(credentials.credentials)
+
+    if payload is None or payload.get("sub") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+    return payload
+
+
+async def _load_user(user_id: str) -> dict:
+    user: Optional[dict] = user_cache.get(user_id)
+    if user is not None:
+        return user
+
     user = await get_user_by_id(user_id)
     if user is None:
         raise HTTPException(
@@ -37,6 +39,36 @@ async def get_current_user(
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
+    user_cache.set(user_id, user)
     return user
 
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> dict:
+    """Dependency to get current authenticated user."""
+    payload = _get_token_payload(credentials)
+    return await _load_user(payload["sub"])
+
+
+async def get_current_user_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> dict:
+    """
+    Dependency for read-only endpoints that only need the user's ID and role.
+    Uses the token claims directly when SKINMORPH_TRUST_TOKEN_CLAIMS is enabled
+    and the token carries a role; otherwise behaves like get_current_user.
+    """
+    payload = _get_token_payload(credentials)
+    user_id = payload["sub"]
+
+    if TRUST_TOKEN_CLAIMS and payload.get("role"):
+        return {
+            "_id": user_id,
+            "id": user_id,
+            "email": payload.get("email"),
+            "role": payload["role"],
+        }
+
+    return await _load_user(user_id)
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from fastapi import HTTPException, status
+
+from .metrics import registry
+
+T = TypeVar("T")
+
+# Password hashing pool configuration.
+# pbkdf2_sha256 runs in OpenSSL with the GIL released, so a small thread pool
+# keeps hashing off the event loop and lets it use separate cores.
+PASSWORD_HASH_WORKERS = int(os.getenv("SKINMORPH_PASSWORD_HASH_WORKERS", "2"))
+# Maximum number of callers waiting for a worker before new ones are rejected
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("SKINMORPH_PASSWORD_HASH_MAX_QUEUE", "64"))
+# How long a caller may wait for a worker before being rejected with 503
+PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS = float(
+    os.getenv("SKINMORPH_PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", "2.0")
+)
+
+
+class PasswordHashPool:
+    """
+    Bounded worker pool with admission control for password hashing.
+    At most `workers` hashes run at once; further callers queue up to
+    `max_queue` deep for at most `queue_timeout` seconds, after which the
+    request is rejected with 503 instead of piling up behind the pool.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+        queue_timeout: float = PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="password-hash"
+        )
+        # asyncio semaphores bind to one event loop, so keep one per loop
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.waiting = 0
+        self.rejected = 0
+
+    def _get_slots(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = asyncio.Semaphore(self.workers)
+            self._slots[loop] = slots
+        return slots
+
+    def _overloaded(self) -> HTTPException:
+        self.rejected += 1
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        slots = self._get_slots(loop)
+
+        if slots.locked() and self.waiting >= self.max_queue:
+            raise self._overloaded()
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._overloaded()
+        finally:
+            self.waiting -= 1
+
+        try:
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            slots.release()
+
+
+password_hash_pool = PasswordHashPool()
+
+registry.callback(
+    "skinmorph_password_hash_queue_depth", "Callers waiting for a password hashing worker.",
+    lambda: {(): password_hash_pool.waiting},
+)
+registry.callback(
+    "skinmorph_password_hash_rejected_total", "Password hashing requests rejected as overloaded.",
+    lambda: {(): password_hash_pool.rejected},
+    kind="counter",
+)
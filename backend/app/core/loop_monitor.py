@@ -0,0 +1,174 @@
+"""
+Event-loop lag monitoring.
+
+A background task sleeps for a fixed interval and measures how late it wakes
+up; the delay is how long the loop was kept from scheduling anything, and is
+exported as a histogram. Any synchronous work in an `async def` handler
+(inference, OpenCV, hashing, blocking queries, file I/O) shows up here.
+
+In debug mode a watchdog thread also checks the monitor's heartbeat. When the
+loop has been blocked for longer than the threshold, it captures the stack of
+the loop thread, i.e. the code doing the blocking, and attributes it to the
+request being handled by finding the ASGI `scope` in the calling frames.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from .metrics import registry, route_template
+
+logger = logging.getLogger(__name__)
+
+# Event-loop monitor configuration
+LOOP_MONITOR_INTERVAL = float(os.getenv("SKINMORPH_LOOP_MONITOR_INTERVAL", "0.1"))
+# Debug only: capture the stacks of blocking code
+LOOP_WATCHDOG_ENABLED = os.getenv("SKINMORPH_LOOP_WATCHDOG_ENABLED", "false").lower() in ("1", "true", "yes")
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("SKINMORPH_LOOP_BLOCK_THRESHOLD_MS", "200"))
+LOOP_BLOCKS_KEPT = 50
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+event_loop_lag = registry.histogram(
+    "skinmorph_event_loop_lag_seconds", "Event loop scheduling delay.", buckets=LAG_BUCKETS
+)
+event_loop_blocks = registry.counter(
+    "skinmorph_event_loop_blocked_total", "Event loop stalls caught by the debug watchdog, by route.", ["route"]
+)
+
+
+def _find_request_scope(frame) -> Optional[dict]:
+    """The innermost ASGI HTTP scope among the locals of `frame` and its callers."""
+    while frame is not None:
+        scope = frame.f_locals.get("scope")
+        if isinstance(scope, dict) and scope.get("type") == "http":
+            return scope
+        frame = frame.f_back
+    return None
+
+
+class LoopWatchdog:
+    """Thread that captures the loop thread's stack while the loop is blocked."""
+
+    def __init__(self, monitor: "LoopMonitor", threshold_ms: float) -> None:
+        self.monitor = monitor
+        self.threshold = threshold_ms / 1000.0
+        self.blocks: Deque[Dict[str, Any]] = deque(maxlen=LOOP_BLOCKS_KEPT)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="loop-watchdog", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+    def _run(self) -> None:
+        reported_beat: Optional[float] = None
+        pending: Optional[Dict[str, Any]] = None
+        poll = min(self.threshold / 2, self.monitor.interval)
+        while not self._stop.wait(poll):
+            beat = self.monitor.last_beat
+            if pending is not None and beat != reported_beat:
+                # The loop is running again: record the scheduling delay the stall caused
+                pending["lag_ms"] = round((beat - reported_beat - self.monitor.interval) * 1000, 1)
+                pending = None
+            stalled = time.perf_counter() - beat - self.monitor.interval
+            if stalled >= self.threshold and beat != reported_beat:
+                reported_beat = beat
+                pending = self._capture(stalled)
+
+    def _capture(self, stalled: float) -> Optional[Dict[str, Any]]:
+        frame = sys._current_frames().get(self.monitor.thread_id)
+        if frame is None:
+            return None
+        scope = _find_request_scope(frame)
+        route = route_template(scope) if scope is not None else "none"
+        record = {
+            "ts": datetime.utcnow().isoformat(),
+            "route": route,
+            "method": scope.get("method") if scope else None,
+            "path": scope.get("path") if scope else None,
+            "blocked_ms_at_capture": round(stalled * 1000, 1),
+            "lag_ms": None,
+            "stack": traceback.format_stack(frame),
+        }
+        del frame
+        event_loop_blocks.inc(route=route)
+        self.blocks.append(record)
+        logger.warning(
+            "Event loop blocked for %.0f ms in %s %s:\n%s",
+            stalled * 1000, record["method"] or "", record["path"] or route, "".join(record["stack"]),
+        )
+        return record
+
+
+class LoopMonitor:
+    """Measures event-loop lag from a task that wakes up every `interval` seconds."""
+
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL) -> None:
+        self.interval = interval
+        self.last_beat = time.perf_counter()
+        self.thread_id: Optional[int] = None
+        self.watchdog: Optional[LoopWatchdog] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, watchdog: bool = False, threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS) -> None:
+        self.thread_id = threading.get_ident()
+        self.last_beat = time.perf_counter()
+        self._task = asyncio.create_task(self._run())
+        if watchdog:
+            self.watchdog = LoopWatchdog(self, threshold_ms)
+            self.watchdog.start()
+
+    async def stop(self) -> None:
+        if self.watchdog is not None:
+            self.watchdog.stop()
+            self.watchdog = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            event_loop_lag.observe(max(0.0, now - self.last_beat - self.interval))
+            self.last_beat = now
+
+
+_loop_monitor: Optional[LoopMonitor] = None
+
+
+def start_loop_monitor() -> None:
+    global _loop_monitor
+    if _loop_monitor is not None or LOOP_MONITOR_INTERVAL <= 0:
+        return
+    _loop_monitor = LoopMonitor()
+    _loop_monitor.start(watchdog=LOOP_WATCHDOG_ENABLED)
+
+
+async def stop_loop_monitor() -> None:
+    global _loop_monitor
+    if _loop_monitor is not None:
+        await _loop_monitor.stop()
+        _loop_monitor = None
+
+
+def recent_blocks() -> List[Dict[str, Any]]:
+    """Stalls captured by the debug watchdog, newest first."""
+    if _loop_monitor is None or _loop_monitor.watchdog is None:
+        return []
+    return list(reversed(_loop_monitor.watchdog.blocks))
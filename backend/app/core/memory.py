@@ -0,0 +1,328 @@
+"""
+Memory accounting for the inference pipeline.
+
+Sampled requests on the inference routes run with `tracemalloc` tracing and
+record, per pipeline stage (via `metrics.stage`), the change in RSS, how far
+the stage pushed the process's peak RSS, and the Python allocations it made.
+tracemalloc only sees allocations made through Python's allocator, so tensor
+storage shows up in the RSS figures only. Tracing is process-wide, so one
+request is sampled at a time and concurrent requests add noise to the numbers.
+
+`fit_image_to_budget` bounds the per-request peak: images whose estimated
+decode cost exceeds the budget are downscaled, or rejected with 413.
+"""
+
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from io import BytesIO
+from typing import Any, ContextManager, Deque, Dict, Iterator, List, Optional
+
+from fastapi import HTTPException, status
+from PIL import Image
+from starlette.concurrency import run_in_threadpool
+
+from .metrics import add_stage_hook, registry, stage
+from .tracing import annotate
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Memory sampling configuration
+MEMORY_SAMPLE_RATE = float(os.getenv("SKINMORPH_MEMORY_SAMPLE_RATE", "0.01"))
+MEMORY_SAMPLES_KEPT = int(os.getenv("SKINMORPH_MEMORY_SAMPLES_KEPT", "50"))
+SAMPLED_PATH_PREFIXES = ("/predict", "/upload")
+
+# Per-request image budget; 0 disables it
+IMAGE_MEMORY_BUDGET_BYTES = int(float(os.getenv("SKINMORPH_IMAGE_MEMORY_BUDGET_MB", "256")) * 1024 * 1024)
+# "downscale" or "reject"
+IMAGE_BUDGET_ACTION = os.getenv("SKINMORPH_IMAGE_BUDGET_ACTION", "downscale").lower()
+
+# Peak bytes per decoded pixel across the pipeline, measured on the skin gate
+# (OpenCV BGR image, HSV copy and mask) and the detector's PIL decodes
+PIPELINE_BYTES_PER_PIXEL = 8
+# Peak bytes per decoded pixel while downscaling (PIL RGB decode plus resize)
+DECODE_BYTES_PER_PIXEL = 6
+# Never downscale below the detector's input size
+MIN_DOWNSCALE_SIDE = 224
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process, or 0 where the platform does not expose it."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def peak_rss_bytes() -> int:
+    """High-water mark of the process RSS, or 0 where unavailable."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+MEMORY_BUCKETS = tuple(float(2 ** n) for n in range(16, 32, 2))  # 64 KiB .. 1 GiB
+
+stage_python_alloc_peak = registry.histogram(
+    "skinmorph_stage_python_alloc_peak_bytes",
+    "Peak Python allocations per pipeline stage in memory-sampled requests.",
+    ["stage"],
+    buckets=MEMORY_BUCKETS,
+)
+image_budget_actions = registry.counter(
+    "skinmorph_image_budget_total", "Images downscaled or rejected by the memory budget.", ["action"]
+)
+registry.callback(
+    "skinmorph_process_resident_memory_bytes", "Resident memory of the worker process.",
+    lambda: {(): current_rss_bytes()},
+)
+registry.callback(
+    "skinmorph_process_peak_resident_memory_bytes", "Peak resident memory of the worker process.",
+    lambda: {(): peak_rss_bytes()},
+)
+
+
+class MemorySample:
+    """Memory measurements collected for one sampled request."""
+
+    def __init__(self, method: str, path: str) -> None:
+        self.method = method
+        self.path = path
+        self.started_at = datetime.utcnow()
+        self.stages: Dict[str, Dict[str, int]] = {}
+        self.rss_start = current_rss_bytes()
+        self.peak_rss_start = peak_rss_bytes()
+        self.traced_start = tracemalloc.get_traced_memory()[0]
+        self.traced_peak = self.traced_start
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        rss_before = current_rss_bytes()
+        peak_before = peak_rss_bytes()
+        traced_before, peak_so_far = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            traced_after, traced_peak = tracemalloc.get_traced_memory()
+            alloc_peak = max(0, traced_peak - traced_before)
+            stage_python_alloc_peak.observe(alloc_peak, stage=name)
+            with self._lock:
+                self.traced_peak = max(self.traced_peak, peak_so_far, traced_peak)
+                entry = self.stages.setdefault(name, {
+                    "count": 0,
+                    "rss_delta_bytes": 0,
+                    "new_peak_rss_bytes": 0,
+                    "python_alloc_delta_bytes": 0,
+                    "python_alloc_peak_bytes": 0,
+                })
+                entry["count"] += 1
+                entry["rss_delta_bytes"] += current_rss_bytes() - rss_before
+                entry["new_peak_rss_bytes"] += peak_rss_bytes() - peak_before
+                entry["python_alloc_delta_bytes"] += traced_after - traced_before
+                entry["python_alloc_peak_bytes"] = max(entry["python_alloc_peak_bytes"], alloc_peak)
+
+    def to_record(self, status_code: int, duration_ms: float) -> Dict[str, Any]:
+        traced_end, traced_peak = tracemalloc.get_traced_memory()
+        with self._lock:
+            return {
+                "ts": self.started_at.isoformat(),
+                "method": self.method,
+                "path": self.path,
+                "status": status_code,
+                "duration_ms": round(duration_ms, 3),
+                "rss_start_bytes": self.rss_start,
+                "rss_end_bytes": current_rss_bytes(),
+                "new_peak_rss_bytes": peak_rss_bytes() - self.peak_rss_start,
+                "python_alloc_peak_bytes": max(self.traced_peak, traced_peak) - self.traced_start,
+                "python_alloc_delta_bytes": traced_end - self.traced_start,
+                "stages": {name: dict(v) for name, v in self.stages.items()},
+            }
+
+
+_current_sample: ContextVar[Optional[MemorySample]] = ContextVar("skinmorph_memory_sample", default=None)
+_recent_samples: Deque[Dict[str, Any]] = deque(maxlen=MEMORY_SAMPLES_KEPT)
+
+
+def _measure_stage(name: str) -> ContextManager[None]:
+    sample = _current_sample.get()
+    return nullcontext() if sample is None else sample.measure(name)
+
+
+add_stage_hook(_measure_stage)
+
+
+def recent_samples() -> List[Dict[str, Any]]:
+    """Memory records of the most recent sampled requests, newest first."""
+    return list(reversed(_recent_samples))
+
+
+class MemorySamplingMiddleware:
+    """
+    Pure ASGI middleware running a sample of inference requests with
+    tracemalloc enabled and keeping their per-stage memory records.
+    """
+
+    def __init__(self, app, sample_rate: float = MEMORY_SAMPLE_RATE, prefixes=SAMPLED_PATH_PREFIXES) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self.prefixes = tuple(prefixes)
+        self._active = threading.Lock()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (
+            scope["type"] != "http"
+            or self.sample_rate <= 0
+            or not scope["path"].startswith(self.prefixes)
+            or (self.sample_rate < 1.0 and random.random() >= self.sample_rate)
+            or not self._active.acquire(blocking=False)
+        ):
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._sample(scope, receive, send)
+        finally:
+            self._active.release()
+
+    async def _sample(self, scope, receive, send) -> None:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        sample = MemorySample(scope["method"], scope["path"])
+        token = _current_sample.set(sample)
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_sample.reset(token)
+            record = sample.to_record(status_code, (time.perf_counter() - start) * 1000)
+            if started_tracing:
+                tracemalloc.stop()
+            _recent_samples.append(record)
+            annotate(python_alloc_peak_bytes=record["python_alloc_peak_bytes"])
+
+
+def module_memory(module) -> Dict[str, Any]:
+    """Parameter, buffer and gradient sizes of a torch module."""
+    params = list(module.parameters())
+    buffers = list(module.buffers())
+    grads = [p.grad for p in params if p.grad is not None]
+    parameter_bytes = sum(p.numel() * p.element_size() for p in params)
+    buffer_bytes = sum(b.numel() * b.element_size() for b in buffers)
+    gradient_bytes = sum(g.numel() * g.element_size() for g in grads)
+    return {
+        "parameters": sum(p.numel() for p in params),
+        "parameter_bytes": parameter_bytes,
+        "buffers": sum(b.numel() for b in buffers),
+        "buffer_bytes": buffer_bytes,
+        "gradient_bytes": gradient_bytes,
+        "total_bytes": parameter_bytes + buffer_bytes + gradient_bytes,
+        "dtypes": sorted({str(t.dtype) for t in params + buffers}),
+    }
+
+
+def estimate_image_peak_bytes(width: int, height: int, encoded_bytes: int) -> int:
+    """Estimated peak memory of running one image of this size through the pipeline."""
+    return encoded_bytes + PIPELINE_BYTES_PER_PIXEL * width * height
+
+
+def _reject(width: Optional[int] = None, height: Optional[int] = None) -> HTTPException:
+    image_budget_actions.inc(action="rejected")
+    size = f" of {width}x{height} pixels" if width is not None else ""
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Image{size} is too large to process",
+    )
+
+
+def _downscale(img: Image.Image, target: tuple, available: int) -> bytes:
+    with stage("downscale"):
+        source_format = img.format
+        width, height = img.size
+        if source_format == "JPEG":
+            # JPEG decodes directly at 1/2, 1/4 or 1/8 scale; use the largest that fits
+            for scale in (1, 2, 4, 8):
+                size = (math.ceil(width / scale), math.ceil(height / scale))
+                if DECODE_BYTES_PER_PIXEL * size[0] * size[1] <= available:
+                    break
+            img.draft("RGB", size)
+        if DECODE_BYTES_PER_PIXEL * img.size[0] * img.size[1] > available:
+            raise _reject(width, height)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.thumbnail(target)
+        buffer = BytesIO()
+        if source_format == "JPEG":
+            img.save(buffer, format="JPEG", quality=95)
+        else:
+            img.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+
+async def fit_image_to_budget(
+    data: bytes,
+    reserved_bytes: int = 0,
+    budget_bytes: int = IMAGE_MEMORY_BUDGET_BYTES,
+    action: str = IMAGE_BUDGET_ACTION,
+) -> bytes:
+    """
+    Return `data`, or a downscaled re-encoding of it, such that processing it
+    stays within the memory budget. `reserved_bytes` is memory the request
+    already holds for other images. Only the image header is read unless the
+    image has to be downscaled, which runs in the threadpool. Images that
+    cannot be brought within budget (or any over-budget image when the
+    action is "reject") raise 413. Undecodable data is returned unchanged
+    for the pipeline's own validation.
+    """
+    if budget_bytes <= 0:
+        return data
+    try:
+        img = Image.open(BytesIO(data))
+    except Image.DecompressionBombError:
+        raise _reject()
+    except (OSError, ValueError):
+        return data
+
+    width, height = img.size
+    available = budget_bytes - reserved_bytes - len(data)
+    if estimate_image_peak_bytes(width, height, len(data)) - len(data) <= available:
+        return data
+
+    scale = math.sqrt(max(available, 0) / PIPELINE_BYTES_PER_PIXEL / (width * height))
+    target = (int(width * scale), int(height * scale))
+    if action != "downscale" or min(target) < MIN_DOWNSCALE_SIDE:
+        raise _reject(width, height)
+
+    downscaled = await run_in_threadpool(_downscale, img, target, available)
+    image_budget_actions.inc(action="downscaled")
+    annotate(image_downscaled_from=f"{width}x{height}")
+    logger.info("Downscaled %dx%d image to fit the memory budget", width, height)
+    return downscaled
@@ -0,0 +1,223 @@
+"""
+Opt-in per-request profiling for debugging.
+
+When `SKINMORPH_PROFILING_ENABLED` is set, `create_app` installs
+`ProfilingMiddleware`; requests carrying `X-Profile: 1` then run under
+cProfile and `torch.profiler`, and the results are written to
+`{SKINMORPH_PROFILE_DIR}/{request_id}/`. The middleware is not installed at
+all when profiling is disabled, and requests without the header pass
+straight through.
+
+cProfile only sees the thread it is enabled on, so work that the request
+hands to the threadpool (model inference) is profiled by wrapping it with
+`profile_in_thread`; those profiles are merged into the request's.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Profiling configuration
+PROFILING_ENABLED = os.getenv("SKINMORPH_PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_DIR = Path(os.getenv("SKINMORPH_PROFILE_DIR", "data/profiles"))
+
+PROFILE_HEADER = b"x-profile"
+REQUEST_ID_HEADER = b"x-request-id"
+# Request IDs become directory names, so only accept safe ones from clients
+_SAFE_REQUEST_ID = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}$")
+
+# Rows of the text summaries
+PROFILE_SUMMARY_ROWS = 60
+
+
+class ProfileSession:
+    """Profiles collected for one request: the event loop thread plus threadpool workers."""
+
+    def __init__(self) -> None:
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def add(self, profile: cProfile.Profile) -> None:
+        with self._lock:
+            self.profiles.append(profile)
+
+    def stats(self) -> Optional[pstats.Stats]:
+        with self._lock:
+            profiles = list(self.profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+
+_current_session: ContextVar[Optional[ProfileSession]] = ContextVar("skinmorph_profile_session", default=None)
+
+
+def profile_in_thread(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Wrap `fn` so that, when called in a worker thread on behalf of a profiled
+    request, it runs under its own cProfile profiler. Returns `fn` unchanged
+    when the current request is not being profiled.
+    """
+    session = _current_session.get()
+    if session is None:
+        return fn
+
+    @wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            session.add(profile)
+
+    return wrapper
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _write_profile(
+    directory: Path,
+    session: ProfileSession,
+    torch_profile,
+    meta: dict,
+) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    stats = session.stats()
+    if stats is not None:
+        stats.dump_stats(str(directory / "cprofile.pstats"))
+        text = io.StringIO()
+        stats.stream = text
+        stats.sort_stats("cumulative").print_stats(PROFILE_SUMMARY_ROWS)
+        (directory / "cprofile.txt").write_text(text.getvalue(), encoding="utf-8")
+    if torch_profile is not None:
+        torch_profile.export_chrome_trace(str(directory / "torch_trace.json"))
+        table = torch_profile.key_averages().table(sort_by="cpu_time_total", row_limit=PROFILE_SUMMARY_ROWS)
+        (directory / "torch_ops.txt").write_text(table, encoding="utf-8")
+    (directory / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware profiling requests that carry `X-Profile: 1`.
+    Only one request is profiled at a time, since cProfile cannot nest on the
+    event loop thread; overlapping requests are served unprofiled.
+    """
+
+    def __init__(self, app, profile_dir: Path = PROFILE_DIR) -> None:
+        self.app = app
+        self.profile_dir = profile_dir
+        self._active = threading.Lock()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or _header(scope, PROFILE_HEADER) not in ("1", "true"):
+            await self.app(scope, receive, send)
+            return
+        if not self._active.acquire(blocking=False):
+            logger.info("Profile requested for %s while another is running; skipping", scope["path"])
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            self._active.release()
+
+    async def _profile(self, scope, receive, send) -> None:
+        request_id = _header(scope, REQUEST_ID_HEADER)
+        if not request_id or not _SAFE_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (b"x-profile-id", request_id.encode("latin-1"))],
+                }
+            await send(message)
+
+        import torch.profiler
+
+        session = ProfileSession()
+        token = _current_session.set(session)
+        loop_profile = cProfile.Profile()
+        torch_profile = torch.profiler.profile(
+            activities=[torch.profiler.ProfilerActivity.CPU], record_shapes=True
+        )
+        started_at = datetime.utcnow().isoformat()
+        start = time.perf_counter()
+        torch_profile.__enter__()
+        loop_profile.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            loop_profile.disable()
+            torch_profile.__exit__(None, None, None)
+            _current_session.reset(token)
+            session.add(loop_profile)
+            meta = {
+                "request_id": request_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "started_at": started_at,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            }
+            try:
+                _write_profile(self.profile_dir / request_id, session, torch_profile, meta)
+            except Exception:
+                logger.exception("Could not write profile for request %s", request_id)
+
+
+def list_profiles(profile_dir: Path = PROFILE_DIR) -> List[dict]:
+    """Saved profiles, newest first, with their metadata and files."""
+    if not profile_dir.exists():
+        return []
+    profiles = []
+    for directory in profile_dir.iterdir():
+        meta_path = directory / "meta.json"
+        if not meta_path.is_file():
+            continue
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        meta["files"] = sorted(p.name for p in directory.iterdir() if p.is_file())
+        profiles.append(meta)
+    profiles.sort(key=lambda m: m.get("started_at", ""), reverse=True)
+    return profiles
+
+
+def get_profile_file(request_id: str, filename: str, profile_dir: Path = PROFILE_DIR) -> Optional[Path]:
+    """Path of one file of a saved profile, or None if it does not exist or the name is unsafe."""
+    if not _SAFE_REQUEST_ID.match(request_id) or not _SAFE_REQUEST_ID.match(filename):
+        return None
+    path = profile_dir / request_id / filename
+    return path if path.is_file() else None
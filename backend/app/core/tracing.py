@@ -0,0 +1,235 @@
+"""
+Slow-request tracing.
+
+A trace is attached to sampled requests on the traced routes through a
+context variable. Pipeline stages (via `metrics.stage`), MongoDB commands
+and SQL statements add their timings to the current trace, including from
+threadpool workers, which inherit the request's context. Requests slower
+than the threshold are written as one JSON line to a rotating log file;
+`summarize_slow_requests.py` turns that file into a report.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pymongo.monitoring import (
+    CommandFailedEvent,
+    CommandListener,
+    CommandStartedEvent,
+    CommandSucceededEvent,
+)
+from sqlalchemy import event
+
+from .metrics import add_stage_observer, route_template
+
+# Slow-request tracing configuration
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SKINMORPH_SLOW_REQUEST_MS", "1000"))
+# Fraction of requests on traced routes that carry a trace
+TRACE_SAMPLE_RATE = float(os.getenv("SKINMORPH_TRACE_SAMPLE_RATE", "1.0"))
+SLOW_REQUEST_LOG_PATH = Path(os.getenv("SKINMORPH_SLOW_REQUEST_LOG", "data/slow_requests.jsonl"))
+SLOW_REQUEST_LOG_MAX_BYTES = int(os.getenv("SKINMORPH_SLOW_REQUEST_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+SLOW_REQUEST_LOG_BACKUPS = int(os.getenv("SKINMORPH_SLOW_REQUEST_LOG_BACKUPS", "5"))
+
+# Inference (including uploads, which run the detector) and dashboard routes
+TRACED_PATH_PREFIXES = ("/predict", "/upload", "/dashboard")
+
+# Queries kept per trace; further queries only add to the totals
+MAX_QUERIES_PER_TRACE = 50
+
+
+class RequestTrace:
+    """Timings and attributes collected for one request."""
+
+    def __init__(self, method: str, path: str) -> None:
+        self.method = method
+        self.path = path
+        self.started_at = datetime.utcnow()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.queries: List[Dict[str, Any]] = []
+        self.query_totals: Dict[str, Dict[str, float]] = {}
+        self.attributes: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(name, {"ms": 0.0, "count": 0})
+            entry["ms"] += seconds * 1000
+            entry["count"] += 1
+
+    def add_query(self, db: str, operation: str, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            totals = self.query_totals.setdefault(db, {"ms": 0.0, "count": 0})
+            totals["ms"] += seconds * 1000
+            totals["count"] += 1
+            if len(self.queries) < MAX_QUERIES_PER_TRACE:
+                query = {"db": db, "op": operation, "ms": round(seconds * 1000, 3)}
+                if failed:
+                    query["failed"] = True
+                self.queries.append(query)
+
+    def to_record(self, route: str, status: int, duration_ms: float) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ts": self.started_at.isoformat(),
+                "method": self.method,
+                "path": self.path,
+                "route": route,
+                "status": status,
+                "duration_ms": round(duration_ms, 3),
+                "stages": {
+                    name: {"ms": round(v["ms"], 3), "count": v["count"]}
+                    for name, v in self.stages.items()
+                },
+                "query_totals": {
+                    db: {"ms": round(v["ms"], 3), "count": v["count"]}
+                    for db, v in self.query_totals.items()
+                },
+                "queries": list(self.queries),
+                **self.attributes,
+            }
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("skinmorph_request_trace", default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+def annotate(**attributes: Any) -> None:
+    """Attach attributes (image size, digest, batch size, ...) to the current trace, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        with trace._lock:
+            trace.attributes.update(attributes)
+
+
+def _record_stage(name: str, seconds: float) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_stage(name, seconds)
+
+
+add_stage_observer(_record_stage)
+
+_slow_request_logger: Optional[logging.Logger] = None
+
+
+def _get_slow_request_logger() -> logging.Logger:
+    global _slow_request_logger
+    if _slow_request_logger is None:
+        SLOW_REQUEST_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(
+            SLOW_REQUEST_LOG_PATH,
+            maxBytes=SLOW_REQUEST_LOG_MAX_BYTES,
+            backupCount=SLOW_REQUEST_LOG_BACKUPS,
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        slow_logger = logging.getLogger("skinmorph.slow_requests")
+        slow_logger.setLevel(logging.INFO)
+        slow_logger.propagate = False
+        slow_logger.addHandler(handler)
+        _slow_request_logger = slow_logger
+    return _slow_request_logger
+
+
+class MongoCommandTracer(CommandListener):
+    """Adds MongoDB command timings to the current trace."""
+
+    def __init__(self) -> None:
+        self._operations: Dict[int, str] = {}
+
+    def started(self, event: CommandStartedEvent) -> None:
+        if _current_trace.get() is not None:
+            collection = event.command.get(event.command_name)
+            name = f"{event.command_name} {collection}" if isinstance(collection, str) else event.command_name
+            self._operations[event.request_id] = name
+
+    def _finish(self, event, failed: bool) -> None:
+        operation = self._operations.pop(event.request_id, None)
+        trace = _current_trace.get()
+        if trace is not None and operation is not None:
+            trace.add_query("mongo", operation, event.duration_micros / 1_000_000, failed=failed)
+
+    def succeeded(self, event: CommandSucceededEvent) -> None:
+        self._finish(event, failed=False)
+
+    def failed(self, event: CommandFailedEvent) -> None:
+        self._finish(event, failed=True)
+
+
+mongo_command_tracer = MongoCommandTracer()
+
+
+def install_sql_tracing(engine) -> None:
+    """Add SQL statement timings from `engine` to the current trace."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current_trace.get() is not None:
+            conn.info.setdefault("skinmorph_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        trace = _current_trace.get()
+        starts = conn.info.get("skinmorph_query_start")
+        if trace is not None and starts:
+            trace.add_query("sql", " ".join(statement.split())[:80], time.perf_counter() - starts.pop())
+
+
+class SlowRequestMiddleware:
+    """
+    Pure ASGI middleware tracing sampled requests on the traced routes and
+    logging those slower than `threshold_ms`.
+    """
+
+    def __init__(
+        self,
+        app,
+        threshold_ms: float = SLOW_REQUEST_THRESHOLD_MS,
+        sample_rate: float = TRACE_SAMPLE_RATE,
+        prefixes=TRACED_PATH_PREFIXES,
+    ) -> None:
+        self.app = app
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if (
+            scope["type"] != "http"
+            or not scope["path"].startswith(self.prefixes)
+            or (self.sample_rate < 1.0 and random.random() >= self.sample_rate)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope["method"], scope["path"])
+        token = _current_trace.set(trace)
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            duration_ms = (time.perf_counter() - start) * 1000
+            if duration_ms >= self.threshold_ms:
+                record = trace.to_record(route_template(scope), status_code, duration_ms)
+                _get_slow_request_logger().info(json.dumps(record, default=str))
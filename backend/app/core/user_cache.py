@@ -0,0 +1,94 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from .metrics import registry
+
+# User cache configuration
+USER_CACHE_MAX_SIZE = int(os.getenv("SKINMORPH_USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("SKINMORPH_USER_CACHE_TTL_SECONDS", "60"))
+
+
+class UserCache:
+    """
+    TTL and size-bounded LRU cache of authenticated user documents keyed by the
+    token subject (the user ID). Only touched from the event loop, so no locking.
+    """
+
+    def __init__(
+        self,
+        max_size: int = USER_CACHE_MAX_SIZE,
+        ttl_seconds: float = USER_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: str) -> Optional[dict]:
+        """Return a copy of the cached user, or None if absent or expired."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, user = entry
+        if expires_at <= self._clock():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return dict(user)
+
+    def set(self, user_id: str, user: dict) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[user_id] = (self._clock() + self.ttl_seconds, dict(user))
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user so the next request reloads it from the database."""
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+user_cache = UserCache()
+
+registry.callback(
+    "skinmorph_user_cache_lookups_total",
+    "Current-user cache lookups by result.",
+    lambda: {("hit",): user_cache.hits, ("miss",): user_cache.misses},
+    ["result"],
+    kind="counter",
+)
+registry.callback(
+    "skinmorph_user_cache_entries", "Users held in the current-user cache.",
+    lambda: {(): user_cache.stats()["size"]},
+)
+
+
+def invalidate_user(user_id: str) -> None:
+    """Invalidation hook: call whenever a user document is modified or deleted."""
+    user_cache.invalidate(str(user_id))
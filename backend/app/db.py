@@ -1,8 +1,19 @@
+import asyncio
+import logging
 import os
+import threading
+import time
 from pathlib import Path
+from typing import Optional
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.monitoring import ConnectionPoolListener
+
+from .core.metrics import registry
+from .core.tracing import install_sql_tracing, mongo_command_tracer
+
+logger = logging.getLogger(__name__)
 
 # --- SQLite Setup (Legacy/Existing) ---
 DB_URL = os.getenv("SKINMORPH_DB_URL", "sqlite:///./data/skinmorph.db")
@@ -17,6 +28,8 @@ engine = create_engine(
     connect_args={"check_same_thread": False} if DB_URL.startswith("sqlite") else {},
 )
 
+install_sql_tracing(engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -34,16 +47,230 @@ def get_db():
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 MONGODB_DATABASE = os.getenv("MONGODB_DATABASE", "skinmorph")
 
+# Connection pool settings are per worker process: with N uvicorn workers the
+# server sees up to N * MONGODB_MAX_POOL_SIZE connections.
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000"))
+MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000"))
+MONGODB_SOCKET_TIMEOUT_MS = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "30000"))
+# Comma-separated wire compressors, e.g. "zstd,snappy,zlib" (zstd/snappy need extra packages)
+MONGODB_COMPRESSORS = os.getenv("MONGODB_COMPRESSORS", "")
+
+# Upper bound on the database check in /health/ready
+MONGODB_HEALTH_TIMEOUT_SECONDS = float(os.getenv("MONGODB_HEALTH_TIMEOUT_SECONDS", "1.0"))
+# How long a ping result is reused, so frequent probes do not each hit the database
+MONGODB_HEALTH_CACHE_SECONDS = float(os.getenv("MONGODB_HEALTH_CACHE_SECONDS", "5.0"))
+
+
+class PoolMetrics(ConnectionPoolListener):
+    """
+    Connection pool event listener that keeps utilisation counters.
+    Events arrive on driver threads, hence the lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+
+    def _add(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        self._add(pool_clears=1)
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        self._add(open_connections=1)
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        self._add(open_connections=-1)
+
+    def connection_check_out_started(self, event) -> None:
+        self._add(waiting=1)
+
+    def connection_check_out_failed(self, event) -> None:
+        self._add(waiting=-1, checkout_failures=1)
+
+    def connection_checked_out(self, event) -> None:
+        self._add(waiting=-1, checked_out=1, checkouts=1)
+
+    def connection_checked_in(self, event) -> None:
+        self._add(checked_out=-1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_size": MONGODB_MAX_POOL_SIZE,
+                "min_pool_size": MONGODB_MIN_POOL_SIZE,
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "utilisation": self.checked_out / MONGODB_MAX_POOL_SIZE if MONGODB_MAX_POOL_SIZE else 0.0,
+                "wait_queue": self.waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.pool_clears,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+def _pool_connection_samples() -> dict:
+    snapshot = pool_metrics.snapshot()
+    return {
+        ("open",): snapshot["open_connections"],
+        ("checked_out",): snapshot["checked_out"],
+        ("waiting",): snapshot["wait_queue"],
+    }
+
+
+def _pool_checkout_samples() -> dict:
+    snapshot = pool_metrics.snapshot()
+    return {("ok",): snapshot["checkouts"], ("failed",): snapshot["checkout_failures"]}
+
+
+registry.callback(
+    "skinmorph_mongo_pool_connections",
+    "MongoDB pool connections by state.",
+    _pool_connection_samples,
+    ["state"],
+)
+registry.callback(
+    "skinmorph_mongo_pool_checkouts_total",
+    "MongoDB connection checkouts by result.",
+    _pool_checkout_samples,
+    ["result"],
+    kind="counter",
+)
+
 _mongo_client = None
 
 
-def get_db_client():
+def connect_mongo() -> AsyncIOMotorClient:
+    """
+    Create the process-wide MongoDB client with the configured pool settings.
+    Called from the FastAPI lifespan; scripts get a client lazily via
+    get_db_client().
+    """
     global _mongo_client
     if _mongo_client is None:
-        _mongo_client = AsyncIOMotorClient(MONGODB_URL)
+        options = {
+            "maxPoolSize": MONGODB_MAX_POOL_SIZE,
+            "minPoolSize": MONGODB_MIN_POOL_SIZE,
+            "maxIdleTimeMS": MONGODB_MAX_IDLE_TIME_MS,
+            "waitQueueTimeoutMS": MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            "connectTimeoutMS": MONGODB_CONNECT_TIMEOUT_MS,
+            "socketTimeoutMS": MONGODB_SOCKET_TIMEOUT_MS,
+            "event_listeners": [pool_metrics, mongo_command_tracer],
+        }
+        if MONGODB_COMPRESSORS:
+            options["compressors"] = MONGODB_COMPRESSORS
+        _mongo_client = AsyncIOMotorClient(MONGODB_URL, **options)
     return _mongo_client
 
 
+def set_db_client(client) -> None:
+    """
+    Use `client` as the process-wide MongoDB client instead of connecting to
+    MONGODB_URL, e.g. an in-process stand-in such as mongomock-motor for load
+    tests. Call before the app starts.
+    """
+    global _mongo_client
+    _mongo_client = client
+
+
+def close_mongo() -> None:
+    """Close the MongoDB client and its connection pool."""
+    global _mongo_client
+    if _mongo_client is not None:
+        _mongo_client.close()
+        _mongo_client = None
+
+
+def get_db_client():
+    return connect_mongo()
+
+
 def get_database():
     client = get_db_client()
-    return client[MONGODB_DATABASE]
\ No newline at end of file
+    return client[MONGODB_DATABASE]
+
+
+_health_ping: Optional[dict] = None
+_health_checked_at = 0.0
+_health_lock = asyncio.Lock()
+
+
+async def _ping_database() -> dict:
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(
+            get_db_client().admin.command("ping"), timeout=MONGODB_HEALTH_TIMEOUT_SECONDS
+        )
+        status = "ok"
+    except Exception:
+        status = "unreachable"
+    return {"status": status, "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+
+async def check_database() -> dict:
+    """
+    Ping MongoDB for the readiness endpoint, bounded by
+    MONGODB_HEALTH_TIMEOUT_SECONDS. The result is reused for
+    MONGODB_HEALTH_CACHE_SECONDS and concurrent probes share one ping.
+    """
+    global _health_ping, _health_checked_at
+    async with _health_lock:
+        age = time.monotonic() - _health_checked_at
+        if _health_ping is None or age >= MONGODB_HEALTH_CACHE_SECONDS:
+            _health_ping = await _ping_database()
+            _health_checked_at = time.monotonic()
+            age = 0.0
+    return {**_health_ping, "age_seconds": round(age, 2), "pool": pool_metrics.snapshot()}
+
+
+async def ensure_indexes() -> None:
+    """
+    Create the MongoDB indexes the services rely on.
+    Index creation is idempotent; failures are logged rather than raised so an
+    unreachable database does not prevent the API from starting.
+    """
+    db = get_database()
+    try:
+        # Keyset pagination over a user's prediction history
+        await db["predictions"].create_index(
+            [("user_id", 1), ("created_at", -1), ("_id", -1)], name="user_history"
+        )
+        # Dermatologist patient listing and name/email prefix search
+        await db["users"].create_index([("role", 1), ("_id", 1)], name="role_id")
+        await db["users"].create_index([("role", 1), ("name", 1)], name="role_name")
+        await db["users"].create_index([("role", 1), ("email", 1)], name="role_email")
+        # Dermatologist triage queue, most urgent first
+        await db["triage_queue"].create_index(
+            [("reviewed", 1), ("priority", -1), ("confidence", -1), ("created_at", -1)],
+            name="triage_order",
+        )
+    except Exception as exc:
+        logger.warning("Could not create MongoDB indexes: %s", exc)
@@ -1,10 +1,41 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 # app/main.py
 from sanity_check import is_skin_image
 import cv2
-from .routers import auth, inference, timeline, uploads, reports, dashboard, dermatologist
-from .db import Base, engine
+from .core.loop_monitor import start_loop_monitor, stop_loop_monitor
+from .core.memory import MemorySamplingMiddleware
+from .core.metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, registry
+from .core.profiling import PROFILING_ENABLED, ProfilingMiddleware
+from .core.tracing import SlowRequestMiddleware
+from .routers import admin, auth, inference, timeline, uploads, reports, dashboard, dermatologist
+from .db import Base, engine, check_database, close_mongo, connect_mongo, ensure_indexes
+from .services.prediction_buffer import start_prediction_buffer, stop_prediction_buffer
+from .services.export_service import start_export_worker, stop_export_worker
+from .services.report_service import shutdown_report_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_loop_monitor()
+    connect_mongo()
+    # Index creation runs in the background so a slow or unreachable MongoDB
+    # does not hold up startup.
+    index_task = asyncio.create_task(ensure_indexes())
+    await start_prediction_buffer()
+    await start_export_worker()
+    yield
+    await stop_export_worker()
+    # Flush queued prediction writes before the worker exits
+    await stop_prediction_buffer()
+    index_task.cancel()
+    shutdown_report_pool()
+    close_mongo()
+    await stop_loop_monitor()
 
 
 def create_app() -> FastAPI:
@@ -12,6 +43,7 @@ def create_app() -> FastAPI:
         title="SkinMorph API",
         version="0.1.0",
         description="Skin disease detection, prediction, and recommendations prototype.",
+        lifespan=lifespan,
     )
 
     app.add_middleware(
@@ -21,22 +53,45 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(MemorySamplingMiddleware)
+    if PROFILING_ENABLED:
+        # Debug only; not installed at all unless enabled
+        app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(SlowRequestMiddleware)
+    app.add_middleware(MetricsMiddleware)
 
     # For SQLite/local dev we auto-create tables.
     # For production/PostgreSQL, prefer Alembic migrations instead.
     Base.metadata.create_all(bind=engine)
 
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> Response:
+        return Response(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
     @app.get("/health")
     async def health() -> dict:
+        # Liveness: no I/O, so a slow database does not get the process restarted
         return {"status": "ok"}
 
+    @app.get("/health/ready")
+    async def ready() -> Response:
+        database = await check_database()
+        ok = database["status"] == "ok"
+        return ORJSONResponse(
+            {"status": "ok" if ok else "unavailable", "database": database},
+            status_code=200 if ok else 503,
+        )
+
+    # Routers with large payloads (probabilities, base64 overlays, history
+    # arrays) serialize with orjson
     app.include_router(auth.router)
-    app.include_router(inference.router)
+    app.include_router(inference.router, default_response_class=ORJSONResponse)
     app.include_router(timeline.router)
     app.include_router(uploads.router)
     app.include_router(reports.router)
-    app.include_router(dashboard.router)
-    app.include_router(dermatologist.router)
+    app.include_router(dashboard.router, default_response_class=ORJSONResponse)
+    app.include_router(dermatologist.router, default_response_class=ORJSONResponse)
+    app.include_router(admin.router)
 
     return app
 
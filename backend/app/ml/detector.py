@@ -1,3 +1,4 @@
+import os
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional
@@ -6,10 +7,15 @@ import torch
 import torch.nn as nn
 from torchvision.models import mobilenet_v3_small, MobileNet_V3_Small_Weights
 
+from ..core.metrics import stage
 from .preprocessing import preprocess_image_bytes
 from .explainability import GradCAMGenerator
 
 
+# Start from ImageNet weights (downloaded on first use). Disabling this gives
+# randomly initialised backbones of the same cost, e.g. for offline load tests.
+PRETRAINED_BACKBONE = os.getenv("SKINMORPH_PRETRAINED_BACKBONE", "true").lower() in ("1", "true", "yes")
+
 CLASS_NAMES: List[str] = [
     "benign_nevus",
     "melanoma_suspect",
@@ -36,7 +42,7 @@ class DetectorModel:
         self.gradcam = GradCAMGenerator(self.model, target_layer_name="features.12")
 
     def _build_model(self) -> nn.Module:
-        weights = MobileNet_V3_Small_Weights.DEFAULT
+        weights = MobileNet_V3_Small_Weights.DEFAULT if PRETRAINED_BACKBONE else None
         backbone = mobilenet_v3_small(weights=weights)
         in_features = backbone.classifier[3].in_features
         backbone.classifier[3] = nn.Linear(in_features, self.config.num_classes)
@@ -50,10 +56,10 @@ class DetectorModel:
         return backbone
 
     def predict_image_bytes(
-        self, data: bytes, metadata: Optional[str] = None
+        self, data: bytes, metadata: Optional[str] = None, explain: bool = True
     ) -> Dict[str, Any]:
         x = preprocess_image_bytes(data).to(self.device)
-        with torch.no_grad():
+        with stage("forward"), torch.no_grad():
             logits = self.model(x)
             probs = torch.softmax(logits, dim=1).cpu().numpy()[0]
 
@@ -64,7 +70,8 @@ class DetectorModel:
         predictions.sort(key=lambda p: p["probability"], reverse=True)
         top = predictions[0]
 
-        heatmap_png_b64 = self.gradcam.generate_overlay_b64(data)
+        # Grad-CAM needs a second forward pass plus a backward pass
+        heatmap_png_b64 = self.gradcam.generate_overlay_b64(data) if explain else None
 
         return {
             "top_class": top,
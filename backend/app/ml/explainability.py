@@ -1,12 +1,13 @@
 import base64
+import threading
 from io import BytesIO
-from typing import Optional
 
 import torch
 import torch.nn as nn
 from PIL import Image
 import numpy as np
 
+from ..core.metrics import stage
 from .preprocessing import load_image_from_bytes, IMG_SIZE
 
 
@@ -15,8 +16,10 @@ class GradCAMGenerator:
         self.model = model
         self.model.eval()
         self.target_layer_name = target_layer_name
-        self.gradients: Optional[torch.Tensor] = None
-        self.activations: Optional[torch.Tensor] = None
+        # The model is shared by concurrent inferences in the threadpool, so
+        # captures are per thread, and only made while that thread is
+        # generating an overlay (not during plain forward passes).
+        self._local = threading.local()
         self._register_hooks()
 
     def _register_hooks(self) -> None:
@@ -25,20 +28,22 @@ class GradCAMGenerator:
             return
 
         def forward_hook(_, __, output):
-            self.activations = output
+            if getattr(self._local, "capturing", False):
+                self._local.activations = output
 
         def backward_hook(_, grad_in, grad_out):
-            self.gradients = grad_out[0]
+            if getattr(self._local, "capturing", False):
+                self._local.gradients = grad_out[0]
 
         layer.register_forward_hook(forward_hook)
         layer.register_backward_hook(backward_hook)
 
     def _compute_cam(self, class_idx: int) -> np.ndarray:
-        if self.activations is None or self.gradients is None:
+        activations = getattr(self._local, "activations", None)
+        grads = getattr(self._local, "gradients", None)
+        if activations is None or grads is None:
             raise RuntimeError("No activations/gradients captured for Grad-CAM")
 
-        grads = self.gradients
-        activations = self.activations
         weights = grads.mean(dim=(2, 3), keepdim=True)
         cam = (weights * activations).sum(dim=1, keepdim=True)
         cam = torch.relu(cam)
@@ -50,32 +55,37 @@ class GradCAMGenerator:
 
     def generate_overlay_b64(self, image_bytes: bytes) -> str:
         # Minimal single-class Grad-CAM: assume max-probability class
-        img = load_image_from_bytes(image_bytes)
-        img_resized = img.resize((IMG_SIZE, IMG_SIZE))
-        x = torch.from_numpy(np.array(img_resized)).float() / 255.0
-        x = x.permute(2, 0, 1).unsqueeze(0)
-
-        x.requires_grad = True
-        logits = self.model(x)
-        score, class_idx = torch.max(logits, dim=1)
-        self.model.zero_grad()
-        score.backward()
-
-        cam = self._compute_cam(int(class_idx.item()))
-        heatmap = Image.fromarray(cam).resize(img_resized.size)
-        heatmap = heatmap.convert("RGBA")
-
-        overlay = img_resized.convert("RGBA")
-        alpha = 0.4
-        blended = Image.blend(overlay, heatmap, alpha=alpha)
-
-        buffer = BytesIO()
-        blended.save(buffer, format="PNG")
-        b64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+        with stage("gradcam_backward"):
+            img = load_image_from_bytes(image_bytes)
+            img_resized = img.resize((IMG_SIZE, IMG_SIZE))
+            x = torch.from_numpy(np.array(img_resized)).float() / 255.0
+            x = x.permute(2, 0, 1).unsqueeze(0)
+
+            x.requires_grad = True
+            self._local.capturing = True
+            try:
+                logits = self.model(x)
+                score, class_idx = torch.max(logits, dim=1)
+                # Gradients w.r.t. the input only: parameter .grad buffers are
+                # shared between threads and not needed for the CAM
+                torch.autograd.backward(score, inputs=[x])
+                cam = self._compute_cam(int(class_idx.item()))
+            finally:
+                # Release the captured tensors rather than keeping them alive
+                # until this thread's next request
+                self._local.capturing = False
+                self._local.activations = None
+                self._local.gradients = None
+
+        with stage("gradcam_png"):
+            heatmap = Image.fromarray(cam).resize(img_resized.size)
+            heatmap = heatmap.convert("RGBA")
+
+            overlay = img_resized.convert("RGBA")
+            alpha = 0.4
+            blended = Image.blend(overlay, heatmap, alpha=alpha)
+
+            buffer = BytesIO()
+            blended.save(buffer, format="PNG")
+            b64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
         return b64
-
-
-
-
-
-
@@ -5,9 +5,11 @@ from typing import Any, Dict, List, Optional
 import base64
 import torch
 import torch.nn as nn
+from torch.nn.utils.rnn import pack_padded_sequence
 from PIL import Image, ImageEnhance
 from torchvision.models import mobilenet_v3_small, MobileNet_V3_Small_Weights
 
+from .detector import PRETRAINED_BACKBONE
 from .preprocessing import preprocess_image_bytes, load_image_from_bytes, IMG_SIZE
 
 
@@ -32,9 +34,19 @@ class TemporalHead(nn.Module):
         )
         self.out_risk = nn.Linear(cfg.hidden_dim, len(TIMEPOINTS) * 3)
 
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
-        h, _ = self.lstm(x)
-        last = h[:, -1, :]
+    def forward(self, x: torch.Tensor, lengths: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """
+        x: (B, T, F). For a padded batch of ragged sequences pass their
+        `lengths`; the LSTM then runs on the packed batch and each sequence's
+        output is taken at its own last frame, not at the padding.
+        """
+        if lengths is None:
+            h, _ = self.lstm(x)
+            last = h[:, -1, :]
+        else:
+            packed = pack_padded_sequence(x, lengths.cpu(), batch_first=True, enforce_sorted=False)
+            _, (h_n, _) = self.lstm(packed)
+            last = h_n[-1]
         return self.out_risk(last)
 
 
@@ -48,7 +60,7 @@ class SkinMorphPredictor:
         self.head.eval()
 
     def _build_feature_extractor(self) -> nn.Module:
-        weights = MobileNet_V3_Small_Weights.DEFAULT
+        weights = MobileNet_V3_Small_Weights.DEFAULT if PRETRAINED_BACKBONE else None
         backbone = mobilenet_v3_small(weights=weights)
         backbone.classifier = nn.Identity()
         return backbone
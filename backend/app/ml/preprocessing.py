@@ -1,12 +1,17 @@
 from io import BytesIO
-from typing import Tuple
+from typing import Optional, Tuple
 
 from PIL import Image
 import torchvision.transforms as T
 import torch
 
+from ..core.metrics import stage
+from ..core.tracing import annotate
+
 
 IMG_SIZE: int = 224
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
 
 
 def get_base_transform() -> T.Compose:
@@ -14,7 +19,7 @@ def get_base_transform() -> T.Compose:
         [
             T.Resize((IMG_SIZE, IMG_SIZE)),
             T.ToTensor(),
-            T.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+            T.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD),
         ]
     )
 
@@ -27,19 +32,53 @@ def get_augmentation_transform() -> T.Compose:
             T.RandomHorizontalFlip(),
             T.ColorJitter(brightness=0.1, contrast=0.1),
             T.ToTensor(),
-            T.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+            T.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD),
         ]
     )
 
 
+def normalize_uint8_batch(x: torch.Tensor) -> torch.Tensor:
+    """(N, 3, H, W) uint8 batch to the float input `get_base_transform` produces."""
+    mean = torch.tensor(IMAGENET_MEAN, device=x.device).view(1, 3, 1, 1)
+    std = torch.tensor(IMAGENET_STD, device=x.device).view(1, 3, 1, 1)
+    return (x.float() / 255.0 - mean) / std
+
+
+def augment_uint8_batch(
+    x: torch.Tensor, brightness: float = 0.1, contrast: float = 0.1, generator: Optional[torch.Generator] = None
+) -> torch.Tensor:
+    """
+    Batched equivalent of `get_augmentation_transform` for already resized
+    (N, 3, H, W) uint8 images: per-sample random horizontal flip and
+    brightness/contrast jitter, returned normalized as float.
+    """
+    n = x.shape[0]
+    flip = (torch.rand(n, generator=generator) < 0.5).to(x.device).view(n, 1, 1, 1)
+    x = torch.where(flip, x.flip(-1), x)
+
+    b = (1 + (torch.rand(n, generator=generator) * 2 - 1) * brightness).to(x.device).view(n, 1, 1, 1)
+    c = (1 + (torch.rand(n, generator=generator) * 2 - 1) * contrast).to(x.device).view(n, 1, 1, 1)
+    img = (x.float() / 255.0 * b).clamp(0, 1)
+    # Contrast blends with the per-image mean grayscale, as ColorJitter does
+    gray = (0.299 * img[:, 0] + 0.587 * img[:, 1] + 0.114 * img[:, 2]).mean(dim=(1, 2)).view(n, 1, 1, 1)
+    img = (c * img + (1 - c) * gray).clamp(0, 1)
+
+    mean = torch.tensor(IMAGENET_MEAN, device=x.device).view(1, 3, 1, 1)
+    std = torch.tensor(IMAGENET_STD, device=x.device).view(1, 3, 1, 1)
+    return (img - mean) / std
+
+
 def load_image_from_bytes(data: bytes) -> Image.Image:
     return Image.open(BytesIO(data)).convert("RGB")
 
 
 def preprocess_image_bytes(data: bytes) -> torch.Tensor:
-    img = load_image_from_bytes(data)
-    transform = get_base_transform()
-    return transform(img).unsqueeze(0)
+    with stage("decode"):
+        img = load_image_from_bytes(data)
+    annotate(image_width=img.width, image_height=img.height)
+    with stage("preprocess"):
+        transform = get_base_transform()
+        return transform(img).unsqueeze(0)
 
 
 
@@ -1,61 +1,225 @@
 from __future__ import annotations
 
+import heapq
 import json
-from dataclasses import dataclass
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
+logger = logging.getLogger(__name__)
 
 RULES_PATH = Path(__file__).with_name("recommendation_rules.json")
 
+# Minimum seconds between checks of the rules file's mtime
+RULES_RELOAD_INTERVAL_SECONDS = float(os.getenv("SKINMORPH_RECOMMENDATION_RELOAD_SECONDS", "2.0"))
+# Number of top detector classes evaluated against the rules
+RECOMMENDATION_TOP_K = int(os.getenv("SKINMORPH_RECOMMENDATION_TOP_K", "3"))
 
-def _load_rules() -> List[Dict[str, Any]]:
-    if RULES_PATH.exists():
+FALLBACK_RULES: List[Dict[str, Any]] = [
+    {
+        "id": "default_general",
+        "if_top_class": None,
+        "min_prob": 0.0,
+        "recommendations": [],
+    }
+]
+
+GENERAL_RECOMMENDATION: Dict[str, Any] = {
+    "title": "General skin health guidance",
+    "summary": "Use daily broad-spectrum SPF 30+ sunscreen and monitor lesions for change in size, shape, or color.",
+    "evidence_level": "B",
+    "when_to_see_doctor": "If any lesion changes rapidly, bleeds, or is painful.",
+}
+
+
+def validate_rules(rules: Any) -> List[Dict[str, Any]]:
+    """Check the structure of a rules list. Raises ValueError describing the first problem."""
+    if not isinstance(rules, list):
+        raise ValueError("Rules must be a JSON list")
+    seen = set()
+    for i, rule in enumerate(rules):
+        if not isinstance(rule, dict):
+            raise ValueError(f"Rule {i} must be an object")
+        rule_id = rule.get("id")
+        if not isinstance(rule_id, str) or not rule_id:
+            raise ValueError(f"Rule {i} needs a non-empty string 'id'")
+        if rule_id in seen:
+            raise ValueError(f"Duplicate rule id '{rule_id}'")
+        seen.add(rule_id)
+        target = rule.get("if_top_class")
+        if target is not None and not isinstance(target, str):
+            raise ValueError(f"Rule '{rule_id}': 'if_top_class' must be a string or null")
+        min_prob = rule.get("min_prob", 0.0)
+        if isinstance(min_prob, bool) or not isinstance(min_prob, (int, float)) or not 0.0 <= min_prob <= 1.0:
+            raise ValueError(f"Rule '{rule_id}': 'min_prob' must be a number between 0 and 1")
+        recs = rule.get("recommendations", [])
+        if not isinstance(recs, list) or not all(isinstance(r, dict) and "title" in r for r in recs):
+            raise ValueError(f"Rule '{rule_id}': 'recommendations' must be a list of objects with a 'title'")
+    return rules
+
+
+def _read_rules(path: Path) -> List[Dict[str, Any]]:
+    return validate_rules(json.loads(path.read_text(encoding="utf-8")))
+
+
+def _load_rules(path: Path = RULES_PATH) -> List[Dict[str, Any]]:
+    if path.exists():
         try:
-            return json.loads(RULES_PATH.read_text(encoding="utf-8"))
-        except json.JSONDecodeError:
-            pass
+            return _read_rules(path)
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring invalid recommendation rules in %s: %s", path, exc)
     # Fallback minimal rules if JSON is missing or invalid
-    return [
-        {
-            "id": "default_general",
-            "if_top_class": None,
-            "min_prob": 0.0,
-            "recommendations": [],
-        }
-    ]
+    return FALLBACK_RULES
 
 
 RULES: List[Dict[str, Any]] = _load_rules()
 
+# (file position, rule id, recommendations)
+_CompiledRule = Tuple[int, str, List[Dict[str, Any]]]
+
+
+class _ThresholdIndex:
+    """
+    Rules for one class, sorted by threshold. `matches[n]` holds the rules
+    with the n lowest thresholds in file order, so the rules matched by a
+    probability are found with a single binary search.
+    """
+
+    __slots__ = ("thresholds", "matches")
+
+    def __init__(self, entries: List[Tuple[float, _CompiledRule]]) -> None:
+        entries.sort(key=lambda e: e[0])
+        self.thresholds = [threshold for threshold, _ in entries]
+        self.matches: List[List[_CompiledRule]] = [[]]
+        for n in range(1, len(entries) + 1):
+            self.matches.append(sorted((rule for _, rule in entries[:n]), key=lambda r: r[0]))
+
+    def match(self, probability: float) -> List[_CompiledRule]:
+        return self.matches[bisect_right(self.thresholds, probability)]
+
+
+class RuleIndex:
+    """Immutable compiled form of a rules list: one threshold index per class plus wildcard rules."""
+
+    def __init__(self, rules: List[Dict[str, Any]]) -> None:
+        by_class: Dict[str, List[Tuple[float, _CompiledRule]]] = {}
+        wildcard: List[Tuple[float, _CompiledRule]] = []
+        for position, rule in enumerate(rules):
+            entry = (
+                float(rule.get("min_prob", 0.0)),
+                (position, rule["id"], list(rule.get("recommendations", []))),
+            )
+            target = rule.get("if_top_class")
+            if target is None:
+                wildcard.append(entry)
+            else:
+                by_class.setdefault(target, []).append(entry)
+        self.by_class = {label: _ThresholdIndex(entries) for label, entries in by_class.items()}
+        self.wildcard = _ThresholdIndex(wildcard)
+
+    def match(self, ranked: List[Tuple[Optional[str], float]]) -> List[_CompiledRule]:
+        """
+        Rules matched by the ranked (label, probability) classes, highest
+        ranked class first and in file order within each class. Wildcard rules
+        are matched against the top class, as if listed alongside its rules.
+        """
+        matched: List[_CompiledRule] = []
+        for rank, (label, probability) in enumerate(ranked):
+            index = self.by_class.get(label)
+            class_rules = index.match(probability) if index is not None else []
+            if rank == 0:
+                class_rules = list(heapq.merge(class_rules, self.wildcard.match(probability)))
+            matched.extend(class_rules)
+        return matched
+
 
 @dataclass
 class RecommendationEngine:
+    rules_path: Path = RULES_PATH
+    reload_interval: float = RULES_RELOAD_INTERVAL_SECONDS
+    top_k: int = RECOMMENDATION_TOP_K
+    _index: RuleIndex = field(init=False, repr=False)
+    _mtime: Optional[float] = field(default=None, init=False, repr=False)
+    _next_check: float = field(default=0.0, init=False, repr=False)
+    _reload_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        rules = RULES if self.rules_path == RULES_PATH else _load_rules(self.rules_path)
+        self._index = RuleIndex(rules)
+        self._mtime = self._current_mtime()
+        self._next_check = time.monotonic() + self.reload_interval
+
+    def _current_mtime(self) -> Optional[float]:
+        try:
+            return self.rules_path.stat().st_mtime
+        except OSError:
+            return None
+
+    def reload_if_changed(self) -> bool:
+        """
+        Recompile the rules if the file's mtime changed, checking at most once
+        per `reload_interval`. Invalid files are logged and the current rules
+        kept. Returns True if new rules were swapped in.
+        """
+        now = time.monotonic()
+        if now < self._next_check or not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            self._next_check = now + self.reload_interval
+            mtime = self._current_mtime()
+            if mtime is None or mtime == self._mtime:
+                return False
+            try:
+                rules = _read_rules(self.rules_path)
+            except (OSError, ValueError) as exc:
+                logger.warning("Keeping previous recommendation rules; %s is invalid: %s", self.rules_path, exc)
+                self._mtime = mtime
+                return False
+            # Single reference assignment, so readers see either the old or the new index
+            self._index = RuleIndex(rules)
+            self._mtime = mtime
+            if self.rules_path == RULES_PATH:
+                global RULES
+                RULES = rules
+            logger.info("Reloaded %d recommendation rules from %s", len(rules), self.rules_path)
+            return True
+        finally:
+            self._reload_lock.release()
+
     def get_recommendations(
-        self, detector_output: Dict[str, Any]
+        self, detector_output: Dict[str, Any], top_k: Optional[int] = None
     ) -> List[Dict[str, Any]]:
-        top = detector_output.get("top_class") or {}
-        label = top.get("label")
-        prob = float(top.get("probability", 0.0))
+        """
+        Recommendations for the detector's top-k classes, each rule applied at
+        most once. Class-specific rules are matched against that class's
+        probability; rules without a class against the top class.
+        """
+        self.reload_if_changed()
+        index = self._index
+
+        ranked = [
+            (c.get("label"), float(c.get("probability", 0.0)))
+            for c in detector_output.get("all_classes") or []
+        ]
+        if not ranked:
+            top = detector_output.get("top_class") or {}
+            ranked = [(top.get("label"), float(top.get("probability", 0.0)))]
+        ranked = ranked[: max(1, top_k or self.top_k)]
 
         recs: List[Dict[str, Any]] = []
-        for rule in RULES:
-            target = rule.get("if_top_class")
-            if target is not None and target != label:
-                continue
-            if prob >= float(rule.get("min_prob", 0.0)):
-                recs.extend(rule.get("recommendations", []))
+        seen = set()
+        for _, rule_id, rule_recs in index.match(ranked):
+            if rule_id not in seen:
+                seen.add(rule_id)
+                recs.extend(rule_recs)
 
         if not recs:
-            recs.append(
-                {
-                    "title": "General skin health guidance",
-                    "summary": "Use daily broad-spectrum SPF 30+ sunscreen and monitor lesions for change in size, shape, or color.",
-                    "evidence_level": "B",
-                    "when_to_see_doctor": "If any lesion changes rapidly, bleeds, or is painful.",
-                }
-            )
+            recs.append(dict(GENERAL_RECOMMENDATION))
 
         return recs
 
-
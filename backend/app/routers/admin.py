@@ -0,0 +1,92 @@
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import FileResponse
+
+from ..core.loop_monitor import LOOP_BLOCK_THRESHOLD_MS, LOOP_WATCHDOG_ENABLED, recent_blocks
+from ..core.memory import (
+    IMAGE_BUDGET_ACTION,
+    IMAGE_MEMORY_BUDGET_BYTES,
+    current_rss_bytes,
+    module_memory,
+    peak_rss_bytes,
+    recent_samples,
+)
+from ..core.profiling import get_profile_file, list_profiles
+from ..services.ml_service import loaded_models
+
+# Admin endpoints are disabled unless a token is configured
+ADMIN_TOKEN = os.getenv("SKINMORPH_ADMIN_TOKEN", "")
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Require the configured admin token in the `X-Admin-Token` header."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_admin_token)],
+    include_in_schema=False,
+)
+
+
+@router.get("/profiles")
+async def get_profiles() -> dict:
+    """
+    List saved request profiles, newest first.
+    Profiles are recorded for requests sent with `X-Profile: 1` while
+    SKINMORPH_PROFILING_ENABLED is set.
+    """
+    profiles = list_profiles()
+    return {"profiles": profiles, "count": len(profiles)}
+
+
+@router.get("/profiles/{request_id}/{filename}")
+async def download_profile_file(request_id: str, filename: str) -> FileResponse:
+    """
+    Download one file of a saved profile: `cprofile.pstats` (load with
+    `pstats` or snakeviz), `cprofile.txt`, `torch_trace.json` (open in
+    chrome://tracing or Perfetto), `torch_ops.txt` or `meta.json`.
+    """
+    path = get_profile_file(request_id, filename)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile file not found")
+    return FileResponse(path, filename=f"{request_id}_{filename}")
+
+
+@router.get("/memory")
+async def get_memory() -> dict:
+    """
+    Process memory, the parameter/buffer/gradient sizes of each loaded model,
+    the per-request image budget and the per-stage memory records of the most
+    recently sampled inference requests.
+    """
+    return {
+        "process": {"rss_bytes": current_rss_bytes(), "peak_rss_bytes": peak_rss_bytes()},
+        "models": {name: module_memory(module) for name, module in loaded_models().items()},
+        "image_budget": {"budget_bytes": IMAGE_MEMORY_BUDGET_BYTES, "action": IMAGE_BUDGET_ACTION},
+        "samples": recent_samples(),
+    }
+
+
+@router.get("/event-loop")
+async def get_event_loop_blocks() -> dict:
+    """
+    Event loop stalls caught by the debug watchdog
+    (SKINMORPH_LOOP_WATCHDOG_ENABLED), newest first, each with the route
+    that was running and the stack of the blocking code.
+    """
+    blocks = recent_blocks()
+    return {
+        "watchdog_enabled": LOOP_WATCHDOG_ENABLED,
+        "threshold_ms": LOOP_BLOCK_THRESHOLD_MS,
+        "blocks": blocks,
+        "count": len(blocks),
+    }
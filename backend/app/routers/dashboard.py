@@ -1,10 +1,11 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 
-from ..core.dependencies import get_current_user
+from ..core.dependencies import get_current_user_claims
 from ..services.prediction_storage_service import (
-    get_user_predictions,
+    get_user_dashboard,
     get_user_prediction_stats
 )
 
@@ -33,6 +34,7 @@ class DashboardResponse(BaseModel):
     predictions: List[dict]
     total_count: int
     stats: dict
+    next_cursor: Optional[str] = Field(None, description="Continuation token for the next page")
 
 
 class PredictionStatsResponse(BaseModel):
@@ -43,31 +45,31 @@ class PredictionStatsResponse(BaseModel):
 
 @router.get("/predictions", response_model=DashboardResponse)
 async def get_dashboard(
-    current_user: dict = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user_claims),
     limit: int = Query(50, ge=1, le=100, description="Maximum number of predictions to return"),
-    skip: int = Query(0, ge=0, description="Number of predictions to skip for pagination")
+    skip: int = Query(0, ge=0, description="Number of predictions to skip (deprecated, use cursor)"),
+    cursor: Optional[str] = Query(None, description="Continuation token from a previous page"),
+    summary: bool = Query(False, description="Omit heavy fields such as top_3_predictions")
 ):
     """
     Get user's prediction history dashboard.
     Requires authentication.
-    Returns recent predictions with pagination support.
+    Returns recent predictions with cursor-based pagination support.
     """
     try:
         user_id = current_user.get("_id") or current_user.get("id")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid user")
         
-        # Get predictions
-        predictions = await get_user_predictions(user_id, limit=limit, skip=skip)
-        
-        # Get stats
-        stats = await get_user_prediction_stats(user_id)
-        
-        return DashboardResponse(
-            predictions=predictions,
-            total_count=stats.get("total_predictions", 0),
-            stats=stats
+        # Predictions page and stats come from the materialized user_stats document
+        dashboard = await get_user_dashboard(
+            user_id, limit=limit, skip=skip, cursor=cursor, summary=summary
         )
+        
+        # Service output already has the DashboardResponse shape
+        return ORJSONResponse(dashboard)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -77,7 +79,7 @@ async def get_dashboard(
 
 @router.get("/stats", response_model=PredictionStatsResponse)
 async def get_prediction_stats(
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user_claims)
 ):
     """
     Get prediction statistics for the logged-in user.
@@ -90,10 +92,10 @@ async def get_prediction_stats(
             
         stats = await get_user_prediction_stats(user_id)
         
-        return PredictionStatsResponse(
-            total_predictions=stats.get("total_predictions", 0),
-            predictions_by_disease=stats.get("predictions_by_disease", {})
-        )
+        return ORJSONResponse({
+            "total_predictions": stats.get("total_predictions", 0),
+            "predictions_by_disease": stats.get("predictions_by_disease", {})
+        })
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -103,8 +105,9 @@ async def get_prediction_stats(
 
 @router.get("/recent")
 async def get_recent_predictions(
-    current_user: dict = Depends(get_current_user),
-    count: int = Query(10, ge=1, le=50, description="Number of recent predictions to return")
+    current_user: dict = Depends(get_current_user_claims),
+    count: int = Query(10, ge=1, le=50, description="Number of recent predictions to return"),
+    summary: bool = Query(False, description="Omit heavy fields such as top_3_predictions")
 ):
     """
     Get most recent predictions for the logged-in user.
@@ -114,12 +117,13 @@ async def get_recent_predictions(
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid user")
             
-        predictions = await get_user_predictions(user_id, limit=count, skip=0)
+        dashboard = await get_user_dashboard(user_id, limit=count, summary=summary)
+        predictions = dashboard["predictions"]
         
-        return {
+        return ORJSONResponse({
             "recent_predictions": predictions,
             "count": len(predictions)
-        }
+        })
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -1,10 +1,20 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
+from typing import AsyncIterator, Dict, List, Optional
 
-from ..core.dependencies import get_current_user
-from ..db import get_database
-from ..services.prediction_storage_service import get_user_predictions
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from pymongo.errors import ExecutionTimeout
+
+from ..core.dependencies import get_current_user, get_current_user_claims
+from ..services.export_service import EXPORT_MAX_PATIENTS, JOB_COMPLETED, JOB_EXPIRED, get_export, submit_export
+from ..services.patient_service import list_patient_ids, list_patients
+from ..services.prediction_storage_service import (
+    OVERVIEW_MAX_PATIENTS,
+    get_patients_overview,
+    get_user_predictions_page
+)
+from ..services.triage_service import get_triage_queue, mark_patient_reviewed
 
 router = APIRouter(prefix="/dermatologist", tags=["dermatologist"])
 
@@ -17,44 +27,240 @@ class PatientInfo(BaseModel):
     gender: str
 
 
-@router.get("/patients", response_model=List[PatientInfo])
-async def get_patients(current_user: dict = Depends(get_current_user)):
+class PatientsOverviewRequest(BaseModel):
+    patient_ids: Optional[List[str]] = Field(
+        None,
+        max_length=OVERVIEW_MAX_PATIENTS,
+        description="Patients to include; omit for all patients",
+    )
+    after: Optional[str] = Field(
+        None,
+        description="Without patient_ids: continue after this patient ID (`next_after` of the previous page)",
+    )
+    latest: int = Field(3, ge=1, le=20, description="Number of latest predictions per patient")
+
+
+class ExportRequest(BaseModel):
+    patient_ids: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=EXPORT_MAX_PATIENTS,
+        description="Patients whose reports to export",
+    )
+
+
+def _require_dermatologist(current_user: dict) -> None:
+    if current_user.get("role") != "dermatologist":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only dermatologists can access this information"
+        )
+
+
+async def _stream_json_array(items: AsyncIterator[Dict]) -> AsyncIterator[bytes]:
+    yield b"["
+    separator = b""
+    async for item in items:
+        yield separator + orjson.dumps(item)
+        separator = b","
+    yield b"]"
+
+
+@router.get(
+    "/patients",
+    # Documents the streamed array; response_model does not apply to a StreamingResponse
+    responses={200: {"model": List[PatientInfo], "description": "Patients ordered by ID"}},
+)
+async def get_patients(
+    current_user: dict = Depends(get_current_user_claims),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Maximum number of patients to return"),
+    after: Optional[str] = Query(None, description="Return patients after this patient ID (the last ID of the previous page)"),
+    q: Optional[str] = Query(None, min_length=1, max_length=100, description="Name or email prefix to search for")
+):
     """
     Get a list of all patients.
     Only dermatologists should ideally access this, but for the prototype 
     we allow any authenticated user with the 'dermatologist' role.
+    The JSON array is streamed as patients are read, ordered by ID. To page,
+    pass `limit` and then the last returned `id` as `after`; a page shorter
+    than `limit` is the last one. Searches with `q` return at most 100
+    patients per page unless `limit` is given.
     """
-    if current_user.get("role") != "dermatologist":
+    _require_dermatologist(current_user)
+    
+    try:
+        patients = list_patients(after=after, search=q, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return StreamingResponse(_stream_json_array(patients), media_type="application/json")
+
+
+@router.post("/patients/overview")
+async def patients_overview(
+    request: PatientsOverviewRequest,
+    current_user: dict = Depends(get_current_user_claims)
+):
+    """
+    Get each patient's latest predictions plus summary counts in one call.
+    Pass `patient_ids`, or omit them for all patients ordered by ID, 500 per
+    page: `next_after` is set when more patients remain, pass it back as
+    `after` for the next page. Returns 504 if the aggregation exceeds its
+    time limit. Requires dermatologist role.
+    """
+    _require_dermatologist(current_user)
+
+    patient_ids = request.patient_ids
+    next_after = None
+    if patient_ids is None:
+        try:
+            patient_ids = await list_patient_ids(limit=OVERVIEW_MAX_PATIENTS + 1, after=request.after)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        if len(patient_ids) > OVERVIEW_MAX_PATIENTS:
+            patient_ids = patient_ids[:OVERVIEW_MAX_PATIENTS]
+            next_after = patient_ids[-1]
+    elif request.after is not None:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only dermatologists can access this information"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'after' pages the all-patients mode; omit it when passing patient_ids",
         )
-    
-    db = get_database()
-    patients_cursor = db.users.find({"role": "patient"})
-    
-    patients = []
-    async for doc in patients_cursor:
-        doc["id"] = str(doc["_id"])
-        patients.append(PatientInfo(**doc))
-    
-    return patients
+
+    try:
+        overview = await get_patients_overview(patient_ids, latest=request.latest)
+    except ExecutionTimeout:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Patient overview took too long; request fewer patients",
+        )
+    return ORJSONResponse({
+        "patients": overview,
+        "count": len(overview),
+        "next_after": next_after
+    })
 
 
 @router.get("/patient/{patient_id}/predictions")
-async def get_patient_predictions(patient_id: str, current_user: dict = Depends(get_current_user)):
+async def get_patient_predictions(
+    patient_id: str,
+    current_user: dict = Depends(get_current_user_claims),
+    limit: int = Query(50, ge=1, le=100, description="Maximum number of predictions to return"),
+    cursor: Optional[str] = Query(None, description="Continuation token from a previous page"),
+    summary: bool = Query(False, description="Omit heavy fields such as top_3_predictions")
+):
     """
     Get prediction history for a specific patient.
     Requires dermatologist role.
+    Paginate by passing back the returned `next_cursor`.
     """
-    if current_user.get("role") != "dermatologist":
+    _require_dermatologist(current_user)
+    
+    try:
+        page = await get_user_predictions_page(
+            patient_id, limit=limit, cursor=cursor, summary=summary
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return ORJSONResponse({
+        "predictions": page["predictions"],
+        "count": len(page["predictions"]),
+        "next_cursor": page["next_cursor"]
+    })
+
+
+@router.get("/triage")
+async def get_triage(
+    current_user: dict = Depends(get_current_user_claims),
+    limit: int = Query(20, ge=1, le=200, description="Number of patients to return")
+):
+    """
+    Get the patients most in need of review.
+    Ordered by severe disease codes (e.g. melanoma_suspect) first, then
+    severity level, confidence and recency of their most urgent unreviewed
+    prediction. Requires dermatologist role.
+    """
+    _require_dermatologist(current_user)
+
+    queue = await get_triage_queue(limit=limit)
+    return ORJSONResponse({
+        "patients": queue,
+        "count": len(queue)
+    })
+
+
+@router.post("/triage/{patient_id}/reviewed")
+async def mark_reviewed(patient_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    Mark a patient's triage entry as reviewed, removing them from the queue
+    until their next prediction. Requires dermatologist role.
+    """
+    _require_dermatologist(current_user)
+
+    if not await mark_patient_reviewed(patient_id, current_user.get("id")):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patient is not in the triage queue")
+    return ORJSONResponse({"status": "ok", "patient_id": patient_id})
+
+
+@router.post("/exports", status_code=status.HTTP_202_ACCEPTED)
+async def create_export(
+    request: ExportRequest,
+    current_user: dict = Depends(get_current_user_claims)
+):
+    """
+    Start a bulk export of patient reports as a zip archive.
+    Returns a job ID; poll `/dermatologist/exports/{job_id}` for progress and
+    download from `/dermatologist/exports/{job_id}/download` once completed.
+    Requires dermatologist role.
+    """
+    _require_dermatologist(current_user)
+
+    job = await submit_export(current_user.get("id"), request.patient_ids)
+    return ORJSONResponse(job, status_code=status.HTTP_202_ACCEPTED)
+
+
+async def _get_own_export(job_id: str, current_user: dict) -> dict:
+    job = await get_export(job_id, current_user.get("id"))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export job not found")
+    return job
+
+
+@router.get("/exports/{job_id}")
+async def get_export_status(job_id: str, current_user: dict = Depends(get_current_user_claims)):
+    """
+    Get the status and progress of one of your export jobs.
+    Requires dermatologist role.
+    """
+    _require_dermatologist(current_user)
+
+    job = await _get_own_export(job_id, current_user)
+    job.pop("artifact_path", None)
+    return ORJSONResponse(job)
+
+
+@router.get("/exports/{job_id}/download")
+async def download_export(job_id: str, current_user: dict = Depends(get_current_user_claims)):
+    """
+    Download the zip archive of a completed export job. Archives are kept
+    for a day by default; an expired one returns 410.
+    Requires dermatologist role.
+    """
+    _require_dermatologist(current_user)
+
+    job = await _get_own_export(job_id, current_user)
+    if job["status"] == JOB_EXPIRED:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only dermatologists can access this information"
+            status_code=status.HTTP_410_GONE,
+            detail="Export archive has expired; start a new export"
         )
-    
-    predictions = await get_user_predictions(patient_id)
-    return {
-        "predictions": predictions,
-        "count": len(predictions)
-    }
+    if job["status"] != JOB_COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Export job is {job['status']}"
+        )
+    return FileResponse(
+        job["artifact_path"],
+        media_type="application/zip",
+        filename=f"skinmorph_reports_{job_id}.zip",
+    )
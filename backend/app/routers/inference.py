@@ -1,15 +1,20 @@
 from typing import List, Optional
 
 from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from sanity_check import is_skin_image_from_bytes
 
 
+from ..core.memory import fit_image_to_budget
+from ..core.metrics import skin_gate_rejections, stage
+from ..core.tracing import annotate
 from ..services.ml_service import (
-    get_detector_service,
     get_predictor_service,
     get_recommendation_service,
+    predict_image_bytes,
 )
+from ..services.predict_service import MODEL_VERSION
 
 
 router = APIRouter(prefix="", tags=["inference"])
@@ -32,26 +37,30 @@ class PredictSequenceRequest(BaseModel):
 async def predict(
     file: UploadFile = File(...),
     metadata: Optional[str] = None,
-) -> dict:
+) -> ORJSONResponse:
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="File must be an image")
 
-    detector = get_detector_service()
     rec_engine = get_recommendation_service()
+    annotate(batch_size=1, model_version=MODEL_VERSION)
 
-    contents = await file.read()
+    contents = await fit_image_to_budget(await file.read())
 
     # 🛑 ADD THIS BLOCK (SKIN VALIDATION)
-    if not is_skin_image_from_bytes(contents):
+    with stage("skin_gate"):
+        is_skin = is_skin_image_from_bytes(contents)
+    if not is_skin:
+        skin_gate_rejections.inc()
         raise HTTPException(
             status_code=400,
             detail="Please upload a valid skin image"
         )
 
     # ✅ EXISTING CODE (UNCHANGED)
-    result = detector.predict_image_bytes(contents, metadata=metadata)
-    recs = rec_engine.get_recommendations(result)
-    return {"prediction": result, "recommendations": recs}
+    result = await predict_image_bytes(contents, metadata=metadata)
+    with stage("recommendations"):
+        recs = rec_engine.get_recommendations(result)
+    return ORJSONResponse({"prediction": result, "recommendations": recs})
 
 
 
@@ -60,13 +69,18 @@ async def predict_sequence(
     files: List[UploadFile] = File(...),
     metadata: Optional[str] = None,
     timestamps: Optional[str] = None,
-) -> dict:
+) -> ORJSONResponse:
     if any(not f.content_type.startswith("image/") for f in files):
         raise HTTPException(status_code=400, detail="All files must be images")
 
     predictor = get_predictor_service()
+    annotate(batch_size=len(files), model_version=MODEL_VERSION)
     contents_list = [await f.read() for f in files]
+    total_bytes = sum(len(c) for c in contents_list)
+    contents_list = [
+        await fit_image_to_budget(c, reserved_bytes=total_bytes - len(c)) for c in contents_list
+    ]
     result = predictor.predict_sequence_bytes(
         contents_list, metadata_json=metadata, timestamps=timestamps
     )
-    return result
\ No newline at end of file
+    return ORJSONResponse(result)
\ No newline at end of file
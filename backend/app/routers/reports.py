@@ -1,49 +1,44 @@
-import io
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+from ..core.dependencies import get_current_user
+from ..core.metrics import report_cache
+from ..services.report_service import get_report, pin_report, release_report
 
 
 router = APIRouter(prefix="/report", tags=["reports"])
 
 
 @router.get("")
-async def generate_report_stub(user_id: str | None = None) -> StreamingResponse:
+async def generate_report(
+    user_id: str | None = None,
+    current_user: dict = Depends(get_current_user)
+) -> FileResponse:
     """
-    Simple PDF export stub for clinician handoff.
-    In a real deployment, this would include images, Grad-CAM overlays, and metrics.
+    PDF export for clinician handoff: summary metrics, prediction history and
+    the lesion timeline with observation images.
+    Defaults to the current user's report; other users' reports require the
+    dermatologist role.
+    Rendering runs in a worker pool and the PDF is cached on disk until the
+    user's data changes; the file is streamed to the client in chunks.
     """
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(72, 750, "SkinMorph Prototype Report")
-
-    c.setFont("Helvetica", 11)
-    c.drawString(72, 720, f"Generated: {datetime.utcnow().isoformat()} UTC")
-    c.drawString(72, 700, f"User ID: {user_id or 'demo-user'}")
-    c.drawString(
-        72,
-        670,
-        "This is a non-clinical research prototype. Outputs are not medical advice.",
-    )
-    c.drawString(72, 640, "TODO: Embed lesion history, Grad-CAM heatmaps, and metrics.")
-
-    c.showPage()
-    c.save()
-    buffer.seek(0)
-
-    return StreamingResponse(
-        buffer,
+    own_id = current_user.get("id")
+    user_id = user_id or own_id
+    if user_id != own_id and current_user.get("role") != "dermatologist":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only access your own report"
+        )
+
+    path, cache_hit, temporary = await get_report(user_id)
+    # Kept until sent, so a concurrent render cannot remove it as stale
+    pin_report(path)
+    report_cache.inc(result="hit" if cache_hit else "miss")
+    return FileResponse(
+        path,
         media_type="application/pdf",
-        headers={"Content-Disposition": 'attachment; filename="skinmorph_report.pdf"'},
+        filename="skinmorph_report.pdf",
+        headers={"X-Report-Cache": "hit" if cache_hit else "miss"},
+        background=BackgroundTask(release_report, path, temporary),
     )
-
-
-
-
-
-
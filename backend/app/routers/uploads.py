@@ -5,9 +5,10 @@ from typing import Optional
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
 from sqlalchemy.orm import Session
 
+from ..core.memory import fit_image_to_budget
 from ..db import get_db
 from ..models import Image, Lesion, Observation, User
-from ..services.ml_service import get_detector_service
+from ..services.ml_service import predict_image_bytes
 
 
 router = APIRouter(prefix="/upload", tags=["uploads"])
@@ -33,6 +34,13 @@ async def upload_and_register(
         raise HTTPException(status_code=400, detail="File must be an image")
 
     contents = await file.read()
+    # The original is stored; inference may run on a downscaled copy
+    image_bytes = await fit_image_to_budget(contents)
+
+    # Inference runs before any writes: a flushed write would hold the SQLite
+    # write lock for the whole inference and block concurrent uploads
+    pred = await predict_image_bytes(image_bytes, metadata=metadata)
+    top = pred.get("top_class") or {}
 
     # Upsert user
     user: Optional[User] = None
@@ -47,10 +55,6 @@ async def upload_and_register(
     db.add(lesion)
     db.flush()
 
-    detector = get_detector_service()
-    pred = detector.predict_image_bytes(contents, metadata=metadata)
-    top = pred.get("top_class") or {}
-
     obs = Observation(
         lesion_id=lesion.id,
         captured_at=datetime.utcnow(),
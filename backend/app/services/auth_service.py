@@ -4,7 +4,7 @@ from fastapi import HTTPException, status
 from bson import ObjectId
 
 from ..db import get_database
-from ..core.auth import verify_password, get_password_hash, create_access_token
+from ..core.auth import verify_password_async, get_password_hash_async, create_access_token
 
 
 async def create_user(
@@ -28,7 +28,7 @@ async def create_user(
         )
     
     # Hash password
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash_async(password)
     
     # Create user document
     user_doc = {
@@ -64,7 +64,7 @@ async def authenticate_user(email: str, password: str) -> Optional[dict]:
         return None
     
     # Verify password
-    if not verify_password(password, user["password"]):
+    if not await verify_password_async(password, user["password"]):
         return None
     
     # Convert ObjectId to string for JSON serialization
@@ -76,7 +76,11 @@ async def authenticate_user(email: str, password: str) -> Optional[dict]:
 
 
 async def get_user_by_id(user_id: str) -> Optional[dict]:
-    """Get user by user ID."""
+    """
+    Get user by user ID.
+    Authenticated requests read users through `core.user_cache`; anything that
+    modifies a user document must call `core.user_cache.invalidate_user`.
+    """
     db = get_database()
     users_collection = db["users"]
     
@@ -102,7 +106,11 @@ async def login_user(email: str, password: str) -> dict:
         )
     
     # Create access token
-    access_token = create_access_token(data={"sub": user["_id"], "email": user["email"]})
+    # The role claim lets read-only endpoints skip the user lookup when
+    # SKINMORPH_TRUST_TOKEN_CLAIMS is enabled.
+    access_token = create_access_token(
+        data={"sub": user["_id"], "email": user["email"], "role": user.get("role", "patient")}
+    )
     
     return {
         "access_token": access_token,
@@ -171,6 +171,14 @@ DISEASE_INFO_MAP: Dict[str, DiseaseInfo] = {
 }
 
 
+# Disease codes whose default severity is SEVERE (e.g. melanoma_suspect);
+# these are ranked first in the dermatologist triage queue.
+SEVERE_DISEASE_CODES = frozenset(
+    code for code, info in DISEASE_INFO_MAP.items()
+    if info.default_severity == SeverityLevel.SEVERE
+)
+
+
 def get_disease_info(disease_name: str) -> Optional[DiseaseInfo]:
     """Get disease information by disease name."""
     return DISEASE_INFO_MAP.get(disease_name.lower())
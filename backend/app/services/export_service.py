@@ -0,0 +1,326 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import uuid
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+from ..core.metrics import registry
+from ..db import SessionLocal
+from ..models import ExportJob
+from .report_service import get_report, pin_report, release_report
+
+logger = logging.getLogger(__name__)
+
+# Bulk report export configuration
+EXPORT_DIR = Path(os.getenv("SKINMORPH_EXPORT_DIR", "data/exports"))
+# Reports rendered at once for exports, across all jobs; keep this below
+# SKINMORPH_REPORT_WORKERS so live /report requests and inference keep capacity
+EXPORT_CONCURRENCY = int(os.getenv("SKINMORPH_EXPORT_CONCURRENCY", "1"))
+# How often an idle worker checks the database for queued jobs
+EXPORT_POLL_INTERVAL_SECONDS = float(os.getenv("SKINMORPH_EXPORT_POLL_INTERVAL_SECONDS", "2.0"))
+# A running job whose heartbeat is older than this is assumed abandoned
+# (its worker died) and may be claimed by another worker
+EXPORT_STALE_SECONDS = float(os.getenv("SKINMORPH_EXPORT_STALE_SECONDS", "300"))
+# Completed archives are deleted, and their jobs marked expired, this long
+# after completion
+EXPORT_RETENTION_SECONDS = float(os.getenv("SKINMORPH_EXPORT_RETENTION_SECONDS", "86400"))
+# How often an idle worker looks for expired archives
+EXPORT_SWEEP_INTERVAL_SECONDS = 60.0
+EXPORT_MAX_PATIENTS = 500
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_EXPIRED = "expired"
+
+_runner: Optional[asyncio.Task] = None
+_wakeup: Optional[asyncio.Event] = None
+_current_job: Optional[str] = None
+# Queued jobs seen at this worker's last poll
+_queue_depth = 0
+
+registry.callback(
+    "skinmorph_export_queue_depth", "Report export jobs waiting to run.",
+    lambda: {(): _queue_depth},
+)
+
+
+def _to_job_item(job: ExportJob) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "total": job.total,
+        "completed": job.completed,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat(),
+    }
+
+
+def _create_job(requested_by: str, patient_ids: List[str]) -> Dict[str, Any]:
+    with SessionLocal() as session:
+        job = ExportJob(
+            id=uuid.uuid4().hex,
+            requested_by=requested_by,
+            status=JOB_QUEUED,
+            patient_ids_json=json.dumps(patient_ids),
+            total=len(patient_ids),
+        )
+        session.add(job)
+        session.commit()
+        return _to_job_item(job)
+
+
+def _load_job(job_id: str) -> Optional[ExportJob]:
+    with SessionLocal() as session:
+        job = session.get(ExportJob, job_id)
+        if job is not None:
+            session.expunge(job)
+        return job
+
+
+def _update_job(job_id: str, **fields: Any) -> None:
+    with SessionLocal() as session:
+        session.query(ExportJob).filter(ExportJob.id == job_id).update(
+            {**fields, "updated_at": datetime.utcnow()}
+        )
+        session.commit()
+
+
+def _claimable(now: datetime):
+    stale = now - timedelta(seconds=EXPORT_STALE_SECONDS)
+    return or_(
+        ExportJob.status == JOB_QUEUED,
+        and_(ExportJob.status == JOB_RUNNING, ExportJob.updated_at < stale),
+    )
+
+
+def _claim_next_job() -> Optional[str]:
+    """
+    Atomically claim the oldest queued (or abandoned) job for this worker.
+    The conditional UPDATE only succeeds for one worker per job, so jobs can
+    be submitted to any process and run exactly once.
+    """
+    global _queue_depth
+    with SessionLocal() as session:
+        now = datetime.utcnow()
+        _queue_depth = session.query(ExportJob).filter(ExportJob.status == JOB_QUEUED).count()
+        candidates = (
+            session.query(ExportJob.id)
+            .filter(_claimable(now))
+            .order_by(ExportJob.created_at)
+            .limit(5)
+            .all()
+        )
+        for (job_id,) in candidates:
+            claimed = (
+                session.query(ExportJob)
+                .filter(ExportJob.id == job_id, _claimable(now))
+                .update(
+                    {"status": JOB_RUNNING, "completed": 0, "updated_at": now},
+                    synchronize_session=False,
+                )
+            )
+            session.commit()
+            if claimed:
+                return job_id
+    return None
+
+
+def _release_job(job_id: str) -> None:
+    """Put a job interrupted by shutdown back in the queue for any worker."""
+    with SessionLocal() as session:
+        session.query(ExportJob).filter(
+            ExportJob.id == job_id, ExportJob.status == JOB_RUNNING
+        ).update({"status": JOB_QUEUED, "completed": 0, "updated_at": datetime.utcnow()})
+        session.commit()
+
+
+def _expire_old_exports() -> int:
+    """
+    Delete archives of jobs completed more than EXPORT_RETENTION_SECONDS ago
+    and mark those jobs expired. Each job is marked with a conditional
+    UPDATE first, so concurrent workers delete each archive once.
+    Returns the number of jobs expired.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=EXPORT_RETENTION_SECONDS)
+    expired = 0
+    with SessionLocal() as session:
+        jobs = (
+            session.query(ExportJob.id, ExportJob.artifact_path)
+            .filter(ExportJob.status == JOB_COMPLETED, ExportJob.updated_at < cutoff)
+            .all()
+        )
+        for job_id, artifact_path in jobs:
+            marked = (
+                session.query(ExportJob)
+                .filter(ExportJob.id == job_id, ExportJob.status == JOB_COMPLETED)
+                .update(
+                    {"status": JOB_EXPIRED, "artifact_path": None, "updated_at": datetime.utcnow()},
+                    synchronize_session=False,
+                )
+            )
+            session.commit()
+            if marked and artifact_path:
+                Path(artifact_path).unlink(missing_ok=True)
+            expired += marked
+    return expired
+
+
+def _stage_report(source: Path, dest: Path) -> None:
+    """Hard-link (or copy) a report into the job's staging directory."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(source, dest)
+    except OSError:
+        shutil.copyfile(source, dest)
+
+
+def _write_archive(path: Path, reports: List[Tuple[str, Path]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    # PDFs are already compressed, so store them as-is
+    with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for patient_id, report_path in reports:
+            archive.write(report_path, arcname=f"{patient_id}.pdf")
+    os.replace(tmp_path, path)
+
+
+async def _heartbeat(job_id: str) -> None:
+    # Keeps the claim fresh while long renders run between progress updates
+    while True:
+        await asyncio.sleep(EXPORT_STALE_SECONDS / 4)
+        await asyncio.to_thread(_update_job, job_id)
+
+
+async def _run_job(job_id: str, slots: asyncio.Semaphore) -> None:
+    job = await asyncio.to_thread(_load_job, job_id)
+    if job is None:
+        return
+    patient_ids: List[str] = json.loads(job.patient_ids_json)
+    # Cached reports can be replaced and removed while the job runs, so each
+    # one is linked into a staging directory as soon as it is available
+    staging = EXPORT_DIR / f"{job_id}.parts"
+    progress = {"completed": 0}
+
+    async def render(index: int, patient_id: str) -> Tuple[str, Path]:
+        async with slots:
+            path, _, temporary = await get_report(patient_id)
+        pin_report(path)
+        try:
+            staged = staging / f"{index}.pdf"
+            await asyncio.to_thread(_stage_report, path, staged)
+        finally:
+            release_report(path, temporary)
+        progress["completed"] += 1
+        await asyncio.to_thread(_update_job, job_id, completed=progress["completed"])
+        return patient_id, staged
+
+    heartbeat = asyncio.create_task(_heartbeat(job_id))
+    try:
+        reports = await asyncio.gather(*(render(i, pid) for i, pid in enumerate(patient_ids)))
+        artifact = EXPORT_DIR / f"{job_id}.zip"
+        await asyncio.to_thread(_write_archive, artifact, reports)
+    except asyncio.CancelledError:
+        raise
+    except Exception as exc:
+        logger.exception("Report export %s failed", job_id)
+        await asyncio.to_thread(_update_job, job_id, status=JOB_FAILED, error=str(exc))
+        return
+    finally:
+        heartbeat.cancel()
+        await asyncio.to_thread(shutil.rmtree, staging, True)
+
+    await asyncio.to_thread(
+        _update_job, job_id, status=JOB_COMPLETED, artifact_path=str(artifact)
+    )
+
+
+async def _run_jobs(wakeup: asyncio.Event) -> None:
+    global _current_job
+    slots = asyncio.Semaphore(max(1, EXPORT_CONCURRENCY))
+    last_sweep = 0.0
+    loop = asyncio.get_running_loop()
+    while True:
+        if loop.time() - last_sweep >= EXPORT_SWEEP_INTERVAL_SECONDS:
+            last_sweep = loop.time()
+            try:
+                if await asyncio.to_thread(_expire_old_exports):
+                    logger.info("Removed expired report exports")
+            except Exception:
+                logger.exception("Could not remove expired report exports")
+        job_id = await asyncio.to_thread(_claim_next_job)
+        if job_id is None:
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=EXPORT_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+            continue
+        _current_job = job_id
+        try:
+            await _run_job(job_id, slots)
+        finally:
+            _current_job = None
+
+
+async def start_export_worker() -> None:
+    """
+    Start polling the database for export jobs. Every worker process runs
+    one; jobs left running by a worker that died are picked up once their
+    heartbeat is older than EXPORT_STALE_SECONDS, and archives older than
+    EXPORT_RETENTION_SECONDS are removed.
+    """
+    global _runner, _wakeup
+    if _runner is not None:
+        return
+    _wakeup = asyncio.Event()
+    _runner = asyncio.create_task(_run_jobs(_wakeup))
+
+
+async def stop_export_worker() -> None:
+    """Stop processing; an interrupted job is queued again for any worker."""
+    global _runner, _wakeup
+    if _runner is not None:
+        interrupted = _current_job
+        _runner.cancel()
+        try:
+            await _runner
+        except asyncio.CancelledError:
+            pass
+        if interrupted is not None:
+            await asyncio.to_thread(_release_job, interrupted)
+    _runner = None
+    _wakeup = None
+
+
+async def submit_export(requested_by: str, patient_ids: List[str]) -> Dict[str, Any]:
+    """Record a new queued export job. Returns the job's status."""
+    # Keep the first occurrence of each patient, in request order
+    patient_ids = list(dict.fromkeys(patient_ids))
+    job = await asyncio.to_thread(_create_job, requested_by, patient_ids)
+    # Any worker may claim it; wake this one rather than wait for its next poll
+    if _wakeup is not None:
+        _wakeup.set()
+    return job
+
+
+async def get_export(job_id: str, requested_by: str) -> Optional[Dict[str, Any]]:
+    """
+    Get an export job's status, or None if it does not exist or belongs to
+    someone else. Completed jobs include the archive path.
+    """
+    job = await asyncio.to_thread(_load_job, job_id)
+    if job is None or job.requested_by != requested_by:
+        return None
+    item = _to_job_item(job)
+    item["artifact_path"] = job.artifact_path
+    return item
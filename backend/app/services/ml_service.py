@@ -1,11 +1,20 @@
+import asyncio
+import hashlib
 import json
 from functools import lru_cache
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
 
+from starlette.concurrency import run_in_threadpool
+
+from ..core.metrics import registry
+from ..core.profiling import profile_in_thread
+from ..core.tracing import annotate
 from ..ml.detector import DetectorModel
 from ..ml.predictor import SkinMorphPredictor
 from ..ml.recommendations import RecommendationEngine
 
+T = TypeVar("T")
+
 
 @lru_cache(maxsize=1)
 def get_detector_service() -> DetectorModel:
@@ -17,6 +26,18 @@ def get_predictor_service() -> SkinMorphPredictor:
     return SkinMorphPredictor()
 
 
+def loaded_models() -> Dict[str, Any]:
+    """The torch modules of the models loaded so far in this process, by name."""
+    models: Dict[str, Any] = {}
+    if get_detector_service.cache_info().currsize:
+        models["detector"] = get_detector_service().model
+    if get_predictor_service.cache_info().currsize:
+        predictor = get_predictor_service()
+        models["predictor_backbone"] = predictor.backbone
+        models["predictor_head"] = predictor.head
+    return models
+
+
 @lru_cache(maxsize=1)
 def get_recommendation_service() -> RecommendationEngine:
     return RecommendationEngine()
@@ -31,7 +52,80 @@ def parse_metadata(metadata_json: Optional[str]) -> Dict[str, Any]:
         return {}
 
 
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+    The first caller for a key starts the computation; callers arriving while
+    it is in flight wait for the same result, or the same exception. A
+    cancelled caller does not cancel the computation for the others.
+    The shared result must be treated as read-only.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.coalesced += 1
+            annotate(coalesced=True)
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
+
+
+inference_flight = SingleFlight()
+
+registry.callback(
+    "skinmorph_inference_coalesced_total", "Inference requests served by another request's in-flight run.",
+    lambda: {(): inference_flight.coalesced},
+    kind="counter",
+)
+registry.callback(
+    "skinmorph_inference_in_flight", "Distinct detector inferences currently running.",
+    lambda: {(): inference_flight.stats()["in_flight"]},
+)
 
 
+def _inference_key(kind: str, image_digest: str, options: Dict[str, Any]) -> str:
+    payload = json.dumps([kind, image_digest, options], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
+async def predict_image_bytes(image_bytes: bytes, metadata: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run the detector in the threadpool. Identical concurrent requests (same
+    image bytes and options) share a single inference.
+    """
+    detector = get_detector_service()
+    image_digest = hashlib.sha256(image_bytes).hexdigest()
+    annotate(image_bytes=len(image_bytes), image_digest=image_digest)
+    key = _inference_key("detect", image_digest, {"metadata": metadata})
+    return await inference_flight.do(
+        key,
+        lambda: run_in_threadpool(
+            profile_in_thread(detector.predict_image_bytes), image_bytes, metadata=metadata
+        ),
+    )
@@ -0,0 +1,83 @@
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from ..db import get_database
+
+
+# Only the fields shown in patient listings are read from MongoDB
+PATIENT_LIST_PROJECTION = {"name": 1, "email": 1, "age": 1, "gender": 1}
+
+# Documents fetched per round trip while streaming a listing
+PATIENT_LIST_BATCH_SIZE = 200
+
+# Result limit for a search without one. Prefix matches on name or email
+# cannot be read in _id order from an index, so MongoDB sorts them in
+# memory; a limit keeps that a bounded top-N sort.
+PATIENT_SEARCH_DEFAULT_LIMIT = 100
+
+
+def _patient_query(after: Optional[str], search: Optional[str]) -> Dict[str, Any]:
+    query: Dict[str, Any] = {"role": "patient"}
+    if after:
+        try:
+            query["_id"] = {"$gt": ObjectId(after)}
+        except (InvalidId, TypeError) as exc:
+            raise ValueError("Invalid 'after' patient ID") from exc
+    if search:
+        # Anchored, case-sensitive prefixes can be answered from the
+        # (role, name) and (role, email) indexes.
+        prefix = "^" + re.escape(search)
+        query["$or"] = [
+            {"name": {"$regex": prefix}},
+            {"email": {"$regex": prefix}},
+        ]
+    return query
+
+
+async def list_patient_ids(limit: int, after: Optional[str] = None) -> List[str]:
+    """
+    Get up to `limit` patient IDs after a given patient ID, answered from the
+    (role, _id) index. Raises ValueError for a malformed `after` ID.
+    """
+    db = get_database()
+    cursor = db["users"].find(_patient_query(after, None), {"_id": 1}).sort("_id", 1).limit(limit)
+    return [str(doc["_id"]) async for doc in cursor]
+
+
+def list_patients(
+    after: Optional[str] = None,
+    search: Optional[str] = None,
+    limit: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Iterate over patients ordered by ID, optionally after a given patient ID
+    and filtered by a name/email prefix.
+    Documents are streamed from MongoDB in batches, so memory use does not
+    grow with the number of patients. A search is always limited, to
+    PATIENT_SEARCH_DEFAULT_LIMIT results unless `limit` is given.
+    Raises ValueError for a malformed `after` ID.
+    """
+    db = get_database()
+    cursor = db["users"].find(
+        _patient_query(after, search), PATIENT_LIST_PROJECTION
+    ).sort("_id", 1).batch_size(PATIENT_LIST_BATCH_SIZE)
+    if search and not limit:
+        limit = PATIENT_SEARCH_DEFAULT_LIMIT
+    if limit:
+        cursor = cursor.limit(limit)
+
+    return _iter_patient_items(cursor)
+
+
+async def _iter_patient_items(cursor) -> AsyncIterator[Dict[str, Any]]:
+    async for doc in cursor:
+        yield {
+            "id": str(doc["_id"]),
+            "name": doc.get("name", ""),
+            "email": doc.get("email", ""),
+            "age": doc.get("age", 0),
+            "gender": doc.get("gender", ""),
+        }
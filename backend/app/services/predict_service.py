@@ -1,7 +1,10 @@
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
 from ..services.ml_service import get_detector_service
 from ..services.disease_info_service import (
+    DISEASE_INFO_MAP,
     get_disease_info,
     get_severity_from_confidence,
     DiseaseInfo,
@@ -11,6 +14,95 @@ from ..services.disease_info_service import (
 # Model version (should match your deployed model version)
 MODEL_VERSION = "1.0.0"
 
+MEDICAL_DISCLAIMER = "This is not a medical diagnosis. This AI system is for informational purposes only and should not replace professional medical advice, diagnosis, or treatment. Always seek the advice of a qualified healthcare provider with any questions regarding a medical condition."
+
+
+def _fallback_disease_info(disease_code: str) -> DiseaseInfo:
+    return DiseaseInfo(
+        disease_name=_display_name(disease_code),
+        description="Information not available for this condition.",
+        common_symptoms=["Consult a dermatologist for detailed symptoms"],
+        possible_causes=["Consult a dermatologist for potential causes"],
+        precautions=["Consult a dermatologist for personalized care"],
+        recommended_next_steps="Please consult a dermatologist for professional evaluation and treatment recommendations.",
+        default_severity=SeverityLevel.MILD
+    )
+
+
+@lru_cache(maxsize=256)
+def _display_name(disease_code: str) -> str:
+    info = get_disease_info(disease_code)
+    return info.disease_name if info else disease_code.replace("_", " ").title()
+
+
+@dataclass(frozen=True)
+class EnrichmentTemplate:
+    """
+    Static part of an enriched prediction for one disease code and severity
+    level. `fields` is shared between responses and must not be mutated.
+    """
+    fields: Dict[str, Any]
+
+
+def _build_template(disease_code: str, severity: SeverityLevel, info: DiseaseInfo) -> EnrichmentTemplate:
+    fields = {
+        "predicted_disease": info.disease_name,
+        "predicted_disease_code": disease_code,
+        "severity_level": severity.value,
+        "disease_description": info.description,
+        "common_symptoms": list(info.common_symptoms),
+        "possible_causes": list(info.possible_causes),
+        "precautions": list(info.precautions),
+        "recommended_next_steps": info.recommended_next_steps,
+        "model_version": MODEL_VERSION,
+        "medical_disclaimer": MEDICAL_DISCLAIMER,
+    }
+    return EnrichmentTemplate(fields)
+
+
+# Templates for every known disease code and severity level, built at import
+_TEMPLATES: Dict[Tuple[str, SeverityLevel], EnrichmentTemplate] = {
+    (code, severity): _build_template(code, severity, info)
+    for code, info in DISEASE_INFO_MAP.items()
+    for severity in SeverityLevel
+}
+
+
+@lru_cache(maxsize=256)
+def _template_for_other_code(disease_code: str, severity: SeverityLevel) -> EnrichmentTemplate:
+    info = get_disease_info(disease_code) or _fallback_disease_info(disease_code)
+    return _build_template(disease_code, severity, info)
+
+
+def get_enrichment_template(disease_code: str, confidence: float) -> EnrichmentTemplate:
+    """Get the precomputed template for a disease code at the given confidence."""
+    info = get_disease_info(disease_code)
+    default_severity = info.default_severity if info else SeverityLevel.MILD
+    severity = get_severity_from_confidence(confidence, default_severity)
+    template = _TEMPLATES.get((disease_code, severity))
+    if template is None:
+        # Codes in a different case or without disease information
+        template = _template_for_other_code(disease_code, severity)
+    return template
+
+
+def _dynamic_fields(detector_output: Dict[str, Any], confidence: float) -> Dict[str, Any]:
+    return {
+        "confidence": round(confidence, 4),
+        "top_predictions": [
+            {
+                "disease": _display_name(pred.get("label", "unknown")),
+                "disease_code": pred.get("label", "unknown"),
+                "confidence": round(pred.get("probability", 0.0), 4)
+            }
+            for pred in detector_output.get("top_3_predictions", [])
+        ],
+        "prediction_time": datetime.utcnow().isoformat(),
+        "is_invalid_image": detector_output.get("is_invalid_image", False),
+        "confidence_threshold": detector_output.get("confidence_threshold", 0.3),
+        "gradcam_overlay_png_b64": detector_output.get("gradcam_overlay_png_b64")
+    }
+
 
 def enrich_prediction_with_medical_info(
     detector_output: Dict[str, Any]
@@ -18,66 +110,15 @@ def enrich_prediction_with_medical_info(
     """
     Enrich raw detector output with comprehensive medical information.
     Returns medical-grade prediction response.
+    Static medical information comes from a precomputed template; list
+    fields are shared between responses and must not be mutated.
     """
     top_class = detector_output.get("top_class", {})
     predicted_disease = top_class.get("label", "unknown")
     confidence = top_class.get("probability", 0.0)
-    top_3_raw = detector_output.get("top_3_predictions", [])
-    is_invalid_image = detector_output.get("is_invalid_image", False)
-    
-    # Get disease information
-    disease_info = get_disease_info(predicted_disease)
-    
-    # If no disease info found, use default/unknown info
-    if not disease_info:
-        disease_info = DiseaseInfo(
-            disease_name=predicted_disease.replace("_", " ").title(),
-            description="Information not available for this condition.",
-            common_symptoms=["Consult a dermatologist for detailed symptoms"],
-            possible_causes=["Consult a dermatologist for potential causes"],
-            precautions=["Consult a dermatologist for personalized care"],
-            recommended_next_steps="Please consult a dermatologist for professional evaluation and treatment recommendations.",
-            default_severity=SeverityLevel.MILD
-        )
-    
-    # Determine severity based on confidence and disease type
-    severity = get_severity_from_confidence(confidence, disease_info.default_severity)
-    
-    # Format top-3 predictions with disease names
-    top_3_predictions = []
-    for pred in top_3_raw:
-        pred_disease = pred.get("label", "unknown")
-        pred_confidence = pred.get("probability", 0.0)
-        pred_info = get_disease_info(pred_disease)
-        disease_name = pred_info.disease_name if pred_info else pred_disease.replace("_", " ").title()
-        
-        top_3_predictions.append({
-            "disease": disease_name,
-            "disease_code": pred_disease,
-            "confidence": round(pred_confidence, 4)
-        })
-    
-    # Build comprehensive response
-    response = {
-        "predicted_disease": disease_info.disease_name,
-        "predicted_disease_code": predicted_disease,
-        "confidence": round(confidence, 4),
-        "top_predictions": top_3_predictions,
-        "severity_level": severity.value,
-        "disease_description": disease_info.description,
-        "common_symptoms": disease_info.common_symptoms,
-        "possible_causes": disease_info.possible_causes,
-        "precautions": disease_info.precautions,
-        "recommended_next_steps": disease_info.recommended_next_steps,
-        "model_version": MODEL_VERSION,
-        "prediction_time": datetime.utcnow().isoformat(),
-        "medical_disclaimer": "This is not a medical diagnosis. This AI system is for informational purposes only and should not replace professional medical advice, diagnosis, or treatment. Always seek the advice of a qualified healthcare provider with any questions regarding a medical condition.",
-        "is_invalid_image": is_invalid_image,
-        "confidence_threshold": detector_output.get("confidence_threshold", 0.3),
-        "gradcam_overlay_png_b64": detector_output.get("gradcam_overlay_png_b64")
-    }
-    
-    return response
+
+    template = get_enrichment_template(predicted_disease, confidence)
+    return {**template.fields, **_dynamic_fields(detector_output, confidence)}
 
 
 def predict_skin_disease(
@@ -0,0 +1,308 @@
+import asyncio
+import logging
+import os
+from collections import deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from bson import json_util
+
+try:
+    import fcntl
+except ImportError:  # Windows: journals left by other processes are not claimed
+    fcntl = None
+from fastapi import HTTPException, status
+
+from ..core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Write-behind configuration
+PREDICTION_WRITE_BEHIND = os.getenv("SKINMORPH_PREDICTION_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+# Maximum number of queued predictions; callers wait for space beyond this
+PREDICTION_BUFFER_MAX_SIZE = int(os.getenv("SKINMORPH_PREDICTION_BUFFER_MAX_SIZE", "1000"))
+# Flush as soon as this many predictions are queued...
+PREDICTION_BUFFER_FLUSH_SIZE = int(os.getenv("SKINMORPH_PREDICTION_BUFFER_FLUSH_SIZE", "100"))
+# ...or after this many seconds, whichever comes first
+PREDICTION_BUFFER_FLUSH_INTERVAL_SECONDS = float(
+    os.getenv("SKINMORPH_PREDICTION_BUFFER_FLUSH_INTERVAL_SECONDS", "1.0")
+)
+# How long a caller may wait for space in a full buffer before getting a 503
+PREDICTION_BUFFER_PUT_TIMEOUT_SECONDS = float(
+    os.getenv("SKINMORPH_PREDICTION_BUFFER_PUT_TIMEOUT_SECONDS", "5.0")
+)
+# Base journal path; each process journals to `<stem>.<pid><suffix>` next to it
+PREDICTION_JOURNAL_PATH = Path(
+    os.getenv("SKINMORPH_PREDICTION_JOURNAL_PATH", "data/prediction_journal.jsonl")
+)
+# fsync every journal append; survives power loss, not just process crashes
+PREDICTION_JOURNAL_FSYNC = os.getenv("SKINMORPH_PREDICTION_JOURNAL_FSYNC", "false").lower() in ("1", "true", "yes")
+
+
+class PredictionWriteBuffer:
+    """
+    Write-behind buffer for prediction documents.
+
+    Documents are appended to an on-disk journal and queued in memory; a
+    background task persists them in batches through `flush_fn` when
+    `flush_size` are queued or every `flush_interval` seconds. The journal is
+    rewritten with the still-pending documents after each successful flush,
+    so queued writes survive a crash. When `max_size` documents are pending,
+    `put` waits for space (backpressure).
+
+    Each process has its own journal, `<stem>.<pid><suffix>` next to
+    `journal_path`, held under an exclusive lock on a `.lock` file beside it.
+    On start, journals whose lock is free (left by a process that died) are
+    replayed into this buffer and removed. Journal file I/O runs in a thread.
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+        journal_path: Path = PREDICTION_JOURNAL_PATH,
+        max_size: int = PREDICTION_BUFFER_MAX_SIZE,
+        flush_size: int = PREDICTION_BUFFER_FLUSH_SIZE,
+        flush_interval: float = PREDICTION_BUFFER_FLUSH_INTERVAL_SECONDS,
+        put_timeout: float = PREDICTION_BUFFER_PUT_TIMEOUT_SECONDS,
+        fsync: bool = PREDICTION_JOURNAL_FSYNC,
+    ) -> None:
+        self.flush_fn = flush_fn
+        self.base_journal_path = journal_path
+        self.journal_path = journal_path.with_name(f"{journal_path.stem}.{os.getpid()}{journal_path.suffix}")
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.fsync = fsync
+        self._pending: Deque[Dict[str, Any]] = deque()
+        self._journal = None
+        self._lock_file = None
+        # Serializes journal appends and rewrites, which run in a thread
+        self._journal_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Condition()
+        # Slots taken by `put` calls whose journal write is still running
+        self._reserved = 0
+        self.flushed = 0
+        self.failed_flushes = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def start(self) -> None:
+        """Replay journaled documents left by dead processes and start flushing."""
+        replayed = await asyncio.to_thread(self._open_journal)
+        if replayed:
+            logger.info("Replaying %d journaled predictions", len(replayed))
+            self._pending.extend(replayed)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and flush everything still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._pending:
+            if not await self.flush():
+                logger.error(
+                    "Could not flush %d predictions on shutdown; they remain in %s",
+                    len(self._pending), self.journal_path,
+                )
+                break
+        if self._journal is not None:
+            await asyncio.to_thread(self._close_journal, not self._pending)
+
+    @staticmethod
+    def _lock_path(journal: Path) -> Path:
+        return journal.with_name(journal.name + ".lock")
+
+    def _try_lock(self, journal: Path):
+        """Open and exclusively lock `journal`'s lock file; None if another process holds it."""
+        lock_file = self._lock_path(journal).open("a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return None
+        return lock_file
+
+    @staticmethod
+    def _read_journal(journal: Path) -> List[Dict[str, Any]]:
+        try:
+            with journal.open("r", encoding="utf-8") as f:
+                return [json_util.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _open_journal(self) -> List[Dict[str, Any]]:
+        """Lock this process's journal and collect the documents of unowned ones."""
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_file = self._try_lock(self.journal_path)
+        if self._lock_file is None:
+            raise RuntimeError(f"Prediction journal {self.journal_path} is locked by another process")
+        # A previous process with the same pid may have left this journal behind
+        replayed = self._read_journal(self.journal_path)
+        self._journal = self.journal_path.open("a", encoding="utf-8")
+
+        base = self.base_journal_path
+        candidates = {base} | set(base.parent.glob(f"{base.stem}.*{base.suffix}"))
+        if fcntl is None:
+            # Without locks, live processes cannot be told apart from dead ones
+            candidates = {base}
+        for journal in sorted(candidates - {self.journal_path}):
+            if not journal.exists():
+                continue
+            lock_file = self._try_lock(journal)
+            if lock_file is None:
+                continue  # owned by a live process
+            try:
+                # Moved into this process's journal before the orphan is removed
+                docs = self._read_journal(journal)
+                for doc in docs:
+                    self._append_journal(doc)
+                replayed.extend(docs)
+                journal.unlink(missing_ok=True)
+                self._lock_path(journal).unlink(missing_ok=True)
+            finally:
+                lock_file.close()
+        return replayed
+
+    def _close_journal(self, remove: bool) -> None:
+        self._journal.close()
+        self._journal = None
+        if remove:
+            self.journal_path.unlink(missing_ok=True)
+            self._lock_path(self.journal_path).unlink(missing_ok=True)
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    async def put(self, doc: Dict[str, Any]) -> None:
+        """Journal and queue a document, waiting for space if the buffer is full."""
+        # The slot is reserved before the journal write yields, so concurrent
+        # callers cannot all pass the size check and overfill the buffer
+        async with self._space:
+            if not self._has_space():
+                self._wakeup.set()
+                try:
+                    await asyncio.wait_for(self._space.wait_for(self._has_space), timeout=self.put_timeout)
+                except asyncio.TimeoutError:
+                    raise HTTPException(
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        detail="Prediction storage is falling behind, please retry shortly",
+                        headers={"Retry-After": "1"},
+                    )
+            self._reserved += 1
+
+        queued = False
+        try:
+            async with self._journal_lock:
+                await asyncio.to_thread(self._append_journal, doc)
+                self._pending.append(doc)
+                queued = True
+        finally:
+            self._reserved -= 1
+            if not queued:
+                async with self._space:
+                    self._space.notify()
+        if len(self._pending) >= self.flush_size:
+            self._wakeup.set()
+
+    def _has_space(self) -> bool:
+        return len(self._pending) + self._reserved < self.max_size
+
+    async def flush(self) -> bool:
+        """Persist up to `flush_size` queued documents. Returns False on failure."""
+        async with self._flush_lock:
+            batch = [self._pending[i] for i in range(min(self.flush_size, len(self._pending)))]
+            if not batch:
+                return True
+            try:
+                await self.flush_fn(batch)
+            except Exception as exc:
+                self.failed_flushes += 1
+                logger.warning("Failed to flush %d predictions: %s", len(batch), exc)
+                return False
+
+            # Only the flusher removes documents, and always from the front
+            for _ in batch:
+                self._pending.popleft()
+            self.flushed += len(batch)
+            async with self._journal_lock:
+                await asyncio.to_thread(self._rewrite_journal, list(self._pending))
+
+        async with self._space:
+            self._space.notify_all()
+        return True
+
+    def _append_journal(self, doc: Dict[str, Any]) -> None:
+        self._journal.write(json_util.dumps(doc) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _rewrite_journal(self, pending: List[Dict[str, Any]]) -> None:
+        # Called under _journal_lock with a snapshot of the queue, so no
+        # document is appended to the old file while it is being replaced
+        tmp_path = self.journal_path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            for doc in pending:
+                f.write(json_util.dumps(doc) + "\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self._journal.close()
+        os.replace(tmp_path, self.journal_path)
+        self._journal = self.journal_path.open("a", encoding="utf-8")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # Drain full batches; back off until the next interval on failure
+            while self._pending and await self.flush():
+                if len(self._pending) < self.flush_size:
+                    break
+
+
+_prediction_buffer: Optional[PredictionWriteBuffer] = None
+
+
+registry.callback(
+    "skinmorph_prediction_buffer_depth", "Predictions queued in the write-behind buffer.",
+    lambda: {(): len(_prediction_buffer) if _prediction_buffer is not None else 0},
+)
+
+
+def get_prediction_buffer() -> Optional[PredictionWriteBuffer]:
+    """The running write-behind buffer, or None if write-behind is disabled."""
+    return _prediction_buffer
+
+
+async def start_prediction_buffer() -> None:
+    global _prediction_buffer
+    if not PREDICTION_WRITE_BEHIND or _prediction_buffer is not None:
+        return
+    # Imported here to avoid a circular import with the storage service
+    from .prediction_storage_service import persist_predictions
+
+    buffer = PredictionWriteBuffer(flush_fn=persist_predictions)
+    await buffer.start()
+    _prediction_buffer = buffer
+
+
+async def stop_prediction_buffer() -> None:
+    global _prediction_buffer
+    if _prediction_buffer is not None:
+        await _prediction_buffer.stop()
+        _prediction_buffer = None
@@ -1,24 +1,145 @@
+import base64
+import binascii
+import json
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from ..db import get_database
+from .prediction_buffer import get_prediction_buffer
+from .triage_service import update_triage_queue
 
 
-async def save_prediction(
+# Number of most recent predictions kept on each user's `user_stats` document.
+# Dashboard pages that fall inside this window are served from that single
+# document instead of querying the `predictions` collection.
+RECENT_PREDICTIONS_LIMIT = 100
+
+# Fields left out of history rows in summary mode; list views do not render them.
+SUMMARY_EXCLUDED_FIELDS = ("top_3_predictions",)
+SUMMARY_PROJECTION = {field: 0 for field in SUMMARY_EXCLUDED_FIELDS}
+
+# Limits for the multi-patient overview aggregation
+OVERVIEW_MAX_PATIENTS = 500
+OVERVIEW_MAX_TIME_MS = 5000
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Times a user_stats rebuild recounts when predictions keep arriving meanwhile
+USER_STATS_REBUILD_ATTEMPTS = 3
+
+# History is ordered newest first; _id breaks ties between equal timestamps.
+HISTORY_SORT = [("created_at", -1), ("_id", -1)]
+
+
+def _stats_key(disease: str) -> str:
+    """Make a disease name safe to use as a MongoDB field name."""
+    key = (disease or "").replace(".", "_").lstrip("$")
+    return key or "unknown"
+
+
+def _to_history_item(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a stored prediction document into a dashboard history item."""
+    item = dict(doc)
+    item["id"] = str(item.pop("_id"))
+    return item
+
+
+def _to_summary_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in item.items() if k not in SUMMARY_EXCLUDED_FIELDS}
+
+
+def encode_cursor(item: Dict[str, Any]) -> str:
+    """Build an opaque continuation token pointing just past a history item."""
+    raw = json.dumps([item["created_at"], item["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[str, ObjectId]:
+    """
+    Decode a continuation token into its (created_at, _id) position.
+    Raises ValueError if the token is malformed.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, prediction_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(created_at), ObjectId(prediction_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError, InvalidId) as exc:
+        raise ValueError("Invalid pagination cursor") from exc
+
+
+def _user_stats_update(prediction_doc: Dict[str, Any]) -> UpdateOne:
+    """
+    Build the write that incrementally updates the materialized per-user
+    counters and the recent-predictions window for a newly stored prediction.
+    A document created by this upsert only counts predictions made since it
+    was created, so it is flagged incomplete and rebuilt from the
+    `predictions` collection on first read.
+    The write only matches if the prediction is not already in the recent
+    window, so applying it again (e.g. when a failed batch is retried) is a
+    no-op; the upsert then fails with a duplicate key error instead.
+    Every update bumps `version`, which rebuilds use to detect it.
+    """
+    disease_key = _stats_key(prediction_doc.get("predicted_disease", ""))
+    return UpdateOne(
+        {"_id": prediction_doc["user_id"], "recent.id": {"$ne": str(prediction_doc["_id"])}},
+        {
+            "$inc": {
+                "total_predictions": 1,
+                f"predictions_by_disease.{disease_key}": 1,
+                "version": 1,
+            },
+            "$push": {
+                "recent": {
+                    "$each": [_to_history_item(prediction_doc)],
+                    "$sort": {"created_at": -1, "id": -1},
+                    "$slice": RECENT_PREDICTIONS_LIMIT,
+                }
+            },
+            "$set": {"updated_at": datetime.utcnow().isoformat()},
+            "$setOnInsert": {"complete": False},
+        },
+        upsert=True,
+    )
+
+
+async def _update_user_stats(db, prediction_docs: List[Dict[str, Any]]) -> None:
+    ops = [_user_stats_update(doc) for doc in prediction_docs]
+    # Duplicate key errors are predictions already counted, or an upsert that
+    # lost the race to create the user's document; the latter succeed on retry
+    for attempt in range(2):
+        try:
+            await db["user_stats"].bulk_write(ops, ordered=False)
+            return
+        except BulkWriteError as exc:
+            errors = exc.details.get("writeErrors", [])
+            if any(err.get("code") != DUPLICATE_KEY_ERROR for err in errors):
+                raise
+            ops = [ops[err["index"]] for err in errors]
+
+
+async def _record_materialized_views(db, prediction_docs: List[Dict[str, Any]]) -> None:
+    """
+    Update `user_stats` and `triage_queue` for stored predictions. Both
+    updates are idempotent, so a batch may be applied more than once.
+    """
+    if not prediction_docs:
+        return
+    await _update_user_stats(db, prediction_docs)
+    await update_triage_queue(db, prediction_docs)
+
+
+def build_prediction_doc(
     user_id: str,
     prediction_result: Dict[str, Any],
     image_filename: str
-) -> str:
-    """
-    Save a prediction to MongoDB.
-    Returns the prediction document ID.
-    """
-    db = get_database()
-    predictions_collection = db["predictions"]
-    
-    # Extract relevant information from prediction result
-    prediction_doc = {
+) -> Dict[str, Any]:
+    """Extract the stored fields of a prediction, with a client-side _id."""
+    return {
+        "_id": ObjectId(),
         "user_id": user_id,
         "predicted_disease": prediction_result.get("predicted_disease", ""),
         "predicted_disease_code": prediction_result.get("predicted_disease_code", ""),
@@ -30,9 +151,50 @@ async def save_prediction(
         "is_invalid_image": prediction_result.get("is_invalid_image", False),
         "created_at": datetime.utcnow().isoformat()
     }
-    
-    result = await predictions_collection.insert_one(prediction_doc)
-    return str(result.inserted_id)
+
+
+async def persist_predictions(prediction_docs: List[Dict[str, Any]]) -> None:
+    """
+    Insert a batch of prediction documents and update the materialized views.
+    Documents that already exist (e.g. replayed from the write-behind journal
+    after a crash, or a retried batch whose view updates failed) are not
+    inserted again, but their view updates are still applied; those updates
+    are idempotent, so counters are never applied twice.
+    """
+    db = get_database()
+    try:
+        await db["predictions"].insert_many(prediction_docs, ordered=False)
+    except BulkWriteError as exc:
+        errors = exc.details.get("writeErrors", [])
+        if any(err.get("code") != DUPLICATE_KEY_ERROR for err in errors):
+            raise
+    await _record_materialized_views(db, prediction_docs)
+
+
+async def save_prediction(
+    user_id: str,
+    prediction_result: Dict[str, Any],
+    image_filename: str
+) -> str:
+    """
+    Save a prediction to MongoDB.
+    Also updates the user's materialized stats in `user_stats` and their
+    entry in the dermatologist `triage_queue`. When the write-behind buffer
+    is enabled the prediction is queued and persisted shortly afterwards.
+    Returns the prediction document ID.
+    """
+    prediction_doc = build_prediction_doc(user_id, prediction_result, image_filename)
+
+    buffer = get_prediction_buffer()
+    if buffer is not None:
+        # Write-behind: queued and persisted in batches off the request path
+        await buffer.put(prediction_doc)
+        return str(prediction_doc["_id"])
+
+    db = get_database()
+    await db["predictions"].insert_one(prediction_doc)
+    await _record_materialized_views(db, [prediction_doc])
+    return str(prediction_doc["_id"])
 
 
 async def get_user_predictions(
@@ -46,22 +208,57 @@ async def get_user_predictions(
     """
     db = get_database()
     predictions_collection = db["predictions"]
-    
+
     # Query predictions for this user, sorted by created_at descending
     cursor = predictions_collection.find(
         {"user_id": user_id}
-    ).sort("created_at", -1).skip(skip).limit(limit)
-    
+    ).sort(HISTORY_SORT).skip(skip).limit(limit)
+
     predictions = []
     async for doc in cursor:
         # Convert MongoDB _id to id for JSON serialization and Pydantic compatibility
-        doc["id"] = str(doc["_id"])
-        doc.pop("_id", None)
-        predictions.append(doc)
-    
+        predictions.append(_to_history_item(doc))
+
     return predictions
 
 
+async def get_user_predictions_page(
+    user_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    summary: bool = False
+) -> Dict[str, Any]:
+    """
+    Get one page of a user's prediction history using keyset pagination.
+    Pages are located by seeking on (created_at, _id) instead of skipping
+    rows, so deep pages cost the same as the first one.
+    Returns the page and the continuation token for the next page, if any.
+    """
+    db = get_database()
+    predictions_collection = db["predictions"]
+
+    query: Dict[str, Any] = {"user_id": user_id}
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": last_id}},
+        ]
+
+    # Fetch one extra row to learn whether another page follows
+    find_cursor = predictions_collection.find(
+        query, SUMMARY_PROJECTION if summary else None
+    ).sort(HISTORY_SORT).limit(limit + 1)
+
+    predictions = [_to_history_item(doc) async for doc in find_cursor]
+    next_cursor = None
+    if len(predictions) > limit:
+        predictions = predictions[:limit]
+        next_cursor = encode_cursor(predictions[-1])
+
+    return {"predictions": predictions, "next_cursor": next_cursor}
+
+
 async def get_prediction_by_id(
     prediction_id: str,
     user_id: Optional[str] = None
@@ -72,45 +269,258 @@ async def get_prediction_by_id(
     """
     db = get_database()
     predictions_collection = db["predictions"]
-    
+
     query = {"_id": ObjectId(prediction_id)}
     if user_id:
         query["user_id"] = user_id
-    
+
     doc = await predictions_collection.find_one(query)
     if doc:
         # Convert MongoDB _id to id for JSON serialization and Pydantic compatibility
-        doc["id"] = str(doc["_id"])
-        doc.pop("_id", None)
+        doc = _to_history_item(doc)
     return doc
 
 
+async def get_patients_overview(
+    patient_ids: List[str],
+    latest: int = 3
+) -> List[Dict[str, Any]]:
+    """
+    Get the latest predictions and summary counts for many patients at once.
+    Uses a single aggregation ($match/$group with $topN) over the
+    user_history index instead of one query per patient.
+    Patients without predictions are included with zero counts, in the
+    order the IDs were given.
+    Raises ValueError for more than OVERVIEW_MAX_PATIENTS patients; callers
+    page larger sets rather than have them cut short.
+    """
+    db = get_database()
+    patient_ids = list(dict.fromkeys(patient_ids))
+    if len(patient_ids) > OVERVIEW_MAX_PATIENTS:
+        raise ValueError(f"At most {OVERVIEW_MAX_PATIENTS} patients per overview")
+
+    severity_counts = {
+        f"{level.lower()}_count": {"$sum": {"$cond": [{"$eq": ["$severity", level]}, 1, 0]}}
+        for level in ("Severe", "Moderate", "Mild")
+    }
+    latest_fields = {
+        field: f"${field}"
+        for field in (
+            "_id", "predicted_disease", "predicted_disease_code", "confidence",
+            "severity", "image_name", "model_version", "is_invalid_image", "created_at",
+        )
+    }
+    pipeline = [
+        {"$match": {"user_id": {"$in": patient_ids}}},
+        {"$group": {
+            "_id": "$user_id",
+            "total_predictions": {"$sum": 1},
+            **severity_counts,
+            "latest_predictions": {"$topN": {
+                "n": latest,
+                "sortBy": dict(HISTORY_SORT),
+                "output": latest_fields,
+            }},
+        }},
+    ]
+
+    found: Dict[str, Dict[str, Any]] = {}
+    async for doc in db["predictions"].aggregate(pipeline, maxTimeMS=OVERVIEW_MAX_TIME_MS):
+        patient_id = doc.pop("_id")
+        doc["latest_predictions"] = [
+            _to_history_item(item) for item in doc["latest_predictions"]
+        ]
+        found[patient_id] = doc
+
+    empty = {"total_predictions": 0, "severe_count": 0, "moderate_count": 0,
+             "mild_count": 0, "latest_predictions": []}
+    return [
+        {"patient_id": patient_id, **found.get(patient_id, empty)}
+        for patient_id in patient_ids
+    ]
+
+
+def _needs_rebuild(stats_doc: Optional[Dict[str, Any]]) -> bool:
+    """Missing, or created by an incremental update rather than a full rebuild."""
+    return stats_doc is None or not stats_doc.get("complete", False)
+
+
+def _stats_from_doc(stats_doc: Dict[str, Any]) -> Dict[str, Any]:
+    by_disease = stats_doc.get("predictions_by_disease") or {}
+    return {
+        "total_predictions": stats_doc.get("total_predictions", 0),
+        "predictions_by_disease": dict(
+            sorted(by_disease.items(), key=lambda kv: kv[1], reverse=True)
+        ),
+    }
+
+
 async def get_user_prediction_stats(user_id: str) -> Dict[str, Any]:
     """
     Get statistics about user's predictions.
+    Reads the materialized counters, rebuilding them if they are missing
+    or incomplete.
     """
     db = get_database()
-    predictions_collection = db["predictions"]
-    
-    # Count total predictions
-    total_count = await predictions_collection.count_documents({"user_id": user_id})
-    
-    # Count predictions by disease
+    stats_doc = await db["user_stats"].find_one(
+        {"_id": user_id}, {"recent": 0}
+    )
+    if _needs_rebuild(stats_doc):
+        stats_doc = await rebuild_user_stats(user_id)
+    return _stats_from_doc(stats_doc)
+
+
+async def get_user_dashboard(
+    user_id: str,
+    limit: int = 50,
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    summary: bool = False
+) -> Dict[str, Any]:
+    """
+    Get a page of prediction history together with the user's stats.
+    Pages inside the recent window are served by a single `user_stats` read;
+    later pages are fetched with keyset pagination via `cursor`.
+    """
+    db = get_database()
+    stats_collection = db["user_stats"]
+    next_cursor = None
+
+    if cursor is None and skip + limit <= RECENT_PREDICTIONS_LIMIT:
+        stats_doc = await stats_collection.find_one(
+            {"_id": user_id},
+            {
+                "total_predictions": 1,
+                "predictions_by_disease": 1,
+                "complete": 1,
+                "recent": {"$slice": [skip, limit]},
+            },
+        )
+        if _needs_rebuild(stats_doc):
+            rebuilt = await rebuild_user_stats(user_id)
+            stats_doc = dict(rebuilt, recent=rebuilt["recent"][skip:skip + limit])
+        predictions = stats_doc.get("recent", [])
+        if summary:
+            predictions = [_to_summary_item(item) for item in predictions]
+        if len(predictions) == limit and stats_doc.get("total_predictions", 0) > skip + limit:
+            next_cursor = encode_cursor(predictions[-1])
+    else:
+        stats_doc = await stats_collection.find_one({"_id": user_id}, {"recent": 0})
+        if _needs_rebuild(stats_doc):
+            stats_doc = await rebuild_user_stats(user_id)
+        if cursor is not None or skip == 0:
+            page = await get_user_predictions_page(
+                user_id, limit=limit, cursor=cursor, summary=summary
+            )
+            predictions, next_cursor = page["predictions"], page["next_cursor"]
+        else:
+            # Legacy offset paging, kept for existing clients
+            predictions = await get_user_predictions(user_id, limit=limit, skip=skip)
+            if summary:
+                predictions = [_to_summary_item(item) for item in predictions]
+
+    stats = _stats_from_doc(stats_doc)
+    return {
+        "predictions": predictions,
+        "total_count": stats["total_predictions"],
+        "stats": stats,
+        "next_cursor": next_cursor,
+    }
+
+
+async def _count_predictions_by_disease(
+    match: Dict[str, Any]
+) -> Dict[str, Dict[str, int]]:
+    """Count stored predictions per user and disease for the given filter."""
+    db = get_database()
     pipeline = [
-        {"$match": {"user_id": user_id}},
+        {"$match": match},
         {"$group": {
-            "_id": "$predicted_disease",
+            "_id": {"user_id": "$user_id", "disease": "$predicted_disease"},
             "count": {"$sum": 1}
         }},
-        {"$sort": {"count": -1}}
     ]
-    
-    disease_counts = {}
-    async for doc in predictions_collection.aggregate(pipeline):
-        disease_counts[doc["_id"]] = doc["count"]
-    
+
+    counts: Dict[str, Dict[str, int]] = {}
+    async for doc in db["predictions"].aggregate(pipeline):
+        by_disease = counts.setdefault(doc["_id"]["user_id"], {})
+        key = _stats_key(doc["_id"].get("disease", ""))
+        by_disease[key] = by_disease.get(key, 0) + doc["count"]
+    return counts
+
+
+async def _build_user_stats(
+    user_id: str, by_disease: Dict[str, int], version: int
+) -> Dict[str, Any]:
     return {
-        "total_predictions": total_count,
-        "predictions_by_disease": disease_counts
+        "_id": user_id,
+        "total_predictions": sum(by_disease.values()),
+        "predictions_by_disease": by_disease,
+        "recent": await get_user_predictions(user_id, limit=RECENT_PREDICTIONS_LIMIT),
+        "complete": True,
+        "version": version,
+        "updated_at": datetime.utcnow().isoformat(),
     }
 
+
+async def _read_stats_version(db, user_id: str) -> Optional[Dict[str, Any]]:
+    """The `version` of a user's stats document, read before counting."""
+    return await db["user_stats"].find_one({"_id": user_id}, {"version": 1})
+
+
+async def _store_user_stats(
+    db, stats_doc: Dict[str, Any], previous: Optional[Dict[str, Any]]
+) -> bool:
+    """
+    Replace the user's stats document with a rebuilt one, but only if no
+    incremental update changed it since `previous` was read; otherwise the
+    replace would drop that update and mark the stale counts complete.
+    Returns False if the document changed.
+    """
+    if previous is None:
+        try:
+            await db["user_stats"].insert_one(stats_doc)
+            return True
+        except DuplicateKeyError:
+            return False
+    result = await db["user_stats"].replace_one(
+        {"_id": stats_doc["_id"], "version": previous.get("version")}, stats_doc
+    )
+    return result.matched_count == 1
+
+
+async def rebuild_user_stats(user_id: str) -> Dict[str, Any]:
+    """
+    Rebuild one user's materialized stats from the `predictions` collection.
+    Returns the new `user_stats` document. If predictions keep arriving
+    while counting, the last count is returned without being stored and the
+    document stays incomplete, to be rebuilt on a later read.
+    """
+    db = get_database()
+    for _ in range(USER_STATS_REBUILD_ATTEMPTS):
+        previous = await _read_stats_version(db, user_id)
+        counts = await _count_predictions_by_disease({"user_id": user_id})
+        version = (previous or {}).get("version") or 0
+        stats_doc = await _build_user_stats(user_id, counts.get(user_id, {}), version)
+        if await _store_user_stats(db, stats_doc, previous):
+            break
+    return stats_doc
+
+
+async def rebuild_all_user_stats() -> int:
+    """
+    Repair job: rebuild every `user_stats` document from scratch and drop
+    documents for users that no longer have predictions.
+    Returns the number of users rebuilt.
+    """
+    db = get_database()
+    previous = {doc["_id"]: doc async for doc in db["user_stats"].find({}, {"version": 1})}
+    counts = await _count_predictions_by_disease({})
+    for user_id, by_disease in counts.items():
+        version = previous.get(user_id, {}).get("version") or 0
+        stats_doc = await _build_user_stats(user_id, by_disease, version)
+        if not await _store_user_stats(db, stats_doc, previous.get(user_id)):
+            # Updated while counting; recount just this user
+            await rebuild_user_stats(user_id)
+    await db["user_stats"].delete_many({"_id": {"$nin": list(counts)}})
+    return len(counts)
@@ -0,0 +1,162 @@
+"""
+PDF rendering for clinician handoff reports.
+
+Kept free of app imports beyond reportlab so it can run in worker processes:
+`render_report_pdf` takes a plain, picklable report context and writes the PDF
+straight to a file.
+"""
+
+import os
+from pathlib import Path
+from typing import Any, Dict, List
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+PAGE_WIDTH, PAGE_HEIGHT = letter
+MARGIN = 72
+LINE_HEIGHT = 14
+THUMBNAIL_SIZE = 96
+
+DISCLAIMER = "This is a non-clinical research prototype. Outputs are not medical advice."
+
+
+class _PageWriter:
+    """Tracks the cursor position and starts new pages as content flows."""
+
+    def __init__(self, c: canvas.Canvas, title: str) -> None:
+        self.c = c
+        self.title = title
+        self.page = 0
+        self.y = 0.0
+        self._new_page()
+
+    def _new_page(self) -> None:
+        if self.page:
+            self.c.showPage()
+        self.page += 1
+        self.c.setFont("Helvetica-Bold", 9)
+        self.c.drawString(MARGIN, PAGE_HEIGHT - 40, self.title)
+        self.c.drawRightString(PAGE_WIDTH - MARGIN, PAGE_HEIGHT - 40, f"Page {self.page}")
+        self.c.setFont("Helvetica", 8)
+        self.c.drawString(MARGIN, 40, DISCLAIMER)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def ensure_space(self, height: float) -> None:
+        if self.y - height < MARGIN:
+            self._new_page()
+
+    def heading(self, text: str, size: int = 13) -> None:
+        self.ensure_space(LINE_HEIGHT * 2.5)
+        self.y -= LINE_HEIGHT
+        self.c.setFont("Helvetica-Bold", size)
+        self.c.drawString(MARGIN, self.y, text)
+        self.y -= LINE_HEIGHT * 1.2
+
+    def line(self, text: str, size: int = 10, indent: float = 0) -> None:
+        self.ensure_space(LINE_HEIGHT)
+        self.c.setFont("Helvetica", size)
+        self.c.drawString(MARGIN + indent, self.y, text)
+        self.y -= LINE_HEIGHT
+
+    def row(self, columns: List[str], offsets: List[float], bold: bool = False) -> None:
+        self.ensure_space(LINE_HEIGHT)
+        self.c.setFont("Helvetica-Bold" if bold else "Helvetica", 9)
+        for text, offset in zip(columns, offsets):
+            self.c.drawString(MARGIN + offset, self.y, text)
+        self.y -= LINE_HEIGHT
+
+    def image(self, path: str, caption: str) -> None:
+        self.ensure_space(THUMBNAIL_SIZE + LINE_HEIGHT)
+        try:
+            self.c.drawImage(
+                ImageReader(path),
+                MARGIN,
+                self.y - THUMBNAIL_SIZE,
+                width=THUMBNAIL_SIZE,
+                height=THUMBNAIL_SIZE,
+                preserveAspectRatio=True,
+            )
+        except Exception:
+            self.line(f"[image unavailable: {Path(path).name}]", size=8)
+            return
+        self.c.setFont("Helvetica", 8)
+        self.c.drawString(MARGIN + THUMBNAIL_SIZE + 10, self.y - LINE_HEIGHT, caption)
+        self.y -= THUMBNAIL_SIZE + LINE_HEIGHT / 2
+
+
+def _render(c: canvas.Canvas, context: Dict[str, Any]) -> None:
+    writer = _PageWriter(c, f"SkinMorph report – {context['user_id']}")
+
+    writer.c.setFont("Helvetica-Bold", 16)
+    writer.c.drawString(MARGIN, writer.y, "SkinMorph Prototype Report")
+    writer.y -= LINE_HEIGHT * 2
+    writer.line(f"Generated: {context['generated_at']} UTC", size=11)
+    writer.line(f"User ID: {context['user_id']}", size=11)
+
+    stats = context.get("stats")
+    writer.heading("Summary metrics")
+    if stats is None:
+        writer.line("Prediction history is currently unavailable.")
+    else:
+        writer.line(f"Total predictions: {stats['total_predictions']}")
+        for disease, count in stats["predictions_by_disease"].items():
+            writer.line(f"{disease}: {count}", indent=12)
+        for level, count in context.get("severity_counts", {}).items():
+            writer.line(f"Severity {level}: {count}", indent=12)
+
+    predictions = context.get("predictions") or []
+    if predictions:
+        writer.heading("Prediction history")
+        offsets = [0, 110, 300, 370, 430]
+        writer.row(["Date", "Prediction", "Confidence", "Severity", "Model"], offsets, bold=True)
+        for pred in predictions:
+            writer.row(
+                [
+                    str(pred.get("created_at", ""))[:19].replace("T", " "),
+                    str(pred.get("predicted_disease", ""))[:32],
+                    f"{float(pred.get('confidence') or 0.0):.1%}",
+                    str(pred.get("severity", "")),
+                    str(pred.get("model_version", "")),
+                ],
+                offsets,
+            )
+        if context.get("predictions_truncated"):
+            writer.line("Older predictions omitted.", size=8)
+
+    lesions = context.get("lesions") or []
+    if lesions:
+        writer.heading("Tracked lesions")
+        for lesion in lesions:
+            writer.line(
+                f"Lesion {lesion['lesion_id']} – {lesion.get('body_site') or 'unspecified site'}",
+                size=11,
+            )
+            if lesion.get("notes"):
+                writer.line(str(lesion["notes"])[:100], size=9, indent=12)
+            for event in lesion["events"]:
+                caption = (
+                    f"{event['captured_at'][:19].replace('T', ' ')}  "
+                    f"{event.get('top_class') or 'n/a'} "
+                    f"({float(event.get('top_prob') or 0.0):.1%})"
+                )
+                if event.get("image_path"):
+                    writer.image(event["image_path"], caption)
+                else:
+                    writer.line(caption, size=9, indent=12)
+
+
+def render_report_pdf(path: str, context: Dict[str, Any]) -> str:
+    """
+    Render a report to `path`, writing to a temporary file first so readers
+    never see a partially written PDF. Returns `path`.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    c = canvas.Canvas(tmp_path, pagesize=letter, pageCompression=1)
+    c.setTitle("SkinMorph Prototype Report")
+    _render(c, context)
+    c.showPage()
+    c.save()
+    os.replace(tmp_path, path)
+    return path
@@ -0,0 +1,246 @@
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from ..db import SessionLocal, get_database
+from ..models import Image, Lesion, Observation, User
+from .prediction_storage_service import (
+    HISTORY_SORT,
+    SUMMARY_PROJECTION,
+    _to_history_item,
+    get_user_prediction_stats,
+)
+from .report_rendering import render_report_pdf
+
+logger = logging.getLogger(__name__)
+
+# Report rendering configuration
+REPORT_CACHE_DIR = Path(os.getenv("SKINMORPH_REPORT_CACHE_DIR", "data/reports"))
+# Worker processes rendering PDFs; reportlab is pure Python and holds the GIL
+REPORT_WORKERS = int(os.getenv("SKINMORPH_REPORT_WORKERS", "2"))
+# Most recent predictions listed in a report
+REPORT_MAX_PREDICTIONS = int(os.getenv("SKINMORPH_REPORT_MAX_PREDICTIONS", "500"))
+# Superseded PDFs are only removed once unused for this long, so a download
+# or export started in any worker process can still read them
+REPORT_STALE_GRACE_SECONDS = float(os.getenv("SKINMORPH_REPORT_STALE_GRACE_SECONDS", "300"))
+# Bump when the report layout changes so cached PDFs are regenerated
+REPORT_TEMPLATE_VERSION = "2"
+
+_executor: Optional[ProcessPoolExecutor] = None
+# Renders in progress, keyed by cache path, so concurrent requests share one
+_inflight: Dict[Path, asyncio.Future] = {}
+# Reports being read in this process (path -> number of readers)
+_pinned: Dict[Path, int] = {}
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that holds torch threads and a running
+        # event loop is not safe
+        _executor = ProcessPoolExecutor(
+            max_workers=max(1, REPORT_WORKERS),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_report_pool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _sql_user_filter(user_id: str):
+    return Lesion.user.has(User.external_id == user_id)
+
+
+def _timeline_version(user_id: str) -> List[Any]:
+    """Cheap fingerprint of the user's lesion timeline."""
+    with SessionLocal() as session:
+        row = (
+            session.query(func.count(Observation.id), func.max(Observation.id), func.max(Image.id))
+            .select_from(Lesion)
+            .outerjoin(Observation, Observation.lesion_id == Lesion.id)
+            .outerjoin(Image, Image.observation_id == Observation.id)
+            .filter(_sql_user_filter(user_id))
+            .one()
+        )
+        lesion_count = session.query(func.count(Lesion.id)).filter(_sql_user_filter(user_id)).scalar()
+    return [lesion_count, *row]
+
+
+def _load_timeline(user_id: str) -> List[Dict[str, Any]]:
+    """The user's lesions and observations, with the first image of each observation."""
+    with SessionLocal() as session:
+        lesions = session.query(Lesion).filter(_sql_user_filter(user_id)).order_by(Lesion.id).all()
+        payload = []
+        for lesion in lesions:
+            events = []
+            for obs in sorted(lesion.observations, key=lambda o: o.captured_at):
+                image_path = next(
+                    (img.file_path for img in obs.images if os.path.exists(img.file_path)), None
+                )
+                events.append({
+                    "captured_at": obs.captured_at.isoformat(),
+                    "top_class": obs.top_class,
+                    "top_prob": obs.top_prob,
+                    "image_path": os.path.abspath(image_path) if image_path else None,
+                })
+            payload.append({
+                "lesion_id": lesion.id,
+                "body_site": lesion.body_site,
+                "notes": lesion.notes,
+                "events": events,
+            })
+    return payload
+
+
+async def _prediction_version(user_id: str) -> Optional[List[Any]]:
+    """
+    Fingerprint of the user's prediction history (count and newest _id, both
+    served by the user_history index), or None if MongoDB is unavailable.
+    """
+    predictions = get_database()["predictions"]
+    try:
+        newest = await predictions.find_one({"user_id": user_id}, {"_id": 1}, sort=HISTORY_SORT)
+        count = await predictions.count_documents({"user_id": user_id})
+    except Exception as exc:
+        logger.warning("Prediction history unavailable for report: %s", exc)
+        return None
+    return [count, str(newest["_id"]) if newest else None]
+
+
+async def _load_predictions(user_id: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]], bool]:
+    db = get_database()
+    stats = await get_user_prediction_stats(user_id)
+    cursor = (
+        db["predictions"]
+        .find({"user_id": user_id}, SUMMARY_PROJECTION)
+        .sort(HISTORY_SORT)
+        .limit(REPORT_MAX_PREDICTIONS + 1)
+    )
+    predictions = [_to_history_item(doc) async for doc in cursor]
+    truncated = len(predictions) > REPORT_MAX_PREDICTIONS
+    return stats, predictions[:REPORT_MAX_PREDICTIONS], truncated
+
+
+async def _build_context(user_id: str, history_available: bool) -> Dict[str, Any]:
+    context: Dict[str, Any] = {
+        "user_id": user_id,
+        "generated_at": datetime.utcnow().isoformat(),
+        "stats": None,
+        "predictions": [],
+        "lesions": await asyncio.to_thread(_load_timeline, user_id),
+    }
+    if history_available:
+        stats, predictions, truncated = await _load_predictions(user_id)
+        severity_counts: Dict[str, int] = {}
+        for pred in predictions:
+            level = pred.get("severity") or "unknown"
+            severity_counts[level] = severity_counts.get(level, 0) + 1
+        context.update(
+            stats=stats,
+            predictions=predictions,
+            predictions_truncated=truncated,
+            severity_counts=severity_counts,
+        )
+    return context
+
+
+def _cache_path(user_id: str, data_version: List[Any]) -> Path:
+    user_dir = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32]
+    key = json.dumps([REPORT_TEMPLATE_VERSION, user_id, data_version], default=str)
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+    return REPORT_CACHE_DIR / user_dir / f"{digest}.pdf"
+
+
+def pin_report(path: Path) -> None:
+    """Keep a cached report from being removed as stale while it is read."""
+    _pinned[path] = _pinned.get(path, 0) + 1
+
+
+def release_report(path: Path, temporary: bool = False) -> None:
+    """Unpin a report once read; temporary reports are deleted."""
+    count = _pinned.get(path, 0) - 1
+    if count > 0:
+        _pinned[path] = count
+    else:
+        _pinned.pop(path, None)
+    if temporary:
+        path.unlink(missing_ok=True)
+
+
+def _remove_stale_reports(current: Path) -> None:
+    """Remove the user's superseded reports that are not pinned or recently used."""
+    cutoff = time.time() - REPORT_STALE_GRACE_SECONDS
+    for path in current.parent.glob("*.pdf"):
+        if path == current or path in _pinned:
+            continue
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+
+
+async def _render(path: Path, context: Dict[str, Any]) -> None:
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_get_executor(), render_report_pdf, str(path), context)
+
+
+async def _render_cached(user_id: str, path: Path) -> None:
+    context = await _build_context(user_id, history_available=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    await _render(path, context)
+    _remove_stale_reports(path)
+
+
+async def get_report(user_id: str) -> Tuple[Path, bool, bool]:
+    """
+    Get a PDF report for a user, rendering it in the worker pool if needed.
+
+    Reports are cached on disk under the user and a fingerprint of their
+    prediction history and lesion timeline, so unchanged reports are served
+    without rendering. Returns (path, cache_hit, temporary); temporary reports
+    (rendered while MongoDB is unavailable) are not cached and should be
+    deleted once sent. Pin the path with `pin_report` before the next await
+    and `release_report` it once read.
+    """
+    prediction_version = await _prediction_version(user_id)
+    timeline_version = await asyncio.to_thread(_timeline_version, user_id)
+
+    if prediction_version is None:
+        fd, tmp_name = tempfile.mkstemp(prefix="report-", suffix=".pdf")
+        os.close(fd)
+        await _render(Path(tmp_name), await _build_context(user_id, history_available=False))
+        return Path(tmp_name), False, True
+
+    path = _cache_path(user_id, [prediction_version, timeline_version])
+    try:
+        # Mark the hit as recently used for the stale-report sweep
+        os.utime(path)
+        return path, True, False
+    except FileNotFoundError:
+        pass
+
+    pending = _inflight.get(path)
+    if pending is None:
+        pending = asyncio.ensure_future(_render_cached(user_id, path))
+        _inflight[path] = pending
+        pending.add_done_callback(lambda _: _inflight.pop(path, None))
+    # Shield so one client disconnecting does not cancel a shared render
+    await asyncio.shield(pending)
+    return path, False, False
@@ -0,0 +1,162 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from ..db import get_database
+from .disease_info_service import SEVERE_DISEASE_CODES, SeverityLevel
+
+
+# Rank of each severity level within the triage ordering
+SEVERITY_RANK: Dict[str, int] = {
+    SeverityLevel.MILD.value: 1,
+    SeverityLevel.MODERATE.value: 2,
+    SeverityLevel.SEVERE.value: 3,
+}
+
+# Queue order: severe disease codes first, then severity level, confidence and recency
+TRIAGE_SORT = [("priority", -1), ("confidence", -1), ("created_at", -1)]
+
+TRIAGE_ENTRY_FIELDS = (
+    "prediction_id",
+    "predicted_disease",
+    "predicted_disease_code",
+    "severity",
+    "confidence",
+    "priority",
+    "created_at",
+)
+
+
+def triage_priority(disease_code: str, severity: str) -> int:
+    """
+    Integer priority of a prediction in the triage queue.
+    Any severe disease code outranks every non-severe one; within each group
+    the severity level decides.
+    """
+    severe_code = 1 if disease_code in SEVERE_DISEASE_CODES else 0
+    return severe_code * 10 + SEVERITY_RANK.get(severity, 0)
+
+
+def _patient_ref(user_id: str):
+    return ObjectId(user_id) if ObjectId.is_valid(user_id) else None
+
+
+def triage_queue_update(prediction_doc: Dict[str, Any]) -> Optional[UpdateOne]:
+    """
+    Build the write that maintains the patient's entry in the materialized
+    `triage_queue` collection, or None if the prediction is not queued.
+    Each patient has one entry holding their most urgent unreviewed prediction:
+    a new prediction replaces it if it ranks at least as high, or if the
+    current entry has already been reviewed. Applying the same prediction
+    again leaves the entry unchanged, including its review state. A replaced
+    entry is back in the queue, so the previous review fields are dropped.
+    """
+    if prediction_doc.get("is_invalid_image"):
+        return None
+
+    user_id = prediction_doc["user_id"]
+    priority = triage_priority(
+        prediction_doc.get("predicted_disease_code", ""),
+        prediction_doc.get("severity", ""),
+    )
+    entry = {
+        "patient_ref": _patient_ref(user_id),
+        "prediction_id": str(prediction_doc["_id"]),
+        "predicted_disease": prediction_doc.get("predicted_disease", ""),
+        "predicted_disease_code": prediction_doc.get("predicted_disease_code", ""),
+        "severity": prediction_doc.get("severity", ""),
+        "confidence": prediction_doc.get("confidence", 0.0),
+        "priority": priority,
+        "created_at": prediction_doc["created_at"],
+        "reviewed": False,
+    }
+
+    # Pipeline update so the comparison with the stored entry is atomic.
+    # Fields are missing on a new entry, hence the $ifNull defaults.
+    replace = {
+        "$and": [
+            {"$ne": [{"$ifNull": ["$prediction_id", None]}, entry["prediction_id"]]},
+            {"$or": [
+                {"$ne": [{"$ifNull": ["$reviewed", True]}, False]},
+                {"$gte": [priority, {"$ifNull": ["$priority", -1]}]},
+            ]},
+        ]
+    }
+    return UpdateOne(
+        {"_id": user_id},
+        [
+            {"$set": {
+                field: {"$cond": [replace, {"$literal": value}, f"${field}"]}
+                for field, value in entry.items()
+            }},
+            # An unreviewed entry keeps only the queue fields, which drops
+            # `reviewed_by` / `reviewed_at` left by the review of a replaced one
+            {"$replaceRoot": {"newRoot": {"$cond": [
+                {"$eq": ["$reviewed", False]},
+                {"_id": "$_id", **{field: f"${field}" for field in entry}},
+                "$$ROOT",
+            ]}}},
+        ],
+        upsert=True,
+    )
+
+
+async def update_triage_queue(db, prediction_docs: List[Dict[str, Any]]) -> None:
+    """Apply the triage queue writes for newly stored predictions in one round trip."""
+    updates = [op for op in map(triage_queue_update, prediction_docs) if op is not None]
+    if updates:
+        await db["triage_queue"].bulk_write(updates, ordered=True)
+
+
+async def get_triage_queue(limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Get the top-N patients needing review, most urgent first, in a single
+    aggregation over the `triage_queue` index.
+    """
+    db = get_database()
+    pipeline = [
+        {"$match": {"reviewed": False}},
+        {"$sort": dict(TRIAGE_SORT)},
+        {"$limit": limit},
+        {"$lookup": {
+            "from": "users",
+            "localField": "patient_ref",
+            "foreignField": "_id",
+            "as": "patient",
+        }},
+        {"$project": {
+            "patient.name": 1,
+            "patient.email": 1,
+            **{field: 1 for field in TRIAGE_ENTRY_FIELDS},
+        }},
+    ]
+
+    queue = []
+    async for doc in db["triage_queue"].aggregate(pipeline):
+        patient = doc["patient"][0] if doc.get("patient") else {}
+        queue.append({
+            "patient_id": doc["_id"],
+            "patient_name": patient.get("name"),
+            "patient_email": patient.get("email"),
+            **{field: doc.get(field) for field in TRIAGE_ENTRY_FIELDS},
+        })
+    return queue
+
+
+async def mark_patient_reviewed(patient_id: str, reviewer_id: str) -> bool:
+    """
+    Remove a patient from the triage queue until their next prediction.
+    Returns False if the patient has no queue entry.
+    """
+    db = get_database()
+    result = await db["triage_queue"].update_one(
+        {"_id": patient_id},
+        {"$set": {
+            "reviewed": True,
+            "reviewed_by": reviewer_id,
+            "reviewed_at": datetime.utcnow().isoformat(),
+        }},
+    )
+    return result.matched_count > 0
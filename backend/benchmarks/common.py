@@ -0,0 +1,49 @@
+"""Shared helpers for the benchmark scripts."""
+
+import math
+from typing import Dict, List, Sequence
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of `samples` (pct in 0–100)."""
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize_ms(samples_s: List[float]) -> Dict[str, float]:
+    """Summarize latencies given in seconds as milliseconds."""
+    return {
+        "count": len(samples_s),
+        "p50_ms": round(percentile(samples_s, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples_s, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples_s, 99) * 1000, 3),
+        "max_ms": round(max(samples_s) * 1000, 3) if samples_s else float("nan"),
+    }
+
+
+def compare_results(
+    baseline: Dict[str, Dict[str, float]],
+    current: Dict[str, Dict[str, float]],
+    tolerance: float,
+    metric: str = "p50_ms",
+) -> List[Dict[str, object]]:
+    """
+    Compare `metric` for the cases present in both result sets. A case
+    regresses when it is slower than the baseline by more than `tolerance`
+    (a fraction, e.g. 0.15 for 15%).
+    """
+    rows = []
+    for case in sorted(set(baseline) & set(current)):
+        before, after = baseline[case][metric], current[case][metric]
+        change = (after - before) / before if before > 0 else 0.0
+        rows.append({
+            "case": case,
+            "baseline": before,
+            "current": after,
+            "change": round(change, 4),
+            "regressed": change > tolerance,
+        })
+    return rows
@@ -0,0 +1,199 @@
+"""
+Hot-path benchmark suite with a regression guard.
+
+Times the ML and API hot paths in-process:
+
+- `preprocess/<size>`      `preprocess_image_bytes` on a JPEG of <size> px
+- `detector/gradcam`        `DetectorModel.predict_image_bytes` with Grad-CAM
+- `detector/no_gradcam`     the same without the Grad-CAM overlay
+- `predictor/seq_<n>`       `SkinMorphPredictor.predict_sequence_bytes`, n = 1..32
+- `skin_gate/<size>`        `is_skin_image_from_bytes` on a JPEG of <size> px
+- `api/predict`             full `/predict` through `TestClient`
+
+Results are printed (and optionally written) as JSON. With `--compare`, the
+run is checked against a stored baseline and the script exits with status 1
+if any case's p50 regressed by more than the tolerance:
+
+    python -m benchmarks.hot_paths --output benchmarks/baseline.json
+    python -m benchmarks.hot_paths --compare benchmarks/baseline.json --tolerance 0.15
+    python -m benchmarks.hot_paths --cases detector,skin_gate --iterations 50
+
+Baselines are only comparable on the same machine and thread settings.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+from PIL import Image
+
+from .common import compare_results, summarize_ms
+
+IMAGE_SIZES = (256, 1024, 2048)
+SKIN_GATE_SIZES = (256, 1024, 2048, 4096)
+SEQUENCE_LENGTHS = (1, 2, 4, 8, 16, 32)
+API_IMAGE_SIZE = 1024
+
+
+def make_image(size: int, seed: int = 0) -> bytes:
+    """A skin-toned JPEG with noise, so the skin gate accepts it and it compresses realistically."""
+    rng = np.random.default_rng(seed)
+    base = np.array([200, 150, 120], dtype=np.int16)
+    noise = rng.integers(-20, 20, size=(size, size, 3), dtype=np.int16)
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+    buffer = BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def time_case(fn: Callable[[], Any], iterations: int, warmup: int) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    summary = summarize_ms(samples)
+    summary["mean_ms"] = round(sum(samples) / len(samples) * 1000, 3)
+    return summary
+
+
+def build_cases(selected: Optional[Sequence[str]]) -> Dict[str, Callable[[], Any]]:
+    """Benchmark callables by case name; models are only loaded for selected groups."""
+
+    def wanted(group: str) -> bool:
+        return not selected or group in selected
+
+    cases: Dict[str, Callable[[], Any]] = {}
+    images = {size: make_image(size, seed=size) for size in set(IMAGE_SIZES + SKIN_GATE_SIZES)}
+
+    if wanted("preprocess"):
+        from app.ml.preprocessing import preprocess_image_bytes
+
+        for size in IMAGE_SIZES:
+            cases[f"preprocess/{size}"] = lambda data=images[size]: preprocess_image_bytes(data)
+
+    if wanted("detector"):
+        from app.ml.detector import DetectorModel
+
+        detector = DetectorModel()
+        data = images[1024]
+        cases["detector/gradcam"] = lambda: detector.predict_image_bytes(data)
+        cases["detector/no_gradcam"] = lambda: detector.predict_image_bytes(data, explain=False)
+
+    if wanted("predictor"):
+        from app.ml.predictor import SkinMorphPredictor
+
+        predictor = SkinMorphPredictor()
+        frames = [make_image(256, seed=i) for i in range(max(SEQUENCE_LENGTHS))]
+        for length in SEQUENCE_LENGTHS:
+            cases[f"predictor/seq_{length}"] = (
+                lambda seq=frames[:length]: predictor.predict_sequence_bytes(seq)
+            )
+
+    if wanted("skin_gate"):
+        from sanity_check import is_skin_image_from_bytes
+
+        for size in SKIN_GATE_SIZES:
+            cases[f"skin_gate/{size}"] = lambda data=images[size]: is_skin_image_from_bytes(data)
+
+    if wanted("api"):
+        from fastapi.testclient import TestClient
+
+        from app.main import create_app
+
+        # Not entered as a context manager: /predict needs no lifespan resources
+        client = TestClient(create_app())
+        data = images[API_IMAGE_SIZE]
+
+        def predict() -> None:
+            resp = client.post("/predict", files={"file": ("bench.jpg", data, "image/jpeg")})
+            if resp.status_code != 200:
+                raise RuntimeError(f"/predict returned {resp.status_code}: {resp.text[:200]}")
+
+        cases["api/predict"] = predict
+
+    return cases
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def run_suite(selected: Optional[Sequence[str]], iterations: int, warmup: int) -> Dict[str, Any]:
+    results = {}
+    for name, fn in build_cases(selected).items():
+        results[name] = time_case(fn, iterations, warmup)
+        print(f"{name:<24} p50 {results[name]['p50_ms']:>10.3f} ms", file=sys.stderr)
+    return {
+        "environment": environment(),
+        "iterations": iterations,
+        "results": results,
+    }
+
+
+def print_comparison(rows: List[Dict[str, Any]], tolerance: float, metric: str) -> None:
+    print(f"\n{'case':<24} {'baseline':>12} {'current':>12} {'change':>9}  (metric {metric}, tolerance {tolerance:.0%})",
+          file=sys.stderr)
+    for row in rows:
+        flag = "  REGRESSED" if row["regressed"] else ""
+        print(
+            f"{row['case']:<24} {row['baseline']:>12.3f} {row['current']:>12.3f} {row['change']:>+9.1%}{flag}",
+            file=sys.stderr,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument(
+        "--cases", default="",
+        help="Comma-separated groups to run: preprocess, detector, predictor, skin_gate, api (default: all)",
+    )
+    parser.add_argument("--output", help="Write the results JSON to this file")
+    parser.add_argument("--compare", help="Baseline results JSON to check this run against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown as a fraction")
+    parser.add_argument("--metric", default="p50_ms", help="Summary statistic compared against the baseline")
+    parser.add_argument("--threads", type=int, help="torch.set_num_threads before running")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    selected = [c.strip() for c in args.cases.split(",") if c.strip()]
+    report = run_suite(selected, args.iterations, args.warmup)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report, indent=2))
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        rows = compare_results(baseline["results"], report["results"], args.tolerance, args.metric)
+        print_comparison(rows, args.tolerance, args.metric)
+        missing = sorted(set(report["results"]) - set(baseline["results"]))
+        if missing:
+            print(f"Not in baseline: {', '.join(missing)}", file=sys.stderr)
+        if any(row["regressed"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+Local load test with in-process database stand-ins.
+
+Boots the app in this process against mongomock-motor (installed through
+`db.set_db_client`) and a fresh SQLite file, seeds users, predictions and
+lesion timelines at the requested scale, then drives a weighted mix of
+login, predict, upload, dashboard, timeline and dermatologist traffic at a
+fixed concurrency through an ASGI transport. No MongoDB, network or
+pretrained weights are needed: the backbones start from random weights of
+the same cost unless `--pretrained` is given.
+
+Everything the app writes (SQLite, uploads, logs) goes to a temporary
+working directory. Client and server share one event loop, as with a single
+uvicorn worker, so absolute numbers are a lower bound on what one worker
+sustains; use the report to compare changes rather than to size production.
+
+    python -m benchmarks.load_test --patients 200 --predictions 50 \
+        --concurrency 32 --duration 30 --mix dashboard=4,predict=2,login=1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .common import summarize_ms
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PASSWORD = "load-test-password"
+DEFAULT_MIX = "login=1,predict=2,upload=1,dashboard=4,timeline=2,dermatologist=1"
+IMAGE_POOL_SIZE = 16
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip():
+            mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def make_image(size: int, seed: int) -> bytes:
+    """A skin-toned JPEG, so requests pass the skin gate."""
+    rng = np.random.default_rng(seed)
+    pixels = np.clip(np.array([200, 150, 120]) + rng.integers(-20, 20, (size, size, 3)), 0, 255)
+    buffer = BytesIO()
+    Image.fromarray(pixels.astype(np.uint8)).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def seed_mongo(patients: int, dermatologists: int, predictions: int, rng: random.Random) -> Dict[str, Any]:
+    """Insert users and prediction history; returns their emails, ids and tokens."""
+    from app.core.auth import create_access_token, get_password_hash
+    from app.db import get_database
+    from app.ml.detector import CLASS_NAMES
+    from app.services.predict_service import enrich_prediction_with_medical_info
+    from app.services.prediction_storage_service import build_prediction_doc, persist_predictions
+
+    db = get_database()
+    # Hashing is deliberately slow; every user shares one hash
+    password_hash = get_password_hash(PASSWORD)
+    now = datetime.utcnow()
+    users = [
+        {
+            "email": f"{role}{i}@loadtest.example.com",
+            "password": password_hash,
+            "name": f"{role.title()} {i}",
+            "age": rng.randint(18, 80),
+            "gender": rng.choice(["female", "male", "other"]),
+            "role": role,
+            "created_at": now.isoformat(),
+        }
+        for role, count in (("patient", patients), ("dermatologist", dermatologists))
+        for i in range(count)
+    ]
+    result = await db["users"].insert_many(users)
+    for user, user_id in zip(users, result.inserted_ids):
+        user["id"] = str(user_id)
+        user["token"] = create_access_token(
+            data={"sub": user["id"], "email": user["email"], "role": user["role"]}
+        )
+
+    patient_users = [u for u in users if u["role"] == "patient"]
+    for user in patient_users:
+        docs = []
+        for n in range(predictions):
+            weights = [rng.random() for _ in CLASS_NAMES]
+            total = sum(weights)
+            classes = sorted(
+                ({"label": c, "probability": w / total} for c, w in zip(CLASS_NAMES, weights)),
+                key=lambda c: c["probability"],
+                reverse=True,
+            )
+            enriched = enrich_prediction_with_medical_info(
+                {"top_class": classes[0], "all_classes": classes, "gradcam_overlay_png_b64": None}
+            )
+            doc = build_prediction_doc(user["id"], enriched, f"seed_{n}.jpg")
+            doc["created_at"] = (now - timedelta(hours=n)).isoformat()
+            docs.append(doc)
+        if docs:
+            await persist_predictions(docs)
+
+    return {
+        "patients": patient_users,
+        "dermatologists": [u for u in users if u["role"] == "dermatologist"],
+    }
+
+
+def seed_sql(users: int, lesions_per_user: int, observations: int, rng: random.Random) -> int:
+    """Insert SQL users with lesion timelines; returns the number of users."""
+    from app.db import SessionLocal
+    from app.ml.detector import CLASS_NAMES
+    from app.models import Lesion, Observation, User
+
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        for i in range(users):
+            user = User(external_id=f"load-{i}")
+            db.add(user)
+            db.flush()
+            for _ in range(lesions_per_user):
+                lesion = Lesion(user_id=user.id, body_site=rng.choice(["arm", "back", "face", "leg"]))
+                db.add(lesion)
+                db.flush()
+                db.add_all(
+                    Observation(
+                        lesion_id=lesion.id,
+                        captured_at=now - timedelta(days=30 * k),
+                        top_class=rng.choice(CLASS_NAMES),
+                        top_prob=rng.random(),
+                    )
+                    for k in range(observations)
+                )
+        db.commit()
+    finally:
+        db.close()
+    return users
+
+
+Operation = Callable[[Any, Dict[str, Any], random.Random], Awaitable[Any]]
+
+
+async def op_login(client, ctx, rng):
+    user = rng.choice(ctx["patients"])
+    return await client.post("/auth/login", json={"email": user["email"], "password": PASSWORD})
+
+
+async def op_predict(client, ctx, rng):
+    data = rng.choice(ctx["images"])
+    return await client.post("/predict", files={"file": ("load.jpg", data, "image/jpeg")})
+
+
+async def op_upload(client, ctx, rng):
+    data = rng.choice(ctx["images"])
+    return await client.post(
+        "/upload",
+        files={"file": ("load.jpg", data, "image/jpeg")},
+        data={"user_external_id": f"load-{rng.randrange(ctx['sql_users'])}", "body_site": "arm"},
+    )
+
+
+async def op_dashboard(client, ctx, rng):
+    user = rng.choice(ctx["patients"])
+    return await client.get(
+        "/dashboard/predictions", params={"limit": 20},
+        headers={"Authorization": f"Bearer {user['token']}"},
+    )
+
+
+async def op_timeline(client, ctx, rng):
+    return await client.get("/timeline", params={"user_id": rng.randint(1, ctx["sql_users"])})
+
+
+async def op_dermatologist(client, ctx, rng):
+    user = rng.choice(ctx["dermatologists"])
+    return await client.get(
+        "/dermatologist/patients", params={"limit": 50},
+        headers={"Authorization": f"Bearer {user['token']}"},
+    )
+
+
+OPERATIONS: Dict[str, Operation] = {
+    "login": op_login,
+    "predict": op_predict,
+    "upload": op_upload,
+    "dashboard": op_dashboard,
+    "timeline": op_timeline,
+    "dermatologist": op_dermatologist,
+}
+
+
+async def drive(
+    client, ctx: Dict[str, Any], mix: Dict[str, float], concurrency: int, duration: float, seed: int
+) -> Tuple[Dict[str, List[Tuple[float, int]]], Dict[str, str], float]:
+    """Run `concurrency` workers issuing weighted random operations until `duration` elapses."""
+    names, weights = list(mix), list(mix.values())
+    samples: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+    failures: Dict[str, str] = {}
+    deadline = time.perf_counter() + duration
+
+    async def worker(worker_id: int) -> None:
+        rng = random.Random(seed * 1000 + worker_id)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                resp = await OPERATIONS[name](client, ctx, rng)
+                status = resp.status_code
+            except Exception as exc:
+                # The app raised instead of responding
+                status = 0
+                failures.setdefault(name, repr(exc))
+            samples[name].append((time.perf_counter() - start, status))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return samples, failures, time.perf_counter() - start
+
+
+def build_report(
+    samples: Dict[str, List[Tuple[float, int]]],
+    failures: Dict[str, str],
+    elapsed: float,
+    config: Dict[str, Any],
+) -> Dict[str, Any]:
+    routes = {}
+    for name, items in sorted(samples.items()):
+        latencies = [s for s, _ in items]
+        statuses = Counter(status for _, status in items)
+        errors = sum(count for status, count in statuses.items() if status == 0 or status >= 400)
+        routes[name] = {
+            **summarize_ms(latencies),
+            "throughput_rps": round(len(items) / elapsed, 2),
+            "error_rate": round(errors / len(items), 4),
+            "status_codes": {str(k): v for k, v in sorted(statuses.items())},
+        }
+        if name in failures:
+            routes[name]["first_exception"] = failures[name]
+    total = sum(len(items) for items in samples.values())
+    errors = sum(round(r["error_rate"] * r["count"]) for r in routes.values())
+    return {
+        "config": config,
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "routes": routes,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"{report['requests']} requests in {report['elapsed_s']} s: "
+        f"{report['throughput_rps']} req/s, error rate {report['error_rate']:.2%}",
+        file=sys.stderr,
+    )
+    print(f"{'operation':<14} {'count':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}",
+          file=sys.stderr)
+    for name, r in report["routes"].items():
+        print(
+            f"{name:<14} {r['count']:>7} {r['throughput_rps']:>8.1f} {r['p50_ms']:>9.1f} "
+            f"{r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['error_rate']:>8.2%}",
+            file=sys.stderr,
+        )
+        if "first_exception" in r:
+            print(f"  first exception: {r['first_exception']}", file=sys.stderr)
+
+
+async def run(args) -> Dict[str, Any]:
+    import httpx
+    from mongomock_motor import AsyncMongoMockClient
+
+    from app import db
+    from app.main import create_app
+
+    db.set_db_client(AsyncMongoMockClient())
+    app = create_app()
+    rng = random.Random(args.seed)
+
+    async with app.router.lifespan_context(app):
+        seed_start = time.perf_counter()
+        ctx = await seed_mongo(args.patients, args.dermatologists, args.predictions, rng)
+        ctx["sql_users"] = seed_sql(args.patients, args.lesions, args.observations, rng)
+        ctx["images"] = [make_image(args.image_size, seed=i) for i in range(IMAGE_POOL_SIZE)]
+        print(f"Seeded in {time.perf_counter() - seed_start:.1f} s", file=sys.stderr)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load.test", timeout=None) as client:
+            # Load the models before timing starts
+            await op_predict(client, ctx, rng)
+            samples, failures, elapsed = await drive(
+                client, ctx, parse_mix(args.mix), args.concurrency, args.duration, args.seed
+            )
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "workdir")}
+    return build_report(samples, failures, elapsed, config)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=100)
+    parser.add_argument("--dermatologists", type=int, default=5)
+    parser.add_argument("--predictions", type=int, default=20, help="Seeded predictions per patient")
+    parser.add_argument("--lesions", type=int, default=2, help="Seeded lesions per SQL user")
+    parser.add_argument("--observations", type=int, default=5, help="Seeded observations per lesion")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of traffic")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Operation weights, e.g. dashboard=4,predict=1")
+    parser.add_argument("--image-size", type=int, default=512)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pretrained", action="store_true", help="Use ImageNet weights (downloads them)")
+    parser.add_argument("--workdir", help="Working directory for app data (default: a temporary directory)")
+    parser.add_argument("--output", help="Write the report JSON to this file")
+    args = parser.parse_args()
+    parse_mix(args.mix)
+
+    output = Path(args.output).resolve() if args.output else None
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="skinmorph-load-")).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    # Settings are read at import time, so they are set before the app is imported.
+    # They are overwritten, not defaulted, so seeding and load traffic never reach
+    # a database exported in the calling shell.
+    os.environ["SKINMORPH_DB_URL"] = f"sqlite:///{workdir / 'load.db'}"
+    os.environ["SKINMORPH_PRETRAINED_BACKBONE"] = "true" if args.pretrained else "false"
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.chdir(workdir)
+    print(f"Working directory: {workdir}", file=sys.stderr)
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if output:
+        output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
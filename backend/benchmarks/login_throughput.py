@@ -0,0 +1,132 @@
+"""
+Login throughput benchmark.
+
+Hammers `/auth/login` with concurrent clients against a running API
+(e.g. `uvicorn app.main:app`) while probing a cheap endpoint, and reports the
+probe's p50/p99 latency alongside login throughput. With password hashing on
+the worker pool, probe latency should stay flat while logins are saturated;
+rejected logins show up as 503s once the hashing queue is full.
+
+    python -m benchmarks.login_throughput --base-url http://localhost:8000 \
+        --concurrency 32 --duration 15
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List
+
+import httpx
+
+from .common import summarize_ms
+
+
+async def _ensure_user(client: httpx.AsyncClient, email: str, password: str) -> None:
+    resp = await client.post(
+        "/auth/signup",
+        json={"email": email, "password": password, "name": "Bench", "age": 30, "gender": "other"},
+    )
+    if resp.status_code not in (201, 400):
+        raise RuntimeError(f"Could not create benchmark user: {resp.status_code} {resp.text}")
+
+
+async def _login_worker(
+    client: httpx.AsyncClient,
+    email: str,
+    password: str,
+    deadline: float,
+    latencies: List[float],
+    statuses: Counter,
+) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            resp = await client.post("/auth/login", json={"email": email, "password": password})
+            statuses[resp.status_code] += 1
+        except httpx.HTTPError as exc:
+            statuses[type(exc).__name__] += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def _probe_worker(
+    client: httpx.AsyncClient,
+    path: str,
+    interval: float,
+    deadline: float,
+    latencies: List[float],
+) -> None:
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            await client.get(path)
+        except httpx.HTTPError:
+            pass
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+
+
+async def run_benchmark(
+    base_url: str,
+    concurrency: int,
+    duration: float,
+    probe_path: str,
+    probe_interval: float,
+) -> Dict[str, object]:
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "benchmark-password"
+    limits = httpx.Limits(max_connections=concurrency + 4)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+        await _ensure_user(client, email, password)
+
+        # Baseline probe latency with no login load
+        baseline: List[float] = []
+        await _probe_worker(client, probe_path, probe_interval, time.perf_counter() + 2.0, baseline)
+
+        login_latencies: List[float] = []
+        probe_latencies: List[float] = []
+        statuses: Counter = Counter()
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            _probe_worker(client, probe_path, probe_interval, deadline, probe_latencies),
+            *(
+                _login_worker(client, email, password, deadline, login_latencies, statuses)
+                for _ in range(concurrency)
+            ),
+        )
+
+    return {
+        "base_url": base_url,
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "logins_per_s": round(statuses.get(200, 0) / duration, 2),
+        "login_status_counts": {str(k): v for k, v in statuses.items()},
+        "login_latency": summarize_ms(login_latencies),
+        f"probe_{probe_path}_idle": summarize_ms(baseline),
+        f"probe_{probe_path}_under_load": summarize_ms(probe_latencies),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of login load")
+    parser.add_argument("--probe-path", default="/health")
+    parser.add_argument("--probe-interval", type=float, default=0.02)
+    args = parser.parse_args()
+
+    result = asyncio.run(
+        run_benchmark(
+            args.base_url, args.concurrency, args.duration, args.probe_path, args.probe_interval
+        )
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+JSON serialization benchmark.
+
+Compares FastAPI's default response path (`jsonable_encoder` followed by
+`JSONResponse`, i.e. stdlib `json`) with rendering the same content through
+`ORJSONResponse` on realistic payloads: a `/predict` response with a Grad-CAM
+overlay, a page of dashboard history and a dermatologist overview.
+
+    python -m benchmarks.serialization --iterations 500
+"""
+
+import argparse
+import base64
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.ml.detector import CLASS_NAMES
+from app.ml.recommendations import RecommendationEngine
+from app.services.predict_service import enrich_prediction_with_medical_info
+
+from .common import summarize_ms
+
+
+def _detector_output(rng: random.Random, overlay_bytes: int) -> Dict[str, Any]:
+    weights = [rng.random() for _ in CLASS_NAMES]
+    total = sum(weights)
+    classes = sorted(
+        ({"label": label, "probability": w / total} for label, w in zip(CLASS_NAMES, weights)),
+        key=lambda c: c["probability"],
+        reverse=True,
+    )
+    return {
+        "top_class": classes[0],
+        "all_classes": classes,
+        "top_3_predictions": classes[:3],
+        "gradcam_overlay_png_b64": base64.b64encode(os.urandom(overlay_bytes)).decode("ascii"),
+        "metadata_echo": None,
+    }
+
+
+def _history_item(rng: random.Random, i: int, created_at: datetime) -> Dict[str, Any]:
+    enriched = enrich_prediction_with_medical_info(_detector_output(rng, 0))
+    return {
+        "id": f"{i:024x}",
+        "user_id": "64b7f0c2a1b2c3d4e5f60718",
+        "predicted_disease": enriched["predicted_disease"],
+        "predicted_disease_code": enriched["predicted_disease_code"],
+        "confidence": enriched["confidence"],
+        "severity": enriched["severity_level"],
+        "image_name": f"upload_{i}.jpg",
+        "top_3_predictions": enriched["top_predictions"],
+        "model_version": enriched["model_version"],
+        "is_invalid_image": False,
+        "created_at": (created_at - timedelta(hours=i)).isoformat(),
+    }
+
+
+def build_payloads(seed: int, overlay_kb: int, history: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    now = datetime(2024, 1, 1)
+    detector_output = _detector_output(rng, overlay_kb * 1024)
+    predictions = [_history_item(rng, i, now) for i in range(history)]
+    return {
+        "predict": {
+            "prediction": detector_output,
+            "recommendations": RecommendationEngine().get_recommendations(detector_output),
+        },
+        "predict_enriched": enrich_prediction_with_medical_info(detector_output),
+        "dashboard": {
+            "predictions": predictions,
+            "total_count": history,
+            "stats": {"total_predictions": history, "predictions_by_disease": {"acne": history}},
+            "next_cursor": "WyIyMDI0LTAxLTAxVDAwOjAwOjAwIiwiMDAwIl0",
+        },
+        "overview": {
+            "patients": [
+                {
+                    "patient_id": f"{p:024x}",
+                    "total_predictions": 12,
+                    "severity_counts": {"Mild": 8, "Moderate": 3, "Severe": 1},
+                    "latest_predictions": predictions[:3],
+                }
+                for p in range(200)
+            ],
+            "count": 200,
+        },
+    }
+
+
+def _default_path(content: Any) -> bytes:
+    return JSONResponse(content=jsonable_encoder(content)).body
+
+
+def _orjson_path(content: Any) -> bytes:
+    return ORJSONResponse(content=content).body
+
+
+def _time(fn: Callable[[Any], bytes], content: Any, iterations: int) -> List[float]:
+    fn(content)  # warm up
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(content)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def run_benchmark(iterations: int, seed: int, overlay_kb: int, history: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for name, content in build_payloads(seed, overlay_kb, history).items():
+        default = _time(_default_path, content, iterations)
+        fast = _time(_orjson_path, content, iterations)
+        assert json.loads(_default_path(content)) == json.loads(_orjson_path(content))
+        default_summary, fast_summary = summarize_ms(default), summarize_ms(fast)
+        results[name] = {
+            "bytes": len(_orjson_path(content)),
+            "jsonable_encoder+json": default_summary,
+            "orjson": fast_summary,
+            "p50_speedup": round(default_summary["p50_ms"] / max(fast_summary["p50_ms"], 1e-6), 1),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--overlay-kb", type=int, default=150, help="Size of the raw Grad-CAM PNG")
+    parser.add_argument("--history", type=int, default=100, help="Predictions per dashboard page")
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.iterations, args.seed, args.overlay_kb, args.history), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,10 @@ Evaluation script for detector on a labeled dataset.
 Computes per-class precision/recall/F1 and (placeholder) skin-tone-stratified metrics.
 """
 
+import os
 from collections import defaultdict
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 from sklearn.metrics import classification_report
@@ -17,6 +18,21 @@ from app.ml.detector import DetectorModel, CLASS_NAMES
 from app.ml.preprocessing import IMG_SIZE
 
 
+class DetectorImageFolder(ImageFolder):
+    """
+    ImageFolder labelled in `CLASS_NAMES` order, as in `train_detector.py`.
+    Plain ImageFolder numbers the folders alphabetically, which does not
+    match the order of the detector head.
+    """
+
+    def find_classes(self, directory: str) -> Tuple[List[str], Dict[str, int]]:
+        found = sorted(entry.name for entry in os.scandir(directory) if entry.is_dir())
+        unknown = [name for name in found if name not in CLASS_NAMES]
+        if unknown:
+            raise ValueError(f"Unknown class folders {unknown} (expected some of {CLASS_NAMES})")
+        return found, {name: CLASS_NAMES.index(name) for name in found}
+
+
 def evaluate_detector(
     data_dir: str = "data/demo_detector/val",
     metadata_csv: Optional[str] = None,
@@ -30,7 +46,7 @@ def evaluate_detector(
     """
     model = DetectorModel()
 
-    ds = ImageFolder(
+    ds = DetectorImageFolder(
         data_dir,
         transform=T.Compose(
             [
@@ -51,9 +67,10 @@ def evaluate_detector(
         y_true.append(label)
         y_pred.append(pred)
 
-    # sklearn classification report (overall)
+    # sklearn classification report (overall); every class is listed even if absent
+    labels = list(range(len(CLASS_NAMES)))
     report = classification_report(
-        y_true, y_pred, target_names=CLASS_NAMES, digits=3, zero_division=0
+        y_true, y_pred, labels=labels, target_names=CLASS_NAMES, digits=3, zero_division=0
     )
     print("=== Overall metrics ===")
     print(report)
@@ -78,6 +95,7 @@ def evaluate_detector(
                 classification_report(
                     sub["y_true"],
                     sub["y_pred"],
+                    labels=labels,
                     target_names=CLASS_NAMES,
                     digits=3,
                     zero_division=0,
@@ -0,0 +1,311 @@
+"""
+Generate a synthetic dataset at realistic scale for benchmarks and training
+smoke tests, without downloading real medical images.
+
+Produces, under `--out` (default `data/synthetic`):
+
+    detector/{train,val}/<class>/<name>.{jpg,png}   one folder per CLASS_NAMES class
+    detector/metadata.csv                           filepath, split, label, fitzpatrick, size, format
+    predictor/seq_<n>/t<k>.{jpg,png}                variable-length sequences
+    predictor/sequences.csv                         sequence, label, fitzpatrick, length, size, format
+    manifest.json                                   generation settings and counts
+
+Images show class-specific synthetic lesions (e.g. many small red papules
+for acne, a large irregular dark lesion for melanoma_suspect) on a skin tone
+drawn from the image's Fitzpatrick type, so models can learn something from
+them. They are not medically meaningful.
+
+Every image is rendered from its own seed derived from `--seed`, so the
+output is identical whatever the number of worker processes:
+
+    python generate_synthetic_data.py --per-class 500 --sequences 1000
+    python generate_synthetic_data.py --resolutions 224,512,1024 --jpeg-fraction 0.7 \
+        --min-length 2 --max-length 24 --workers 8 --out data/synthetic_large
+
+`--out detector` can be passed to `train_detector.py` / `evaluate.py`
+(with `detector/metadata.csv` for Fitzpatrick-stratified metrics), and
+`--out predictor` to `train_predictor.py`.
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+from app.ml.detector import CLASS_NAMES
+
+FITZPATRICK_TYPES = ["I", "II", "III", "IV", "V", "VI"]
+# Representative RGB skin tones per Fitzpatrick type
+SKIN_TONES = {
+    "I": (255, 224, 196),
+    "II": (241, 194, 167),
+    "III": (224, 172, 138),
+    "IV": (189, 134, 99),
+    "V": (142, 94, 66),
+    "VI": (92, 61, 45),
+}
+
+# Per class: lesion colour, number of lesions, radius range (fraction of the
+# image side), outline irregularity, blur (fraction of the side) and opacity
+LESION_STYLES: Dict[str, Dict[str, Any]] = {
+    "benign_nevus": {"color": (110, 70, 50), "count": (1, 1), "radius": (0.06, 0.12), "irregularity": 0.05, "blur": 0.004, "alpha": 230},
+    "melanoma_suspect": {"color": (45, 28, 30), "count": (1, 2), "radius": (0.10, 0.20), "irregularity": 0.35, "blur": 0.003, "alpha": 240},
+    "seborrheic_keratosis": {"color": (140, 100, 60), "count": (1, 2), "radius": (0.08, 0.15), "irregularity": 0.15, "blur": 0.002, "alpha": 220},
+    "acne": {"color": (200, 60, 60), "count": (5, 25), "radius": (0.01, 0.03), "irregularity": 0.1, "blur": 0.004, "alpha": 200},
+    "eczema": {"color": (210, 110, 100), "count": (2, 5), "radius": (0.10, 0.25), "irregularity": 0.3, "blur": 0.03, "alpha": 140},
+    "psoriasis": {"color": (200, 90, 90), "count": (1, 4), "radius": (0.08, 0.20), "irregularity": 0.25, "blur": 0.006, "alpha": 200},
+    "rosacea": {"color": (220, 100, 100), "count": (1, 1), "radius": (0.30, 0.45), "irregularity": 0.2, "blur": 0.06, "alpha": 110},
+}
+
+# Seed streams, so detector images and sequences never share seeds
+DETECTOR_STREAM = 1
+SEQUENCE_STREAM = 2
+
+
+def _rng(seed: int, stream: int, index: int) -> np.random.Generator:
+    return np.random.default_rng([seed, stream, index])
+
+
+def _background(rng: np.random.Generator, size: int, fitzpatrick: str) -> Image.Image:
+    """Skin-toned background with low-frequency shading and fine grain."""
+    tone = np.array(SKIN_TONES[fitzpatrick], dtype=np.float32)
+    shading = rng.normal(0.0, 8.0, size=(8, 8, 1)).astype(np.float32)
+    shading = np.asarray(
+        Image.fromarray(shading[:, :, 0]).resize((size, size), Image.BILINEAR), dtype=np.float32
+    )[:, :, None]
+    grain = rng.normal(0.0, 4.0, size=(size, size, 3)).astype(np.float32)
+    pixels = np.clip(tone + shading + grain, 0, 255).astype(np.uint8)
+    return Image.fromarray(pixels, "RGB")
+
+
+def _lesion_polygon(
+    rng: np.random.Generator, center: Tuple[float, float], radius: float, irregularity: float
+) -> List[Tuple[float, float]]:
+    angles = np.linspace(0, 2 * math.pi, 24, endpoint=False)
+    radii = radius * (1 + irregularity * rng.uniform(-1, 1, size=angles.shape))
+    return [(center[0] + r * math.cos(a), center[1] + r * math.sin(a)) for a, r in zip(angles, radii)]
+
+
+def plan_lesions(rng: np.random.Generator, label: str) -> List[Dict[str, Any]]:
+    """Lesion positions and sizes, as fractions of the image side."""
+    style = LESION_STYLES[label]
+    count = int(rng.integers(style["count"][0], style["count"][1] + 1))
+    return [
+        {
+            "center": (float(rng.uniform(0.25, 0.75)), float(rng.uniform(0.25, 0.75))),
+            "radius": float(rng.uniform(*style["radius"])),
+            "shade": float(rng.uniform(0.85, 1.15)),
+        }
+        for _ in range(count)
+    ]
+
+
+def render(
+    rng: np.random.Generator,
+    size: int,
+    label: str,
+    fitzpatrick: str,
+    lesions: List[Dict[str, Any]],
+    growth: float = 1.0,
+    darkening: float = 1.0,
+) -> Image.Image:
+    """Draw `lesions` for `label` on a skin background; `growth` scales their radius."""
+    style = LESION_STYLES[label]
+    image = _background(rng, size, fitzpatrick)
+    overlay = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    for lesion in lesions:
+        color = tuple(int(np.clip(c * lesion["shade"] / darkening, 0, 255)) for c in style["color"])
+        center = (lesion["center"][0] * size, lesion["center"][1] * size)
+        polygon = _lesion_polygon(rng, center, lesion["radius"] * growth * size, style["irregularity"])
+        draw.polygon(polygon, fill=color + (style["alpha"],))
+        if label == "psoriasis":
+            # Silvery scale on top of the plaque
+            for _ in range(int(lesion["radius"] * size)):
+                x, y = rng.normal(center, lesion["radius"] * growth * size / 2)
+                r = max(1.0, size * 0.003)
+                draw.ellipse((x - r, y - r, x + r, y + r), fill=(235, 230, 225, 200))
+    blur = style["blur"] * size
+    if blur >= 0.5:
+        overlay = overlay.filter(ImageFilter.GaussianBlur(blur))
+    image.paste(overlay, (0, 0), overlay)
+    return image
+
+
+def _save(image: Image.Image, path: Path, fmt: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "jpg":
+        image.save(path, format="JPEG", quality=90)
+    else:
+        image.save(path, format="PNG")
+
+
+def _choose(rng: np.random.Generator, options: List[Any]) -> Any:
+    return options[int(rng.integers(len(options)))]
+
+
+def make_detector_image(task: Tuple[int, int, str, str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Render and save one detector image; returns its metadata row."""
+    index, seed, label, split, cfg = task
+    rng = _rng(seed, DETECTOR_STREAM, index)
+    size = int(_choose(rng, cfg["resolutions"]))
+    fmt = "jpg" if rng.random() < cfg["jpeg_fraction"] else "png"
+    fitzpatrick = _choose(rng, FITZPATRICK_TYPES)
+    image = render(rng, size, label, fitzpatrick, plan_lesions(rng, label))
+    relative = f"{label}/img_{index:07d}.{fmt}"
+    _save(image, Path(cfg["out"]) / "detector" / split / relative, fmt)
+    return {
+        "index": index,
+        "filepath": relative,
+        "split": split,
+        "label": label,
+        "fitzpatrick": fitzpatrick,
+        "width": size,
+        "height": size,
+        "format": fmt,
+    }
+
+
+def make_sequence(task: Tuple[int, int, Dict[str, Any]]) -> Dict[str, Any]:
+    """Render one lesion sequence that grows and darkens over time; returns its metadata row."""
+    index, seed, cfg = task
+    rng = _rng(seed, SEQUENCE_STREAM, index)
+    label = _choose(rng, CLASS_NAMES)
+    fitzpatrick = _choose(rng, FITZPATRICK_TYPES)
+    size = int(_choose(rng, cfg["resolutions"]))
+    fmt = "jpg" if rng.random() < cfg["jpeg_fraction"] else "png"
+    length = int(rng.integers(cfg["min_length"], cfg["max_length"] + 1))
+    growth_rate = float(rng.uniform(0.0, 0.08))
+    lesions = plan_lesions(rng, label)
+    seq_dir = Path(cfg["out"]) / "predictor" / f"seq_{index:06d}"
+    for t in range(length):
+        image = render(rng, size, label, fitzpatrick, lesions, growth=1 + growth_rate * t, darkening=1 + growth_rate * t / 2)
+        _save(image, seq_dir / f"t{t:03d}.{fmt}", fmt)
+    return {
+        "index": index,
+        "sequence": seq_dir.name,
+        "label": label,
+        "fitzpatrick": fitzpatrick,
+        "length": length,
+        "growth_rate": round(growth_rate, 4),
+        "width": size,
+        "height": size,
+        "format": fmt,
+    }
+
+
+def _write_csv(path: Path, rows: List[Dict[str, Any]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rows = sorted(rows, key=lambda r: r["index"])
+    with path.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=[k for k in rows[0] if k != "index"] if rows else [])
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: v for k, v in row.items() if k != "index"})
+
+
+def generate(
+    out: str = "data/synthetic",
+    per_class: int = 100,
+    val_fraction: float = 0.2,
+    sequences: int = 100,
+    resolutions: Tuple[int, ...] = (224, 512, 1024),
+    jpeg_fraction: float = 0.7,
+    min_length: int = 2,
+    max_length: int = 12,
+    seed: int = 0,
+    workers: int = 0,
+) -> Dict[str, Any]:
+    cfg = {
+        "out": out,
+        "resolutions": list(resolutions),
+        "jpeg_fraction": jpeg_fraction,
+        "min_length": min_length,
+        "max_length": max_length,
+    }
+    n_val = int(round(per_class * val_fraction))
+    detector_tasks = [
+        (class_idx * per_class + i, seed, label, "val" if i < n_val else "train", cfg)
+        for class_idx, label in enumerate(CLASS_NAMES)
+        for i in range(per_class)
+    ]
+    sequence_tasks = [(i, seed, cfg) for i in range(sequences)]
+
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunk = max(1, len(detector_tasks) // (workers * 8))
+        detector_rows = list(pool.map(make_detector_image, detector_tasks, chunksize=chunk))
+        chunk = max(1, len(sequence_tasks) // (workers * 8))
+        sequence_rows = list(pool.map(make_sequence, sequence_tasks, chunksize=chunk))
+    elapsed = time.perf_counter() - start
+
+    out_path = Path(out)
+    if detector_rows:
+        _write_csv(out_path / "detector" / "metadata.csv", detector_rows)
+    if sequence_rows:
+        _write_csv(out_path / "predictor" / "sequences.csv", sequence_rows)
+    manifest = {
+        "seed": seed,
+        "classes": CLASS_NAMES,
+        "per_class": per_class,
+        "val_per_class": n_val,
+        "detector_images": len(detector_rows),
+        "sequences": len(sequence_rows),
+        "sequence_frames": sum(r["length"] for r in sequence_rows),
+        "resolutions": list(resolutions),
+        "jpeg_fraction": jpeg_fraction,
+        "min_length": min_length,
+        "max_length": max_length,
+        "workers": workers,
+        "elapsed_s": round(elapsed, 2),
+    }
+    out_path.mkdir(parents=True, exist_ok=True)
+    (out_path / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default="data/synthetic")
+    parser.add_argument("--per-class", type=int, default=100, help="Detector images per class")
+    parser.add_argument("--val-fraction", type=float, default=0.2)
+    parser.add_argument("--sequences", type=int, default=100, help="Predictor sequences")
+    parser.add_argument("--resolutions", default="224,512,1024", help="Comma-separated image sides in px")
+    parser.add_argument("--jpeg-fraction", type=float, default=0.7, help="Share of images saved as JPEG")
+    parser.add_argument("--min-length", type=int, default=2, help="Shortest sequence")
+    parser.add_argument("--max-length", type=int, default=12, help="Longest sequence")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=0, help="Worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    if not 1 <= args.min_length <= args.max_length:
+        parser.error("--min-length must be between 1 and --max-length")
+    manifest = generate(
+        out=args.out,
+        per_class=args.per_class,
+        val_fraction=args.val_fraction,
+        sequences=args.sequences,
+        resolutions=tuple(int(r) for r in args.resolutions.split(",") if r),
+        jpeg_fraction=args.jpeg_fraction,
+        min_length=args.min_length,
+        max_length=args.max_length,
+        seed=args.seed,
+        workers=args.workers,
+    )
+    print(
+        f"{manifest['detector_images']} detector images and {manifest['sequences']} sequences "
+        f"({manifest['sequence_frames']} frames) written to {args.out} in {manifest['elapsed_s']} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Repair job for the materialized per-user prediction stats.
+
+Rebuilds every document in the `user_stats` collection from the `predictions`
+collection. Run it after bulk imports, manual edits to `predictions`, or if the
+dashboard counters ever drift:
+
+    python rebuild_user_stats.py            # all users
+    python rebuild_user_stats.py <user_id>  # a single user
+"""
+
+import asyncio
+import sys
+
+from dotenv import load_dotenv
+
+
+async def main(user_id: str | None = None) -> None:
+    load_dotenv()
+    # Imported after load_dotenv so MONGODB_URL/MONGODB_DATABASE are picked up
+    from app.services.prediction_storage_service import (
+        rebuild_all_user_stats,
+        rebuild_user_stats,
+    )
+
+    if user_id:
+        stats = await rebuild_user_stats(user_id)
+        print(f"Rebuilt stats for user {user_id}: {stats['total_predictions']} predictions")
+    else:
+        count = await rebuild_all_user_stats()
+        print(f"Rebuilt stats for {count} users")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else None))
@@ -0,0 +1,145 @@
+"""
+Summarise the slow-request trace log written by the API.
+
+Reads `data/slow_requests.jsonl` (and its rotated backups) and reports, per
+route, how many slow requests there were and their latency, which part of the
+request dominated them (a pipeline stage, MongoDB or SQL time, or untracked
+time), and the slowest individual requests:
+
+    python summarize_slow_requests.py
+    python summarize_slow_requests.py --log data/slow_requests.jsonl --top 20
+    python summarize_slow_requests.py --json
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from benchmarks.common import percentile
+
+DEFAULT_LOG = os.getenv("SKINMORPH_SLOW_REQUEST_LOG", "data/slow_requests.jsonl")
+
+
+def read_records(log_path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield trace records from the log and its rotated backups, oldest first."""
+    backups = sorted(
+        log_path.parent.glob(log_path.name + ".*"),
+        key=lambda p: int(p.suffix[1:]) if p.suffix[1:].isdigit() else 0,
+        reverse=True,
+    )
+    for path in [*backups, log_path]:
+        if not path.exists():
+            continue
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def dominant_cause(record: Dict[str, Any]) -> Tuple[str, float]:
+    """The component that took the most time in a request, and its time in ms."""
+    parts = {f"stage:{name}": v["ms"] for name, v in record.get("stages", {}).items()}
+    parts.update({f"{db}:queries": v["ms"] for db, v in record.get("query_totals", {}).items()})
+    # Stages run inside the request, so whatever they do not cover is untracked
+    parts["untracked"] = max(0.0, record["duration_ms"] - sum(parts.values()))
+    return max(parts.items(), key=lambda kv: kv[1])
+
+
+def summarize(records: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    by_route: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for record in records:
+        by_route[f"{record.get('method', '')} {record.get('route', record.get('path'))}"].append(record)
+
+    routes = {}
+    for route, items in sorted(by_route.items(), key=lambda kv: -len(kv[1])):
+        durations = [r["duration_ms"] for r in items]
+        causes = Counter(dominant_cause(r)[0] for r in items)
+        stage_ms: Dict[str, float] = defaultdict(float)
+        for r in items:
+            for name, v in r.get("stages", {}).items():
+                stage_ms[name] += v["ms"]
+            for db, v in r.get("query_totals", {}).items():
+                stage_ms[f"{db}:queries"] += v["ms"]
+        routes[route] = {
+            "count": len(items),
+            "p50_ms": round(percentile(durations, 50), 1),
+            "p95_ms": round(percentile(durations, 95), 1),
+            "max_ms": round(max(durations), 1),
+            "dominant_causes": dict(causes.most_common()),
+            "mean_ms_by_component": {
+                name: round(total / len(items), 1)
+                for name, total in sorted(stage_ms.items(), key=lambda kv: -kv[1])
+            },
+        }
+
+    slowest = []
+    for record in sorted(records, key=lambda r: -r["duration_ms"])[:top]:
+        cause, cause_ms = dominant_cause(record)
+        slowest.append({
+            "ts": record.get("ts"),
+            "route": record.get("route"),
+            "duration_ms": record["duration_ms"],
+            "cause": cause,
+            "cause_ms": round(cause_ms, 1),
+            "image_bytes": record.get("image_bytes"),
+            "image_size": (
+                f"{record['image_width']}x{record['image_height']}"
+                if "image_width" in record else None
+            ),
+            "image_digest": (record.get("image_digest") or "")[:16] or None,
+        })
+
+    return {"requests": len(records), "routes": routes, "slowest": slowest}
+
+
+def print_report(summary: Dict[str, Any]) -> None:
+    print(f"{summary['requests']} slow requests")
+    for route, stats in summary["routes"].items():
+        print(
+            f"\n{route}: {stats['count']} requests, p50 {stats['p50_ms']} ms, "
+            f"p95 {stats['p95_ms']} ms, max {stats['max_ms']} ms"
+        )
+        print("  dominated by:")
+        for cause, count in stats["dominant_causes"].items():
+            print(f"    {cause:<28} {count:>6} ({count / stats['count']:.0%})")
+        print("  mean time per request:")
+        for name, ms in stats["mean_ms_by_component"].items():
+            print(f"    {name:<28} {ms:>9.1f} ms")
+
+    if summary["slowest"]:
+        print("\nSlowest requests:")
+        for r in summary["slowest"]:
+            image = f" image {r['image_size']} {r['image_bytes']}B {r['image_digest']}" if r["image_size"] else ""
+            print(f"  {r['ts']} {r['route']} {r['duration_ms']:.0f} ms, {r['cause']} {r['cause_ms']} ms{image}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", default=DEFAULT_LOG, help="Slow-request log file")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest requests to list")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    records = list(read_records(Path(args.log)))
+    if not records:
+        print(f"No slow requests found in {args.log}")
+        sys.exit(0)
+
+    summary = summarize(records, args.top)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,39 +4,132 @@ Training script for the skin disease detector using PyTorch Lightning.
 This is a lightweight template and is configured to run on a tiny demo dataset
 for sanity checking. For real training on ISIC/HAM10000, update the dataset path,
 batch size, and number of epochs.
+
+Images are decoded and resized once into a memory-mapped shard per split
+(`<shard-dir>/<split>.u8`, N x 224 x 224 x 3 uint8, plus a `<split>.json`
+label index). Epochs then read uint8 tensors from the shard and augment and
+normalize them in batch, instead of re-decoding every file. The shard is
+rebuilt when the source files change:
+
+    python train_detector.py --data-dir data/synthetic/detector --batch-size 64 \
+        --num-workers 4 --persistent-workers --max-epochs 10
 """
 
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 import pytorch_lightning as pl
 import torch
 import torch.nn as nn
+from PIL import Image
 from pytorch_lightning.callbacks import ModelCheckpoint
 from torch.utils.data import DataLoader, Dataset
-from torchvision.datasets import ImageFolder
-import torchvision.transforms as T
-
-from app.ml.detector import DetectorConfig, CLASS_NAMES
-from app.ml.preprocessing import IMG_SIZE
-
-
-class DermDataset(Dataset):
-    def __init__(self, root: Path, train: bool = True) -> None:
-        tfm_list = [
-            T.Resize((IMG_SIZE, IMG_SIZE)),
-            T.ToTensor(),
-            T.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-        ]
-        if train:
-            tfm_list.insert(0, T.RandomHorizontalFlip())
-        self.ds = ImageFolder(str(root), transform=T.Compose(tfm_list))
+from torchvision.datasets.folder import IMG_EXTENSIONS
+
+from app.ml.detector import DetectorConfig, CLASS_NAMES, PRETRAINED_BACKBONE
+from app.ml.preprocessing import IMG_SIZE, augment_uint8_batch, normalize_uint8_batch
+
+
+def _list_images(root: Path) -> List[Tuple[str, int]]:
+    """(relative path, class index) for an ImageFolder-style tree, labelled by `CLASS_NAMES` order."""
+    items = []
+    for class_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+        if class_dir.name not in CLASS_NAMES:
+            raise ValueError(f"Unknown class folder {class_dir} (expected one of {CLASS_NAMES})")
+        label = CLASS_NAMES.index(class_dir.name)
+        for path in sorted(class_dir.rglob("*")):
+            if path.is_file() and path.suffix.lower() in IMG_EXTENSIONS:
+                items.append((path.relative_to(root).as_posix(), label))
+    return items
+
+
+def _fingerprint(root: Path, items: List[Tuple[str, int]]) -> str:
+    digest = hashlib.sha1(str(IMG_SIZE).encode())
+    for rel, label in items:
+        stat = (root / rel).stat()
+        digest.update(f"{rel}\0{label}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def _decode_resized(path: str) -> np.ndarray:
+    # Same resize as `get_base_transform`, kept as uint8
+    with Image.open(path) as img:
+        return np.asarray(img.convert("RGB").resize((IMG_SIZE, IMG_SIZE), Image.BILINEAR), dtype=np.uint8)
+
+
+def build_image_shard(root: Path, shard_dir: Path, split: str, workers: int = 0, rebuild: bool = False) -> Path:
+    """
+    Decode and resize every image under `root` into `<shard_dir>/<split>.u8`
+    and write its label index to `<split>.json`. Skipped when an index for the
+    same files already exists. Returns the index path.
+    """
+    items = _list_images(root)
+    if not items:
+        raise ValueError(f"No images found under {root}")
+    fingerprint = _fingerprint(root, items)
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    data_path = shard_dir / f"{split}.u8"
+    index_path = shard_dir / f"{split}.json"
+    if not rebuild and index_path.exists() and data_path.exists():
+        index = json.loads(index_path.read_text(encoding="utf-8"))
+        if index.get("fingerprint") == fingerprint:
+            return index_path
+
+    shape = (len(items), IMG_SIZE, IMG_SIZE, 3)
+    tmp_path = data_path.with_suffix(".u8.tmp")
+    images = np.memmap(tmp_path, dtype=np.uint8, mode="w+", shape=shape)
+    paths = [str(root / rel) for rel, _ in items]
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunk = max(1, len(paths) // (workers * 8))
+        for i, pixels in enumerate(pool.map(_decode_resized, paths, chunksize=chunk)):
+            images[i] = pixels
+    images.flush()
+    del images
+    os.replace(tmp_path, data_path)
+
+    index = {
+        "data": data_path.name,
+        "shape": list(shape),
+        "classes": CLASS_NAMES,
+        "files": [rel for rel, _ in items],
+        "labels": [label for _, label in items],
+        "fingerprint": fingerprint,
+    }
+    index_path.write_text(json.dumps(index), encoding="utf-8")
+    return index_path
+
+
+class ShardDataset(Dataset):
+    """(3, H, W) uint8 images and labels read from a shard written by `build_image_shard`."""
+
+    def __init__(self, index_path: Path) -> None:
+        index = json.loads(Path(index_path).read_text(encoding="utf-8"))
+        self.data_path = Path(index_path).parent / index["data"]
+        self.shape = tuple(index["shape"])
+        self.labels = torch.tensor(index["labels"], dtype=torch.long)
+        # Opened lazily so each DataLoader worker maps the file itself
+        self._images: Optional[np.memmap] = None
 
     def __len__(self) -> int:
-        return len(self.ds)
+        return self.shape[0]
 
     def __getitem__(self, idx: int):
-        return self.ds[idx]
+        if self._images is None:
+            self._images = np.memmap(self.data_path, dtype=np.uint8, mode="r", shape=self.shape)
+        image = torch.from_numpy(np.array(self._images[idx])).permute(2, 0, 1)
+        return image, self.labels[idx]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_images"] = None
+        return state
 
 
 class LightningDetector(pl.LightningModule):
@@ -44,7 +137,7 @@ class LightningDetector(pl.LightningModule):
         super().__init__()
         from torchvision.models import mobilenet_v3_small, MobileNet_V3_Small_Weights
 
-        weights = MobileNet_V3_Small_Weights.DEFAULT
+        weights = MobileNet_V3_Small_Weights.DEFAULT if PRETRAINED_BACKBONE else None
         self.model = mobilenet_v3_small(weights=weights)
         in_features = self.model.classifier[3].in_features
         self.model.classifier[3] = nn.Linear(in_features, num_classes)
@@ -54,6 +147,15 @@ class LightningDetector(pl.LightningModule):
     def forward(self, x):
         return self.model(x)
 
+    def on_after_batch_transfer(self, batch, dataloader_idx):
+        # Batches arrive as uint8; augment (training only) and normalize on the target device
+        x, y = batch
+        if self.trainer.training:
+            x = augment_uint8_batch(x)
+        else:
+            x = normalize_uint8_batch(x)
+        return x, y
+
     def training_step(self, batch, batch_idx):
         x, y = batch
         logits = self(x)
@@ -75,15 +177,29 @@ def main(
     data_dir: str = "data/demo_detector",
     out_dir: str = "models/demo_weights",
     max_epochs: int = 1,
+    shard_dir: Optional[str] = None,
+    batch_size: int = 4,
+    num_workers: int = 0,
+    persistent_workers: bool = False,
+    rebuild_shard: bool = False,
 ) -> None:
     cfg = DetectorConfig()
     num_classes = len(CLASS_NAMES)
 
-    train_ds = DermDataset(Path(data_dir) / "train", train=True)
-    val_ds = DermDataset(Path(data_dir) / "val", train=False)
-
-    train_loader = DataLoader(train_ds, batch_size=4, shuffle=True, num_workers=0)
-    val_loader = DataLoader(val_ds, batch_size=4, shuffle=False, num_workers=0)
+    shard_root = Path(shard_dir) if shard_dir else Path(data_dir) / ".shards"
+    train_index = build_image_shard(Path(data_dir) / "train", shard_root, "train", rebuild=rebuild_shard)
+    val_index = build_image_shard(Path(data_dir) / "val", shard_root, "val", rebuild=rebuild_shard)
+    train_ds = ShardDataset(train_index)
+    val_ds = ShardDataset(val_index)
+
+    loader_kwargs = {
+        "batch_size": batch_size,
+        "num_workers": num_workers,
+        "persistent_workers": persistent_workers and num_workers > 0,
+        "pin_memory": torch.cuda.is_available(),
+    }
+    train_loader = DataLoader(train_ds, shuffle=True, **loader_kwargs)
+    val_loader = DataLoader(val_ds, shuffle=False, **loader_kwargs)
 
     model = LightningDetector(num_classes=num_classes)
     ckpt_cb = ModelCheckpoint(
@@ -97,10 +213,23 @@ def main(
 
 
 if __name__ == "__main__":
-    main()
-
-
-
-
-
-
+    parser = argparse.ArgumentParser(description="Train the skin condition detector.")
+    parser.add_argument("--data-dir", default="data/demo_detector", help="Directory with train/ and val/ class folders")
+    parser.add_argument("--out-dir", default="models/demo_weights")
+    parser.add_argument("--max-epochs", type=int, default=1)
+    parser.add_argument("--shard-dir", help="Where decoded shards are cached (default: <data-dir>/.shards)")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--num-workers", type=int, default=0)
+    parser.add_argument("--persistent-workers", action="store_true")
+    parser.add_argument("--rebuild-shard", action="store_true", help="Re-decode images even if the shard is current")
+    args = parser.parse_args()
+    main(
+        data_dir=args.data_dir,
+        out_dir=args.out_dir,
+        max_epochs=args.max_epochs,
+        shard_dir=args.shard_dir,
+        batch_size=args.batch_size,
+        num_workers=args.num_workers,
+        persistent_workers=args.persistent_workers,
+        rebuild_shard=args.rebuild_shard,
+    )
@@ -3,52 +3,189 @@ Training script for the SkinMorph temporal risk predictor.
 
 Uses frozen MobileNetV3 features and a small LSTM head.
 Configured for tiny demo runs; extend for real datasets.
+
+The frozen backbone is run once over every frame, in batches with parallel
+decoding, into a memory-mapped feature store (`<store-dir>/features.f32`,
+frames x 576 float32, plus `index.json` mapping each sequence to its rows).
+Training reads features from the store. Sequences of different lengths are
+batched with a length-bucketed sampler, padded, and packed for the LSTM:
+
+    python train_predictor.py --data-dir data/synthetic/predictor --batch-size 32 \
+        --num-workers 4 --max-epochs 10
 """
 
+import argparse
+import hashlib
+import json
+import os
 from pathlib import Path
-from typing import List, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pytorch_lightning as pl
 import torch
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
+from PIL import Image
+from torch.nn.utils.rnn import pad_sequence
+from torch.utils.data import Dataset, DataLoader, Sampler
+
+from app.ml.predictor import PredictorConfig, SkinMorphPredictor, TemporalHead, TIMEPOINTS
+from app.ml.preprocessing import get_base_transform
+
+FRAME_SUFFIXES = (".png", ".jpg", ".jpeg")
+
 
-from app.ml.predictor import PredictorConfig, TemporalHead, TIMEPOINTS
-from app.ml.preprocessing import preprocess_image_bytes
+def _list_sequences(root: Path) -> List[Tuple[str, List[Path]]]:
+    """(sequence name, sorted frame paths) for each non-empty sequence directory."""
+    seqs = []
+    for seq_dir in sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith(".")):
+        frames = sorted(p for p in seq_dir.iterdir() if p.suffix.lower() in FRAME_SUFFIXES)
+        if frames:
+            seqs.append((seq_dir.name, frames))
+    return seqs
 
 
-class DemoSequenceDataset(Dataset):
+def _fingerprint(frames: Sequence[Path]) -> str:
+    digest = hashlib.sha1(f"{PredictorConfig().feature_dim}".encode())
+    for path in frames:
+        stat = path.stat()
+        digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+class _FrameDataset(Dataset):
+    def __init__(self, frames: Sequence[Path]) -> None:
+        self.frames = list(frames)
+        self.transform = get_base_transform()
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, idx: int) -> torch.Tensor:
+        with Image.open(self.frames[idx]) as img:
+            return self.transform(img.convert("RGB"))
+
+
+def build_feature_store(
+    root: Path,
+    store_dir: Path,
+    batch_size: int = 64,
+    num_workers: int = 0,
+    rebuild: bool = False,
+) -> Path:
     """
-    Minimal dataset for demo: expects directory structure:
-    data/demo_predictor/
-        seq1/
-            t0.png
-            t1.png
-        seq2/
-            ...
-    Targets are synthetic random risk vectors for illustration only.
+    Extract backbone features for every frame under `root` into
+    `<store_dir>/features.f32` and write the sequence index to `index.json`.
+    Skipped when an index for the same frames already exists. Returns the
+    index path.
     """
+    seqs = _list_sequences(root)
+    if not seqs:
+        raise ValueError(f"No sequences found under {root}")
+    frames = [path for _, paths in seqs for path in paths]
+    fingerprint = _fingerprint(frames)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    data_path = store_dir / "features.f32"
+    index_path = store_dir / "index.json"
+    if not rebuild and index_path.exists() and data_path.exists():
+        index = json.loads(index_path.read_text(encoding="utf-8"))
+        if index.get("fingerprint") == fingerprint:
+            return index_path
+
+    # Same frozen backbone as inference, so training sees the features served
+    backbone = SkinMorphPredictor().backbone
+    feature_dim = PredictorConfig().feature_dim
+    shape = (len(frames), feature_dim)
+    tmp_path = data_path.with_suffix(".f32.tmp")
+    features = np.memmap(tmp_path, dtype=np.float32, mode="w+", shape=shape)
+    loader = DataLoader(_FrameDataset(frames), batch_size=batch_size, num_workers=num_workers)
+    row = 0
+    with torch.inference_mode():
+        for x in loader:
+            feats = backbone(x).numpy()
+            features[row:row + len(feats)] = feats
+            row += len(feats)
+    features.flush()
+    del features
+    os.replace(tmp_path, data_path)
 
-    def __init__(self, root: Path):
-        self.root = root
-        self.seqs: List[Path] = [p for p in root.iterdir() if p.is_dir()]
+    offsets, offset = [], 0
+    for name, paths in seqs:
+        offsets.append({"name": name, "offset": offset, "length": len(paths)})
+        offset += len(paths)
+    index = {
+        "data": data_path.name,
+        "shape": list(shape),
+        "sequences": offsets,
+        "fingerprint": fingerprint,
+    }
+    index_path.write_text(json.dumps(index), encoding="utf-8")
+    return index_path
+
+
+class FeatureSequenceDataset(Dataset):
+    """
+    (T, 576) feature sequences read from a store written by
+    `build_feature_store`. Targets are synthetic zero risk vectors for
+    illustration only.
+    """
+
+    def __init__(self, index_path: Path) -> None:
+        index = json.loads(Path(index_path).read_text(encoding="utf-8"))
+        self.data_path = Path(index_path).parent / index["data"]
+        self.shape = tuple(index["shape"])
+        self.sequences: List[Dict[str, Any]] = index["sequences"]
+        self.lengths = [s["length"] for s in self.sequences]
+        # Opened lazily so each DataLoader worker maps the file itself
+        self._features: Optional[np.memmap] = None
 
     def __len__(self) -> int:
-        return len(self.seqs)
+        return len(self.sequences)
 
     def __getitem__(self, idx: int) -> Tuple[torch.Tensor, torch.Tensor]:
-        seq_dir = self.seqs[idx]
-        images = sorted(seq_dir.glob("*.png"))
-        feats: List[torch.Tensor] = []
-        for img_path in images:
-            data = img_path.read_bytes()
-            x = preprocess_image_bytes(data).squeeze(0)
-            feats.append(x.mean(dim=(1, 2)))  # crude stand-in for backbone features
-
-        seq = torch.stack(feats, dim=0)  # (T, F)
+        if self._features is None:
+            self._features = np.memmap(self.data_path, dtype=np.float32, mode="r", shape=self.shape)
+        entry = self.sequences[idx]
+        seq = torch.from_numpy(np.array(self._features[entry["offset"]:entry["offset"] + entry["length"]]))
         target = torch.zeros(len(TIMEPOINTS) * 3)
         return seq, target
 
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_features"] = None
+        return state
+
+
+class LengthBucketSampler(Sampler[List[int]]):
+    """
+    Batches of sequences of similar length, so little of each padded batch is
+    padding. Indices are sorted by length (ties broken randomly), cut into
+    batches, and the batch order is shuffled every epoch.
+    """
+
+    def __init__(self, lengths: Sequence[int], batch_size: int, shuffle: bool = True, seed: int = 0) -> None:
+        self.lengths = torch.tensor(lengths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+
+    def __len__(self) -> int:
+        return (len(self.lengths) + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self) -> Iterator[List[int]]:
+        generator = torch.Generator().manual_seed(self.seed + self.epoch)
+        self.epoch += 1
+        if self.shuffle:
+            perm = torch.randperm(len(self.lengths), generator=generator)
+            order = perm[torch.argsort(self.lengths[perm], stable=True)]
+        else:
+            order = torch.argsort(self.lengths, stable=True)
+        batches = [order[i:i + self.batch_size].tolist() for i in range(0, len(order), self.batch_size)]
+        if self.shuffle:
+            batches = [batches[i] for i in torch.randperm(len(batches), generator=generator).tolist()]
+        return iter(batches)
+
 
 class LightningPredictor(pl.LightningModule):
     def __init__(self, cfg: PredictorConfig):
@@ -57,12 +194,12 @@ class LightningPredictor(pl.LightningModule):
         self.head = TemporalHead(cfg)
         self.loss_fn = nn.MSELoss()
 
-    def forward(self, seq: torch.Tensor) -> torch.Tensor:
-        return self.head(seq)
+    def forward(self, seq: torch.Tensor, lengths: Optional[torch.Tensor] = None) -> torch.Tensor:
+        return self.head(seq, lengths)
 
     def training_step(self, batch, batch_idx):
-        seq, y = batch
-        logits = self(seq)
+        seq, lengths, y = batch
+        logits = self(seq, lengths)
         loss = self.loss_fn(logits, y)
         self.log("train_loss", loss)
         return loss
@@ -72,20 +209,36 @@ class LightningPredictor(pl.LightningModule):
 
 
 def collate_fn(batch):
-    # Simple collate assuming equal length sequences
+    # Pad ragged sequences to the longest in the batch; lengths let the head pack them
     seqs, ys = zip(*batch)
-    seqs_t = torch.stack(seqs, dim=0)
+    lengths = torch.tensor([len(seq) for seq in seqs])
+    seqs_t = pad_sequence(list(seqs), batch_first=True)
     ys_t = torch.stack(ys, dim=0)
-    return seqs_t, ys_t
+    return seqs_t, lengths, ys_t
 
 
 def main(
     data_dir: str = "data/demo_predictor",
     max_epochs: int = 1,
+    store_dir: Optional[str] = None,
+    batch_size: int = 2,
+    num_workers: int = 0,
+    extract_batch_size: int = 64,
+    rebuild_features: bool = False,
 ):
     cfg = PredictorConfig()
-    ds = DemoSequenceDataset(Path(data_dir))
-    loader = DataLoader(ds, batch_size=2, shuffle=True, collate_fn=collate_fn)
+    store_root = Path(store_dir) if store_dir else Path(data_dir) / ".features"
+    index_path = build_feature_store(
+        Path(data_dir), store_root, batch_size=extract_batch_size, num_workers=num_workers, rebuild=rebuild_features
+    )
+    ds = FeatureSequenceDataset(index_path)
+    loader = DataLoader(
+        ds,
+        batch_sampler=LengthBucketSampler(ds.lengths, batch_size),
+        collate_fn=collate_fn,
+        num_workers=num_workers,
+        persistent_workers=num_workers > 0,
+    )
 
     model = LightningPredictor(cfg)
     trainer = pl.Trainer(max_epochs=max_epochs)
@@ -93,10 +246,21 @@ def main(
 
 
 if __name__ == "__main__":
-    main()
-
-
-
-
-
-
+    parser = argparse.ArgumentParser(description="Train the temporal risk predictor head.")
+    parser.add_argument("--data-dir", default="data/demo_predictor", help="Directory of sequence folders")
+    parser.add_argument("--max-epochs", type=int, default=1)
+    parser.add_argument("--store-dir", help="Where the feature store is cached (default: <data-dir>/.features)")
+    parser.add_argument("--batch-size", type=int, default=2)
+    parser.add_argument("--num-workers", type=int, default=0, help="Decoding and loading workers")
+    parser.add_argument("--extract-batch-size", type=int, default=64, help="Frames per backbone batch")
+    parser.add_argument("--rebuild-features", action="store_true", help="Re-extract even if the store is current")
+    args = parser.parse_args()
+    main(
+        data_dir=args.data_dir,
+        max_epochs=args.max_epochs,
+        store_dir=args.store_dir,
+        batch_size=args.batch_size,
+        num_workers=args.num_workers,
+        extract_batch_size=args.extract_batch_size,
+        rebuild_features=args.rebuild_features,
+    )
@@ -0,0 +1,13 @@
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from app import db
+
+
+@pytest.fixture
+def mock_mongo():
+    """An in-process mongomock-motor client installed as the app's MongoDB client."""
+    client = AsyncMongoMockClient()
+    db.set_db_client(client)
+    yield client[db.MONGODB_DATABASE]
+    db.set_db_client(None)
@@ -22,6 +22,24 @@ def test_health():
     assert resp.json()["status"] == "ok"
 
 
+def test_readiness_reports_database_and_reuses_the_ping(monkeypatch):
+    from app import db
+
+    pings = []
+
+    async def ping():
+        pings.append(1)
+        return {"status": "unreachable", "latency_ms": 1.0}
+
+    monkeypatch.setattr(db, "_ping_database", ping)
+    monkeypatch.setattr(db, "_health_ping", None)
+    first = client.get("/health/ready")
+    second = client.get("/health/ready")
+    assert first.status_code == second.status_code == 503
+    assert first.json()["database"]["status"] == "unreachable"
+    assert len(pings) == 1
+
+
 def test_predict_endpoint_runs():
     img_bytes = _make_dummy_image()
     files = {"file": ("dummy.png", io.BytesIO(img_bytes), "image/png")}
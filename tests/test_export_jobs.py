@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import ExportJob
+from app.services import export_service
+
+
+def test_jobs_are_claimed_once_and_reclaimed_when_abandoned(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(export_service, "SessionLocal", session_factory)
+
+    first = export_service._create_job("derm", ["p1"])["job_id"]
+    second = export_service._create_job("derm", ["p2"])["job_id"]
+
+    # Oldest first, and a claimed job is not handed out again
+    assert export_service._claim_next_job() == first
+    assert export_service._claim_next_job() == second
+    assert export_service._claim_next_job() is None
+
+    # A running job whose worker stopped heartbeating can be claimed again
+    with session_factory() as session:
+        session.query(ExportJob).filter_by(id=first).update(
+            {"updated_at": datetime.utcnow() - timedelta(seconds=export_service.EXPORT_STALE_SECONDS + 1)}
+        )
+        session.commit()
+    assert export_service._claim_next_job() == first
+
+    export_service._release_job(second)
+    assert export_service._claim_next_job() == second
+
+
+def test_completed_exports_expire_after_retention(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(export_service, "SessionLocal", session_factory)
+
+    old, recent = (export_service._create_job("derm", ["p1"])["job_id"] for _ in range(2))
+    archives = {}
+    for job_id in (old, recent):
+        archives[job_id] = tmp_path / f"{job_id}.zip"
+        archives[job_id].write_bytes(b"PK")
+        export_service._update_job(job_id, status=export_service.JOB_COMPLETED, artifact_path=str(archives[job_id]))
+    with session_factory() as session:
+        session.query(ExportJob).filter_by(id=old).update(
+            {"updated_at": datetime.utcnow() - timedelta(seconds=export_service.EXPORT_RETENTION_SECONDS + 1)}
+        )
+        session.commit()
+
+    assert export_service._expire_old_exports() == 1
+    assert not archives[old].exists() and archives[recent].exists()
+    job = export_service._load_job(old)
+    assert job.status == export_service.JOB_EXPIRED and job.artifact_path is None
+    assert export_service._load_job(recent).status == export_service.JOB_COMPLETED
+    assert export_service._expire_old_exports() == 0
@@ -0,0 +1,28 @@
+import asyncio
+import time
+
+from app.core.loop_monitor import LoopMonitor, event_loop_lag
+
+
+def test_watchdog_captures_blocking_stack_and_request():
+    async def handler(scope):
+        await asyncio.sleep(0.05)
+        time.sleep(0.3)  # blocks the loop
+        await asyncio.sleep(0.15)
+
+    async def scenario():
+        monitor = LoopMonitor(interval=0.02)
+        monitor.start(watchdog=True, threshold_ms=100)
+        observed = event_loop_lag.count()
+        await handler({"type": "http", "method": "POST", "path": "/predict"})
+        blocks = list(monitor.watchdog.blocks)
+        await monitor.stop()
+        return blocks, event_loop_lag.count() - observed
+
+    blocks, ticks = asyncio.run(scenario())
+    assert ticks > 0
+    assert len(blocks) == 1
+    block = blocks[0]
+    assert block["method"] == "POST" and block["path"] == "/predict"
+    assert any("time.sleep(0.3)" in line for line in block["stack"])
+    assert block["lag_ms"] >= 150
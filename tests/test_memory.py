@@ -0,0 +1,48 @@
+import asyncio
+from io import BytesIO
+
+import pytest
+import torch
+import torch.nn as nn
+from fastapi import HTTPException
+from PIL import Image
+
+from app.core.memory import PIPELINE_BYTES_PER_PIXEL, fit_image_to_budget, module_memory
+
+
+def _jpeg(width, height):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (200, 150, 120)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_fit_image_to_budget_downscales_or_rejects():
+    data = _jpeg(1600, 1200)
+    budget = len(data) + PIPELINE_BYTES_PER_PIXEL * 800 * 600
+
+    assert asyncio.run(fit_image_to_budget(data, budget_bytes=0)) is data
+    assert asyncio.run(fit_image_to_budget(data, budget_bytes=budget * 4)) is data
+
+    downscaled = asyncio.run(fit_image_to_budget(data, budget_bytes=budget))
+    width, height = Image.open(BytesIO(downscaled)).size
+    assert width * height <= 800 * 600 and width >= 224
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(fit_image_to_budget(data, budget_bytes=budget, action="reject"))
+    assert exc.value.status_code == 413
+
+    # Invalid images are left to the pipeline's own validation
+    assert asyncio.run(fit_image_to_budget(b"not an image", budget_bytes=1)) == b"not an image"
+
+
+def test_module_memory_counts_parameters_buffers_and_gradients():
+    module = nn.Sequential(nn.Linear(10, 4), nn.BatchNorm1d(4))
+    stats = module_memory(module)
+    assert stats["parameters"] == 10 * 4 + 4 + 4 + 4
+    assert stats["parameter_bytes"] == stats["parameters"] * 4
+    # running_mean, running_var and num_batches_tracked
+    assert stats["buffers"] == 4 + 4 + 1
+    assert stats["gradient_bytes"] == 0
+
+    module(torch.randn(3, 10)).sum().backward()
+    assert module_memory(module)["gradient_bytes"] == stats["parameter_bytes"]
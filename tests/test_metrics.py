@@ -0,0 +1,22 @@
+from app.core.metrics import MetricsRegistry
+
+
+def test_metrics_render_prometheus_text():
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_stage_seconds", "Stage latency.", ["stage"], buckets=(0.1, 1.0))
+    rejections = registry.counter("test_rejections_total", "Rejections.")
+    registry.callback("test_queue_depth", "Queue depth.", lambda: {(): 3})
+
+    latency.observe(0.05, stage="forward")
+    latency.observe(0.5, stage="forward")
+    latency.observe(5.0, stage="forward")
+    rejections.inc()
+
+    text = registry.render()
+    assert 'test_stage_seconds_bucket{stage="forward",le="0.1"} 1' in text
+    assert 'test_stage_seconds_bucket{stage="forward",le="1.0"} 2' in text
+    assert 'test_stage_seconds_bucket{stage="forward",le="+Inf"} 3' in text
+    assert 'test_stage_seconds_count{stage="forward"} 3' in text
+    assert "# TYPE test_rejections_total counter" in text
+    assert "test_rejections_total 1.0" in text
+    assert "test_queue_depth 3" in text
@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.auth import get_password_hash_async, verify_password_async
+from app.core.hashing import PasswordHashPool
+
+
+def test_async_hash_and_verify_round_trip():
+    async def run():
+        hashed = await get_password_hash_async("s3cret-pass")
+        return await verify_password_async("s3cret-pass", hashed), await verify_password_async("wrong", hashed)
+
+    assert asyncio.run(run()) == (True, False)
+
+
+def test_pool_rejects_with_503_when_queue_times_out():
+    pool = PasswordHashPool(workers=1, max_queue=8, queue_timeout=0.05)
+
+    async def run():
+        return await asyncio.gather(
+            pool.run(time.sleep, 0.3), pool.run(time.sleep, 0.3), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    rejected = [r for r in results if isinstance(r, HTTPException)]
+    assert len(rejected) == 1
+    assert rejected[0].status_code == 503
+    assert pool.rejected == 1
+
+
+def test_pool_rejects_immediately_when_queue_is_full():
+    pool = PasswordHashPool(workers=1, max_queue=0, queue_timeout=5)
+
+    async def run():
+        first = asyncio.ensure_future(pool.run(time.sleep, 0.2))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException):
+            await pool.run(time.sleep, 0)
+        await first
+
+    asyncio.run(run())
@@ -0,0 +1,72 @@
+import asyncio
+
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from app.core.dependencies import get_current_user_claims
+from app.main import create_app
+from app.services import patient_service
+
+
+def _seed(mock_mongo):
+    names = ["Ada", "Alan", "Barbara", "Alice", "Grace"]
+    patients = [
+        {"_id": ObjectId(), "role": "patient", "name": name, "email": f"{name.lower()}@example.com",
+         "age": 40, "gender": "F", "password_hash": "secret"}
+        for name in names
+    ]
+    asyncio.run(mock_mongo["users"].insert_many(
+        patients + [{"_id": ObjectId(), "role": "dermatologist", "name": "Anna", "email": "anna@example.com"}]
+    ))
+    return patients
+
+
+def _client():
+    app = create_app()
+    app.dependency_overrides[get_current_user_claims] = lambda: {"id": "d1", "role": "dermatologist"}
+    return TestClient(app)
+
+
+def test_list_patients_streams_every_patient_in_id_order(mock_mongo):
+    patients = _seed(mock_mongo)
+    resp = _client().get("/dermatologist/patients")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [item["id"] for item in body] == [str(p["_id"]) for p in patients]
+    assert body[0] == {"id": str(patients[0]["_id"]), "name": "Ada", "email": "ada@example.com",
+                       "age": 40, "gender": "F"}
+
+
+def test_list_patients_pages_with_after(mock_mongo):
+    patients = _seed(mock_mongo)
+    client = _client()
+    seen = []
+    after = None
+    while True:
+        params = {"limit": 2, **({"after": after} if after else {})}
+        page = client.get("/dermatologist/patients", params=params).json()
+        seen.extend(item["id"] for item in page)
+        if len(page) < 2:
+            break
+        after = page[-1]["id"]
+    assert seen == [str(p["_id"]) for p in patients]
+
+    resp = client.get("/dermatologist/patients", params={"after": "not-an-id"})
+    assert resp.status_code == 400
+
+
+def test_search_matches_name_or_email_prefix_and_is_limited(mock_mongo, monkeypatch):
+    _seed(mock_mongo)
+    client = _client()
+    found = client.get("/dermatologist/patients", params={"q": "Al"}).json()
+    assert [item["name"] for item in found] == ["Alan", "Alice"]
+    found = client.get("/dermatologist/patients", params={"q": "grace@"}).json()
+    assert [item["name"] for item in found] == ["Grace"]
+    # Prefix, not substring, and patients only
+    assert client.get("/dermatologist/patients", params={"q": "lan"}).json() == []
+    assert client.get("/dermatologist/patients", params={"q": "Anna"}).json() == []
+
+    monkeypatch.setattr(patient_service, "PATIENT_SEARCH_DEFAULT_LIMIT", 1)
+    assert [item["name"] for item in client.get("/dermatologist/patients", params={"q": "A"}).json()] == ["Ada"]
+    found = client.get("/dermatologist/patients", params={"q": "A", "limit": 5}).json()
+    assert [item["name"] for item in found] == ["Ada", "Alan", "Alice"]
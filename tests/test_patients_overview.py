@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockCollection
+from pymongo.errors import ExecutionTimeout
+
+from app.core.dependencies import get_current_user_claims
+from app.main import create_app
+from app.routers import dermatologist
+from app.services.prediction_storage_service import build_prediction_doc, get_patients_overview
+
+
+def _with_top_n_emulated(pipeline):
+    """mongomock has no $topN: sort before the $group, then $push and $slice instead."""
+    rewritten = []
+    for stage in pipeline:
+        group = stage.get("$group", {})
+        top_n = {field: spec["$topN"] for field, spec in group.items() if isinstance(spec, dict) and "$topN" in spec}
+        if not top_n:
+            rewritten.append(stage)
+            continue
+        (field, spec), = top_n.items()
+        rewritten.append({"$sort": spec["sortBy"]})
+        rewritten.append({"$group": {**group, field: {"$push": spec["output"]}}})
+        rewritten.append({"$set": {field: {"$slice": [f"${field}", spec["n"]]}}})
+    return rewritten
+
+
+@pytest.fixture
+def overview_mongo(mock_mongo, monkeypatch):
+    aggregate = AsyncMongoMockCollection.aggregate
+    monkeypatch.setattr(
+        AsyncMongoMockCollection, "aggregate",
+        lambda self, pipeline, **kwargs: aggregate(self, _with_top_n_emulated(pipeline), **kwargs),
+    )
+    return mock_mongo
+
+
+def _prediction(user_id, severity, minutes_ago):
+    doc = build_prediction_doc(
+        user_id,
+        {"predicted_disease": "Acne", "severity_level": severity, "confidence": 0.8},
+        f"{minutes_ago}.jpg",
+    )
+    doc["created_at"] = (datetime(2026, 1, 1) - timedelta(minutes=minutes_ago)).isoformat()
+    return doc
+
+
+def _client(role="dermatologist"):
+    app = create_app()
+    app.dependency_overrides[get_current_user_claims] = lambda: {"id": "d1", "role": role}
+    return TestClient(app)
+
+
+def test_overview_keeps_id_order_latest_first_and_zero_count_patients(overview_mongo):
+    async def scenario():
+        await overview_mongo["predictions"].insert_many([
+            _prediction("p1", "Mild", 30),
+            _prediction("p1", "Severe", 10),
+            _prediction("p1", "Moderate", 20),
+            _prediction("p1", "Mild", 40),
+            _prediction("p2", "Severe", 5),
+        ])
+        return await get_patients_overview(["p2", "nobody", "p1", "p2"], latest=3)
+
+    overview = asyncio.run(scenario())
+    assert [entry["patient_id"] for entry in overview] == ["p2", "nobody", "p1"]
+    assert overview[1] == {
+        "patient_id": "nobody", "total_predictions": 0, "severe_count": 0,
+        "moderate_count": 0, "mild_count": 0, "latest_predictions": [],
+    }
+    p1 = overview[2]
+    assert (p1["total_predictions"], p1["severe_count"], p1["moderate_count"], p1["mild_count"]) == (4, 1, 1, 2)
+    assert [item["severity"] for item in p1["latest_predictions"]] == ["Severe", "Moderate", "Mild"]
+    assert all(isinstance(item["id"], str) for item in p1["latest_predictions"])
+
+
+def test_overview_of_all_patients_is_paged(overview_mongo, monkeypatch):
+    monkeypatch.setattr(dermatologist, "OVERVIEW_MAX_PATIENTS", 2)
+    patient_ids = sorted(str(ObjectId()) for _ in range(3))
+    asyncio.run(overview_mongo["users"].insert_many(
+        [{"_id": ObjectId(pid), "role": "patient"} for pid in patient_ids] + [{"_id": ObjectId(), "role": "dermatologist"}]
+    ))
+    client = _client()
+
+    first = client.post("/dermatologist/patients/overview", json={}).json()
+    assert [entry["patient_id"] for entry in first["patients"]] == patient_ids[:2]
+    assert first["next_after"] == patient_ids[1]
+
+    last = client.post("/dermatologist/patients/overview", json={"after": first["next_after"]}).json()
+    assert [entry["patient_id"] for entry in last["patients"]] == patient_ids[2:]
+    assert last["next_after"] is None
+
+    assert client.post("/dermatologist/patients/overview", json={"after": "nope"}).status_code == 400
+    resp = client.post("/dermatologist/patients/overview", json={"patient_ids": ["p1"], "after": patient_ids[0]})
+    assert resp.status_code == 400
+
+
+def test_overview_timeout_returns_504(mock_mongo, monkeypatch):
+    def timed_out(self, pipeline, **kwargs):
+        raise ExecutionTimeout("operation exceeded time limit")
+
+    monkeypatch.setattr(AsyncMongoMockCollection, "aggregate", timed_out)
+    resp = _client().post("/dermatologist/patients/overview", json={"patient_ids": ["p1"]})
+    assert resp.status_code == 504
+    assert _client(role="patient").post("/dermatologist/patients/overview", json={}).status_code == 403
@@ -0,0 +1,90 @@
+import asyncio
+import os
+
+from bson import ObjectId, json_util
+from fastapi import HTTPException
+
+from app.services.prediction_buffer import PredictionWriteBuffer
+
+
+def test_buffer_journals_per_process_and_claims_orphaned_journals(tmp_path):
+    base = tmp_path / "prediction_journal.jsonl"
+    orphan_docs = [{"_id": ObjectId(), "user_id": "u1"} for _ in range(2)]
+    # Left behind by a worker that crashed, and by the old single shared journal
+    (tmp_path / "prediction_journal.99999.jsonl").write_text(json_util.dumps(orphan_docs[0]) + "\n")
+    base.write_text(json_util.dumps(orphan_docs[1]) + "\n")
+    flushed = []
+
+    async def flush_fn(batch):
+        flushed.extend(batch)
+
+    async def scenario():
+        buffer = PredictionWriteBuffer(flush_fn, journal_path=base, flush_interval=60)
+        await buffer.start()
+        assert buffer.journal_path.name == f"prediction_journal.{os.getpid()}.jsonl"
+        assert sorted(doc["_id"] for doc in buffer._pending) == sorted(doc["_id"] for doc in orphan_docs)
+        assert not base.exists() and not (tmp_path / "prediction_journal.99999.jsonl").exists()
+
+        # A live buffer's journal is locked and not claimed by another one
+        other = PredictionWriteBuffer(flush_fn, journal_path=base, flush_interval=60)
+        other.journal_path = tmp_path / "prediction_journal.other.jsonl"
+        await other.start()
+        assert len(other) == 0
+        await other.stop()
+
+        await buffer.put({"_id": ObjectId(), "user_id": "u2"})
+        assert len(buffer.journal_path.read_text().splitlines()) == 3
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    assert len(flushed) == 3
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_buffer_put_waits_for_space_when_full(tmp_path):
+    gate = asyncio.Event()
+
+    async def flush_fn(batch):
+        await gate.wait()
+
+    async def scenario():
+        buffer = PredictionWriteBuffer(
+            flush_fn, journal_path=tmp_path / "journal.jsonl", max_size=2, flush_size=2, flush_interval=60
+        )
+        await buffer.start()
+        await buffer.put({"_id": ObjectId()})
+        await buffer.put({"_id": ObjectId()})
+
+        waiting = asyncio.create_task(buffer.put({"_id": ObjectId()}))
+        await asyncio.sleep(0.05)
+        assert not waiting.done() and len(buffer) == 2
+
+        gate.set()
+        await asyncio.wait_for(waiting, timeout=1)
+        assert len(buffer) == 1
+        await buffer.stop()
+
+    asyncio.run(scenario())
+
+
+def test_buffer_concurrent_puts_respect_max_size_and_time_out(tmp_path):
+    async def flush_fn(batch):
+        await asyncio.Event().wait()  # storage that never catches up
+
+    async def scenario():
+        buffer = PredictionWriteBuffer(
+            flush_fn, journal_path=tmp_path / "journal.jsonl", max_size=5, flush_interval=60, put_timeout=0.1
+        )
+        await buffer.start()
+        results = await asyncio.gather(
+            *(buffer.put({"_id": ObjectId()}) for _ in range(20)), return_exceptions=True
+        )
+        rejected = [r for r in results if isinstance(r, HTTPException)]
+        assert len(rejected) == 15
+        assert all(r.status_code == 503 for r in rejected)
+        assert len(buffer) == 5
+        assert len(buffer.journal_path.read_text().splitlines()) == 5
+        buffer._task.cancel()
+        await asyncio.to_thread(buffer._close_journal, True)
+
+    asyncio.run(scenario())
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from app.services.prediction_storage_service import decode_cursor, encode_cursor, get_user_predictions_page
+
+
+def test_cursor_round_trip():
+    item = {"id": str(ObjectId()), "created_at": "2024-05-01T12:00:00.000001"}
+    created_at, last_id = decode_cursor(encode_cursor(item))
+    assert created_at == item["created_at"]
+    assert last_id == ObjectId(item["id"])
+
+
+@pytest.mark.parametrize("token", ["not-a-cursor", "", "W10", "WyJhIiwgImIiXQ"])
+def test_invalid_cursor_rejected(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def _walk_pages(user_id, limit, summary=False):
+    async def walk():
+        pages, cursor = [], None
+        while True:
+            page = await get_user_predictions_page(user_id, limit=limit, cursor=cursor, summary=summary)
+            pages.append(page["predictions"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages
+
+    return asyncio.run(walk())
+
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 12, 50])
+def test_page_walk_visits_every_prediction_once_in_order(mock_mongo, limit):
+    # Several predictions share each timestamp, so _id has to break the ties
+    docs = [
+        {"_id": ObjectId(), "user_id": "u1", "created_at": f"2024-05-0{1 + i // 3}T12:00:00",
+         "predicted_disease": "Acne", "top_3_predictions": []}
+        for i in range(12)
+    ]
+    other = {"_id": ObjectId(), "user_id": "u2", "created_at": "2024-05-02T12:00:00"}
+    asyncio.run(mock_mongo["predictions"].insert_many(docs + [other]))
+
+    pages = _walk_pages("u1", limit, summary=True)
+    ids = [item["id"] for page in pages for item in page]
+    expected = [str(doc["_id"]) for doc in sorted(docs, key=lambda d: (d["created_at"], d["_id"]), reverse=True)]
+    assert ids == expected
+    # Full pages until the last; a history that ends on a page boundary has no empty extra page
+    assert all(len(page) == limit for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= limit
+    assert all("top_3_predictions" not in item for page in pages for item in page)
+
+
+def test_page_walk_of_empty_history(mock_mongo):
+    assert _walk_pages("nobody", 5) == [[]]
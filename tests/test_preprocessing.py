@@ -0,0 +1,23 @@
+import numpy as np
+import torch
+from PIL import Image
+
+from app.ml.preprocessing import IMG_SIZE, augment_uint8_batch, get_base_transform, normalize_uint8_batch
+
+
+def test_uint8_batch_matches_base_transform_and_augments_per_sample():
+    img = Image.new("RGB", (IMG_SIZE, IMG_SIZE), (180, 120, 90))
+    for x in range(IMG_SIZE // 2):
+        img.putpixel((x, 0), (10, 20, 30))
+    batch = torch.from_numpy(np.asarray(img)).permute(2, 0, 1).unsqueeze(0).repeat(8, 1, 1, 1)
+
+    normalized = normalize_uint8_batch(batch)
+    assert torch.allclose(normalized[0], get_base_transform()(img), atol=1e-6)
+
+    # Without jitter, each sample is the normalized image or its mirror
+    augmented = augment_uint8_batch(batch, brightness=0, contrast=0, generator=torch.Generator().manual_seed(0))
+    assert augmented.shape == batch.shape and augmented.dtype == torch.float32
+    flipped = [not torch.allclose(a, normalized[0], atol=1e-5) for a in augmented]
+    assert any(flipped) and not all(flipped)
+    for a, f in zip(augmented, flipped):
+        assert torch.allclose(a, normalized[0].flip(-1) if f else normalized[0], atol=1e-5)
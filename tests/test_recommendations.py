@@ -0,0 +1,50 @@
+import json
+import os
+
+from app.ml.recommendations import RecommendationEngine
+
+
+def _rule(rule_id, top_class, min_prob, title):
+    return {
+        "id": rule_id,
+        "if_top_class": top_class,
+        "min_prob": min_prob,
+        "recommendations": [{"title": title}],
+    }
+
+
+def _titles(recs):
+    return [r["title"] for r in recs]
+
+
+def test_recommendations_top_k_thresholds_and_reload(tmp_path):
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(json.dumps([
+        _rule("acne_high", "acne", 0.7, "acne high"),
+        _rule("general", None, 0.0, "general"),
+        _rule("acne_low", "acne", 0.3, "acne low"),
+        _rule("melanoma", "melanoma_suspect", 0.2, "melanoma"),
+    ]))
+    engine = RecommendationEngine(rules_path=rules_path, reload_interval=0.0, top_k=3)
+    output = {
+        "top_class": {"label": "acne", "probability": 0.5},
+        "all_classes": [
+            {"label": "acne", "probability": 0.5},
+            {"label": "melanoma_suspect", "probability": 0.3},
+            {"label": "eczema", "probability": 0.2},
+        ],
+    }
+
+    assert _titles(engine.get_recommendations(output)) == ["general", "acne low", "melanoma"]
+    assert _titles(engine.get_recommendations(output, top_k=1)) == ["general", "acne low"]
+
+    # Invalid files are ignored and the previous rules kept
+    rules_path.write_text(json.dumps([{"id": "broken", "min_prob": 2}]))
+    os.utime(rules_path, (1, 1))
+    assert not engine.reload_if_changed()
+    assert _titles(engine.get_recommendations(output, top_k=1)) == ["general", "acne low"]
+
+    rules_path.write_text(json.dumps([_rule("eczema", "eczema", 0.1, "eczema")]))
+    os.utime(rules_path, (2, 2))
+    assert _titles(engine.get_recommendations(output)) == ["eczema"]
+    assert _titles(engine.get_recommendations(output, top_k=1)) == ["General skin health guidance"]
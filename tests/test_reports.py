@@ -0,0 +1,34 @@
+import os
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core.dependencies import get_current_user
+from app.main import create_app
+from app.services import report_service
+
+
+def test_report_of_another_user_requires_dermatologist():
+    app = create_app()
+    app.dependency_overrides[get_current_user] = lambda: {"id": "p1", "role": "patient"}
+    resp = TestClient(app).get("/report", params={"user_id": "p2"})
+    assert resp.status_code == 403
+
+
+def test_stale_reports_kept_while_pinned_or_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_service, "REPORT_STALE_GRACE_SECONDS", 60)
+    current, recent, pinned, old = (tmp_path / f"{name}.pdf" for name in ("current", "recent", "pinned", "old"))
+    for path in (current, recent, pinned, old):
+        path.write_bytes(b"%PDF")
+    long_ago = time.time() - 3600
+    for path in (pinned, old):
+        os.utime(path, (long_ago, long_ago))
+
+    report_service.pin_report(pinned)
+    report_service._remove_stale_reports(current)
+    assert current.exists() and recent.exists() and pinned.exists()
+    assert not old.exists()
+
+    report_service.release_report(pinned)
+    report_service._remove_stale_reports(current)
+    assert not pinned.exists()
@@ -0,0 +1,32 @@
+import asyncio
+
+from app.services.ml_service import SingleFlight
+
+
+def test_single_flight_shares_results_and_errors():
+    async def scenario():
+        flight = SingleFlight()
+        runs = []
+
+        async def compute(value):
+            runs.append(value)
+            await asyncio.sleep(0.01)
+            if value == "bad":
+                raise ValueError("inference failed")
+            return {"value": value}
+
+        results = await asyncio.gather(*(flight.do("k", lambda: compute("ok")) for _ in range(4)))
+        assert all(r is results[0] for r in results)
+
+        errors = await asyncio.gather(
+            *(flight.do("k2", lambda: compute("bad")) for _ in range(3)), return_exceptions=True
+        )
+        assert all(isinstance(e, ValueError) for e in errors)
+
+        # Completed keys are not cached
+        await flight.do("k", lambda: compute("ok"))
+        return runs, flight.stats()
+
+    runs, stats = asyncio.run(scenario())
+    assert runs == ["ok", "bad", "ok"]
+    assert stats == {"calls": 8, "executions": 3, "coalesced": 5, "in_flight": 0}
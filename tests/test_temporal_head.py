@@ -0,0 +1,17 @@
+import torch
+from torch.nn.utils.rnn import pad_sequence
+
+from app.ml.predictor import PredictorConfig, TemporalHead
+
+
+def test_packed_batch_matches_each_sequence_on_its_own():
+    torch.manual_seed(0)
+    cfg = PredictorConfig(feature_dim=8, hidden_dim=16)
+    head = TemporalHead(cfg).eval()
+    seqs = [torch.randn(length, cfg.feature_dim) for length in (3, 1, 5)]
+
+    with torch.no_grad():
+        batched = head(pad_sequence(seqs, batch_first=True), torch.tensor([len(s) for s in seqs]))
+        single = torch.cat([head(s.unsqueeze(0)) for s in seqs])
+
+    assert torch.allclose(batched, single, atol=1e-6)
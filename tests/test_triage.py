@@ -0,0 +1,105 @@
+import asyncio
+
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+from app.core.dependencies import get_current_user_claims
+from app.main import create_app
+from app.services.prediction_storage_service import build_prediction_doc
+from app.services.triage_service import get_triage_queue, mark_patient_reviewed, update_triage_queue
+
+
+def _prediction(user_id, code, severity, confidence=0.9):
+    return build_prediction_doc(
+        user_id,
+        {
+            "predicted_disease": code,
+            "predicted_disease_code": code,
+            "severity_level": severity,
+            "confidence": confidence,
+        },
+        f"{code}.jpg",
+    )
+
+
+async def _queue_ids(limit=20):
+    return [entry["patient_id"] for entry in await get_triage_queue(limit=limit)]
+
+
+def test_triage_queue_ranks_severe_codes_then_severity_and_confidence(mock_mongo):
+    patients = {name: str(ObjectId()) for name in ("melanoma", "severe_acne", "confident", "unsure")}
+
+    async def scenario():
+        await mock_mongo["users"].insert_many(
+            [{"_id": ObjectId(pid), "name": name, "email": f"{name}@example.com"} for name, pid in patients.items()]
+        )
+        await update_triage_queue(mock_mongo, [
+            _prediction(patients["unsure"], "eczema", "Moderate", confidence=0.6),
+            _prediction(patients["melanoma"], "melanoma_suspect", "Moderate"),
+            _prediction(patients["confident"], "eczema", "Moderate", confidence=0.8),
+            _prediction(patients["severe_acne"], "acne", "Severe"),
+            {**_prediction("ignored", "acne", "Severe"), "is_invalid_image": True},
+        ])
+
+        queue = await get_triage_queue(limit=10)
+        assert [entry["patient_name"] for entry in queue] == ["melanoma", "severe_acne", "confident", "unsure"]
+        assert queue[0]["patient_email"] == "melanoma@example.com"
+        assert queue[0]["priority"] > queue[1]["priority"] > queue[2]["priority"]
+        assert await _queue_ids(limit=2) == [patients["melanoma"], patients["severe_acne"]]
+
+    asyncio.run(scenario())
+
+
+def test_triage_entry_replaced_only_by_higher_priority_until_reviewed(mock_mongo):
+    async def scenario():
+        moderate = _prediction("p1", "acne", "Moderate")
+        await update_triage_queue(mock_mongo, [moderate])
+        await update_triage_queue(mock_mongo, [_prediction("p1", "acne", "Mild")])
+        entry = await mock_mongo["triage_queue"].find_one({"_id": "p1"})
+        assert entry["prediction_id"] == str(moderate["_id"])
+
+        severe = _prediction("p1", "acne", "Severe")
+        await update_triage_queue(mock_mongo, [severe])
+        entry = await mock_mongo["triage_queue"].find_one({"_id": "p1"})
+        assert entry["prediction_id"] == str(severe["_id"])
+
+        assert await mark_patient_reviewed("p1", "derm1")
+        assert not await mark_patient_reviewed("nobody", "derm1")
+        assert await _queue_ids() == []
+
+        # Replaying the reviewed prediction keeps the review
+        await update_triage_queue(mock_mongo, [severe])
+        entry = await mock_mongo["triage_queue"].find_one({"_id": "p1"})
+        assert entry["reviewed"] is True and entry["reviewed_by"] == "derm1"
+
+        # Any new prediction re-queues the patient without the old review fields
+        mild = _prediction("p1", "acne", "Mild")
+        await update_triage_queue(mock_mongo, [mild])
+        await update_triage_queue(mock_mongo, [mild])
+        entry = await mock_mongo["triage_queue"].find_one({"_id": "p1"})
+        assert entry["prediction_id"] == str(mild["_id"])
+        assert entry["reviewed"] is False
+        assert "reviewed_by" not in entry and "reviewed_at" not in entry
+        assert await _queue_ids() == ["p1"]
+
+    asyncio.run(scenario())
+
+
+def test_triage_endpoint_requires_dermatologist(mock_mongo):
+    asyncio.run(update_triage_queue(mock_mongo, [
+        _prediction("p1", "acne", "Mild"),
+        _prediction("p2", "melanoma_suspect", "Severe"),
+    ]))
+    app = create_app()
+    client = TestClient(app)
+
+    app.dependency_overrides[get_current_user_claims] = lambda: {"id": "d1", "role": "dermatologist"}
+    resp = client.get("/dermatologist/triage", params={"limit": 1})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["count"] == 1
+    assert body["patients"][0]["patient_id"] == "p2"
+    assert body["patients"][0]["patient_name"] is None
+
+    app.dependency_overrides[get_current_user_claims] = lambda: {"id": "p1", "role": "patient"}
+    assert client.get("/dermatologist/triage").status_code == 403
@@ -0,0 +1,37 @@
+from app.core.user_cache import UserCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_user_cache_ttl_and_hit_rate():
+    clock = FakeClock()
+    cache = UserCache(max_size=10, ttl_seconds=5, clock=clock)
+    cache.set("u1", {"id": "u1", "role": "patient"})
+
+    assert cache.get("u1")["role"] == "patient"
+    clock.now = 6
+    assert cache.get("u1") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_user_cache_evicts_least_recently_used_and_invalidates():
+    cache = UserCache(max_size=2, ttl_seconds=60)
+    cache.set("a", {"id": "a"})
+    cache.set("b", {"id": "b"})
+    cache.get("a")
+    cache.set("c", {"id": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,98 @@
+import asyncio
+
+from app.services.prediction_storage_service import (
+    build_prediction_doc,
+    get_user_dashboard,
+    get_user_prediction_stats,
+    save_prediction,
+)
+
+
+def _result(disease):
+    return {"predicted_disease": disease, "severity_level": "Mild", "confidence": 0.9}
+
+
+def test_stats_created_by_an_incremental_update_are_rebuilt_on_read(mock_mongo):
+    async def scenario():
+        # History stored before user_stats was materialized
+        await mock_mongo["predictions"].insert_many(
+            [build_prediction_doc("u1", _result("Acne"), f"old{i}.jpg") for i in range(3)]
+        )
+        await save_prediction("u1", _result("Eczema"), "new.jpg")
+        assert (await mock_mongo["user_stats"].find_one({"_id": "u1"}))["complete"] is False
+
+        stats = await get_user_prediction_stats("u1")
+        assert stats["total_predictions"] == 4
+        assert stats["predictions_by_disease"] == {"Acne": 3, "Eczema": 1}
+
+        await save_prediction("u1", _result("Eczema"), "newer.jpg")
+        dashboard = await get_user_dashboard("u1", limit=10)
+        assert dashboard["total_count"] == 5
+        assert len(dashboard["predictions"]) == 5
+
+    asyncio.run(scenario())
+
+
+def test_retried_batch_applies_view_updates_exactly_once(mock_mongo, monkeypatch):
+    from app.services import prediction_storage_service as storage
+
+    docs = [build_prediction_doc("u2", _result("Acne"), f"img{i}.jpg") for i in range(3)]
+    real_update_triage_queue = storage.update_triage_queue
+    calls = []
+
+    async def failing_once(db, prediction_docs):
+        calls.append(len(prediction_docs))
+        if len(calls) == 1:
+            raise RuntimeError("connection reset")
+        await real_update_triage_queue(db, prediction_docs)
+
+    monkeypatch.setattr(storage, "update_triage_queue", failing_once)
+
+    async def scenario():
+        # The first attempt stores the predictions and the counters, then fails
+        try:
+            await storage.persist_predictions(docs)
+        except RuntimeError:
+            pass
+        # The buffer retries the whole batch, and a journal replay may repeat it again
+        await storage.persist_predictions(docs)
+        await storage.persist_predictions(docs)
+
+        stats_doc = await mock_mongo["user_stats"].find_one({"_id": "u2"})
+        assert stats_doc["total_predictions"] == 3
+        assert len(stats_doc["recent"]) == 3
+        assert await mock_mongo["triage_queue"].count_documents({"_id": "u2"}) == 1
+
+    asyncio.run(scenario())
+
+
+def test_rebuild_does_not_overwrite_an_increment_made_while_counting(mock_mongo, monkeypatch):
+    from app.services import prediction_storage_service as storage
+
+    real_count = storage._count_predictions_by_disease
+    interleaved = []
+
+    async def count_then_save(match):
+        counts = await real_count(match)
+        if not interleaved:
+            # A prediction stored between the rebuild's count and its write
+            interleaved.append(await save_prediction("u3", _result("Acne"), "racing.jpg"))
+        return counts
+
+    monkeypatch.setattr(storage, "_count_predictions_by_disease", count_then_save)
+
+    async def scenario():
+        await mock_mongo["predictions"].insert_many(
+            [build_prediction_doc("u3", _result("Eczema"), f"old{i}.jpg") for i in range(2)]
+        )
+        await save_prediction("u3", _result("Eczema"), "first.jpg")
+
+        stats = await get_user_prediction_stats("u3")
+        assert stats["total_predictions"] == 4
+        assert stats["predictions_by_disease"] == {"Eczema": 3, "Acne": 1}
+        stats_doc = await mock_mongo["user_stats"].find_one({"_id": "u3"})
+        assert stats_doc["complete"] is True
+        assert stats_doc["total_predictions"] == 4
+        assert len(stats_doc["recent"]) == 4
+
+    asyncio.run(scenario())